@@ -29,11 +29,12 @@ __all__.extend([
 
 # Flow Manager and Passes
 from .passes.flow import Flow
+from .passes.profiler import FlowProfiler
 from .passes.translation import TranslationPass
 from .passes.rtl import VerilogCollection
 from .passes.vpr import VPRArchGeneration, VPRScalableDelegate, VPRScalableArchGeneration, VPR_RRG_Generation
 from .passes.yosys import YosysScriptsCollection
 __all__.extend([
-    "Flow", "TranslationPass", "VerilogCollection", "VPRArchGeneration", "VPRScalableDelegate",
+    "Flow", "FlowProfiler", "TranslationPass", "VerilogCollection", "VPRArchGeneration", "VPRScalableDelegate",
     "VPRScalableArchGeneration", "VPR_RRG_Generation", "YosysScriptsCollection",
     ])
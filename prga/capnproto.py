@@ -0,0 +1,242 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+"""Cap'n Proto message generation from XML-like element streams."""
+
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from .exception import PRGAAPIError, PRGAInternalError
+
+import os
+import io
+
+__all__ = ['CapnpGenerator', 'load_capnp_schema']
+
+def load_capnp_schema(schema):
+    """Load a Cap'n Proto schema file with ``pycapnp``.
+
+    Args:
+        schema (:obj:`str`): Path to the schema file
+    """
+    try:
+        import capnp
+    except ImportError:
+        raise PRGAAPIError("Cap'n Proto support requires the optional dependency 'pycapnp'")
+    # schemas generated by uxsdcxx import "/capnp/c++.capnp", which is shipped with ``pycapnp``
+    return capnp.load(schema, imports = [os.path.dirname(os.path.dirname(os.path.abspath(capnp.__file__)))])
+
+def _camelcase(name):
+    """Convert an XML attribute/tag name or enumerant to its name in schemas generated by uxsdcxx."""
+    parts = name.lower().split('_')
+    return parts[0] + ''.join(p.capitalize() for p in parts[1:])
+
+def _pluralize(name):
+    """Pluralize a camelCase name, e.g. the name of a list field."""
+    if name.endswith(("s", "x", "z", "ch", "sh")):
+        return name + "es"
+    elif name.endswith("y") and name[-2:-1] not in "aeiou":
+        return name[:-1] + "ies"
+    else:
+        return name + "s"
+
+def _snakecase(name):
+    """Convert a camelCase name in schemas generated by uxsdcxx back to snake_case."""
+    return ''.join('_' + c.lower() if c.isupper() else c for c in name)
+
+# ----------------------------------------------------------------------------
+# -- Stream-based Cap'n Proto Generator --------------------------------------
+# ----------------------------------------------------------------------------
+class _Frame(object):
+    """An open element in `CapnpGenerator`.
+
+    Elements with a ``builder`` are written directly into the message. Other elements are buffered as trees of
+    ``[tag, attrs, children, text]``, and written when their parent is closed.
+    """
+
+    __slots__ = ['tag', 'builder', 'element', 'buffered', 'lists', 'singles']
+    def __init__(self, tag, builder = None, element = None):
+        self.tag = tag
+        self.builder = builder
+        self.element = element
+        self.buffered = []      # buffered children
+        self.lists = {}         # reserved lists: child tag -> [list builder, number of children written]
+        self.singles = set()    # tags of unique children written
+
+class CapnpGenerator(object):
+    """A Cap'n Proto message generator with the same interface as `XMLGenerator`.
+
+    Elements are written into a message of ``root``, which is written into ``ostream`` when the outermost element is
+    closed. The conversion follows the naming conventions of uxsdcxx, which VPR uses to generate its Cap'n Proto
+    schemas from the XML schemas:
+
+        - attributes and unique child elements map to camelCase fields
+        - repeated child elements map to list fields named by the plural of the camelCase tag
+        - text content maps to the ``value`` field
+        - enumerants are the camelCase form of the (lower-cased) attribute values
+
+    Values that are not numbers (e.g. "auto") are skipped for numeric fields and left as the default value.
+
+    Lists in Cap'n Proto messages are allocated with a fixed size. Repeated child elements are buffered until their
+    parent is closed, unless their number is declared beforehand with `reserve`, in which case each of them is
+    written directly into the reserved list.
+
+    Args:
+        ostream (file-like object): the output stream. Must be opened in binary mode
+        schema (:obj:`str`): path to the Cap'n Proto schema
+        root (:obj:`str`): name of the struct in ``schema`` corresponding to the outermost element
+    """
+    def __init__(self, ostream, schema, root):
+        self.__ostream = ostream
+        self.__root = getattr(load_capnp_schema(schema), root)
+
+    def __enter__(self):
+        self._message = None
+        self._stack = [_Frame(None)]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            if self._message is None:
+                raise PRGAInternalError("Exactly one root element expected")
+            try:
+                self.__ostream.fileno()
+            except (AttributeError, io.UnsupportedOperation):
+                self.__ostream.write(self._message.to_bytes())
+            else:
+                # the message is written into the file descriptor directly, after anything buffered in the stream
+                self.__ostream.flush()
+                self._message.write(self.__ostream)
+        del self._message, self._stack
+
+    @property
+    def pretty(self):
+        return False
+
+    @property
+    def depth(self):
+        return len(self._stack) - 1
+
+    def reserve(self, tag, count):
+        """Reserve a list of ``count`` ``tag`` child elements in the current element.
+
+        Args:
+            tag (:obj:`str`): Tag of the child elements
+            count (:obj:`int`): Number of the child elements. Exactly this many must be added before the current
+                element is closed
+        """
+        frame = self._stack[-1]
+        if frame.builder is None:
+            raise PRGAInternalError("Cannot reserve <{}> elements in a buffered element".format(tag))
+        elif tag in frame.lists or any(child[0] == tag for child in frame.buffered):
+            raise PRGAInternalError("<{}> elements already added in <{}>".format(tag, frame.tag))
+        elif (name := _pluralize(_camelcase(tag))) not in frame.builder.schema.fields:
+            raise PRGAInternalError("No field for child element <{}> in <{}>".format(tag, frame.tag))
+        frame.lists[tag] = [frame.builder.init(name, count), 0]
+
+    def _open(self, tag, attrs, text = ''):
+        """Open an element and return its frame."""
+        parent = self._stack[-1]
+        if parent.tag is None:
+            if self._message is not None:
+                raise PRGAInternalError("Exactly one root element expected")
+            builder = self._message = self.__root.new_message()
+        elif parent.builder is None:
+            element = [tag, attrs, [], text]
+            parent.element[2].append(element)
+            return _Frame(tag, element = element)
+        elif (list_ := parent.lists.get(tag)) is not None:
+            builder, i = list_[0], list_[1]
+            if i >= len(builder):
+                raise PRGAInternalError("More <{}> elements than reserved in <{}>".format(tag, parent.tag))
+            builder, list_[1] = builder[i], i + 1
+        elif ((field := parent.builder.schema.fields.get(name := _camelcase(tag))) is not None
+                and str(field.proto.slot.type.which) == "struct" and tag not in parent.singles):
+            parent.singles.add(tag)
+            builder = parent.builder.init(name)
+        else:
+            element = [tag, attrs, [], text]
+            parent.buffered.append(element)
+            return _Frame(tag, element = element)
+        self._set_fields(builder, tag, attrs, text)
+        return _Frame(tag, builder)
+
+    def _close(self, frame):
+        """Write the buffered children of the element of ``frame``, and check its reserved lists."""
+        if frame.builder is None:
+            return
+        for tag, (builder, i) in iteritems(frame.lists):
+            if i != len(builder):
+                raise PRGAInternalError("{} <{}> elements reserved in <{}>, but {} added"
+                        .format(len(builder), tag, frame.tag, i))
+        self._fill_children(frame.builder, frame.tag, frame.buffered, frame.singles)
+
+    def _fill(self, builder, element):
+        tag, attrs, children, text = element
+        self._set_fields(builder, tag, attrs, text)
+        self._fill_children(builder, tag, children)
+
+    def _fill_children(self, builder, tag, children, singles = ()):
+        fields = builder.schema.fields
+        groups = {}
+        for child in children:
+            groups.setdefault(child[0], []).append(child)
+        for child_tag, elements in iteritems(groups):
+            name = _camelcase(child_tag)
+            if name in fields and len(elements) == 1 and child_tag not in singles:
+                self._fill(builder.init(name), elements[0])
+            elif (name := _pluralize(name)) in fields:
+                list_ = builder.init(name, len(elements))
+                for i, child in enumerate(elements):
+                    self._fill(list_[i], child)
+            else:
+                raise PRGAInternalError("No field for child element <{}> in <{}>".format(child_tag, tag))
+
+    def _set_fields(self, builder, tag, attrs, text):
+        fields = builder.schema.fields
+        for k, v in iteritems(attrs):
+            self._set(builder, fields, tag, _camelcase(k), v)
+        if text:
+            self._set(builder, fields, tag, "value", text)
+
+    def _set(self, builder, fields, tag, name, value):
+        if (field := fields.get(name)) is None:
+            raise PRGAInternalError("No field for attribute '{}' in <{}>".format(name, tag))
+        type_ = str(field.proto.slot.type.which)
+        if type_ == "enum":
+            setattr(builder, name, _camelcase(str(value)))
+        elif type_ == "text":
+            setattr(builder, name, str(value))
+        elif type_ == "bool":
+            setattr(builder, name, value in (True, "true", "1"))
+        elif type_ in ("float32", "float64"):
+            try:
+                setattr(builder, name, float(value))
+            except ValueError:
+                pass
+        else:
+            try:
+                setattr(builder, name, int(value))
+            except ValueError:
+                pass
+
+    class __ElementContextManager(object):
+        """Context manager for an element."""
+        def __init__(self, generator, tag, attrs):
+            self.__gen = generator
+            self.__tag = tag
+            self.__attrs = attrs
+
+        def __enter__(self):
+            self.__gen._stack.append(self.__gen._open(self.__tag, self.__attrs))
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            frame = self.__gen._stack.pop()
+            if exc_type is None:
+                self.__gen._close(frame)
+
+    def element(self, tag, attrs = None):
+        return self.__ElementContextManager(self, tag, attrs or {})
+
+    def element_leaf(self, tag, attrs = None, text = ''):
+        self._close(self._open(tag, attrs or {}, "\n".join(l.strip() for l in text.splitlines())))
@@ -39,12 +39,22 @@ class PktchainFASMDelegate(ScanchainFASMDelegate):
         context (`Context`):
     """
 
+    __slots__ = ['_chainoffset_index']
+
+    def reset(self):
+        super(PktchainFASMDelegate, self).reset()
+        self._chainoffset_index = {}
+
     def _instance_chainoffset(self, instance):
+        hierarchy = instance.hierarchy
+        if (offsets := self._chainoffset_index.get(hierarchy)) is not None:
+            return offsets
         chain, ypos = 0, 0
-        for i in instance.hierarchy:
+        for i in hierarchy:
             chain, ypos_inc = i.cfg_chainoffsets[chain]
             ypos += ypos_inc
-        return chain, ypos
+        offsets = self._chainoffset_index[hierarchy] = chain, ypos
+        return offsets
 
     def fasm_prefix_for_tile(self, instance):
         if (tile_bitoffset := getattr(instance.hierarchy[0], "cfg_bitoffset", None)) is None:
@@ -612,17 +622,20 @@ class Pktchain(Scanchain):
         return context
 
     @classmethod
-    def new_renderer(cls, additional_template_search_paths = tuple()):
+    def new_renderer(cls, additional_template_search_paths = tuple(), *, manifest = None):
         """Create a new file renderer.
 
         Args:
             additional_template_search_paths (:obj:`Sequence` [:obj:`str` ]): Additional paths where the renderer
                 should search for template files
 
+        Keyword Args:
+            manifest (:obj:`str`): Path to the render manifest. Refer to `FileRenderer` for more details
+
         Returns:
             `FileRenderer`:
         """
-        r = super(Pktchain, cls).new_renderer(additional_template_search_paths)
+        r = super(Pktchain, cls).new_renderer(additional_template_search_paths, manifest = manifest)
         r.template_search_paths.insert(0, ADDITIONAL_TEMPLATE_SEARCH_PATH)
         return r
 
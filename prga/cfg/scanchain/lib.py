@@ -77,19 +77,67 @@ class ScanchainFASMDelegate(FASMDelegate):
         context (`Context`):
     """
 
-    __slots__ = ['context']
+    __slots__ = ['context', '_cfg_bits_cache', '_bitoffset_index']
     def __init__(self, context):
         self.context = context
+        self.reset()
+
+    def __getstate__(self):
+        return {"context": self.context}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):        # contexts pickled before the cache is added
+            state = state[1]
+        self.context = state["context"]
+        self.reset()
+
+    def reset(self):
+        self._cfg_bits_cache = {}
+        self._bitoffset_index = {}
+
+    def _cfg_bits_for_connection(self, source, sink):
+        """Get the cfg bits, relative to the parent module, for the connection from ``source`` to ``sink``. Cached
+        per (module, source, sink) so that the lookup is done once for each connection of each module, no matter how
+        many times the module is instantiated."""
+        module = source.parent
+        coalesced = module._coalesce_connections
+        key = (module, NetUtils._reference(source, coalesced = coalesced),
+                NetUtils._reference(sink, coalesced = coalesced))
+        try:
+            return self._cfg_bits_cache[key]
+        except KeyError:
+            pass
+        conn = NetUtils.get_connection(source, sink)
+        cfg_bits = self._cfg_bits_cache[key] = None if conn is None else tuple(conn.get("cfg_bits", tuple()))
+        return cfg_bits
 
     def _instance_bitoffset(self, instance):
+        """Get the cfg bit offset of ``instance`` relative to its top-level parent module, or ``None`` if any
+        instance in the hierarchy is not in the scanchain.
+
+        Offsets are indexed by the hierarchy, and the offset of a hierarchy is derived from the indexed offset of the
+        hierarchy of its parent instance, so each level of hierarchy is looked at only once. The index is dropped by
+        `reset`, which VPR passes call before generating any file, i.e. after the scanchain is injected.
+        """
         if instance is None:
             return 0
-        cfg_bitoffset = 0
-        if instance:
-            for i in reversed(instance.hierarchy):
-                if (offset := getattr(i, "cfg_bitoffset", None)) is None:
-                    return None
-                cfg_bitoffset += offset
+        hierarchy = instance.hierarchy
+        if (cfg_bitoffset := self._bitoffset_index.get(hierarchy, False)) is not False:
+            return cfg_bitoffset
+        # find the lowest indexed parent hierarchy
+        misses = []
+        while hierarchy and (cfg_bitoffset := self._bitoffset_index.get(hierarchy, False)) is False:
+            misses.append(hierarchy)
+            hierarchy = hierarchy[1:]
+        if not hierarchy:
+            cfg_bitoffset = 0
+        for hierarchy in reversed(misses):
+            if cfg_bitoffset is not None:
+                if (offset := getattr(hierarchy[0], "cfg_bitoffset", None)) is None:
+                    cfg_bitoffset = None
+                else:
+                    cfg_bitoffset += offset
+            self._bitoffset_index[hierarchy] = cfg_bitoffset
         return cfg_bitoffset
 
     def _features_for_path(self, source, sink, instance = None):
@@ -98,11 +146,11 @@ class ScanchainFASMDelegate(FASMDelegate):
         if cfg_bitoffset is None:
             return tuple()
         # 2. get the cfg bits for the connection
-        conn = NetUtils.get_connection(source, sink)
-        if conn is None:
+        cfg_bits = self._cfg_bits_for_connection(source, sink)
+        if cfg_bits is None:
             return tuple()
         else:
-            return tuple('b{}'.format(cfg_bitoffset + i) for i in conn.get("cfg_bits", tuple()))
+            return tuple('b{}'.format(cfg_bitoffset + i) for i in cfg_bits)
 
     def fasm_mux_for_intrablock_switch(self, source, sink, instance = None):
         return self._features_for_path(source, sink, instance)
@@ -116,6 +164,13 @@ class ScanchainFASMDelegate(FASMDelegate):
         else:
             return 'b{}'.format(offset)
 
+    def fasm_memo_key_for_intrablock_module(self, instance):
+        # intrablock metadata only depends on the modules and the cfg bit offset of ``instance``, unless a sub-class
+        # changes how it is generated
+        if self._overrides_intrablock_methods(ScanchainFASMDelegate):
+            return None
+        return (self._instance_bitoffset(instance), )
+
     def fasm_features_for_mode(self, instance, mode):
         cfg_bitoffset = self._instance_bitoffset(instance)
         if cfg_bitoffset is None:
@@ -519,60 +574,87 @@ class Scanchain(object):
         return context
 
     @classmethod
-    def new_renderer(cls, additional_template_search_paths = tuple()):
+    def new_renderer(cls, additional_template_search_paths = tuple(), *, manifest = None):
         """Create a new file renderer.
 
         Args:
             additional_template_search_paths (:obj:`Sequence` [:obj:`str` ]): Additional paths where the renderer
                 should search for template files
 
+        Keyword Args:
+            manifest (:obj:`str`): Path to the render manifest. Refer to `FileRenderer` for more details
+
         Returns:
             `FileRenderer`:
         """
-        r = FileRenderer()
+        r = FileRenderer(manifest = manifest)
         r.template_search_paths.insert(0, ADDITIONAL_TEMPLATE_SEARCH_PATH)
         r.template_search_paths.extend(additional_template_search_paths)
         return r
 
     @classmethod
-    def complete_scanchain(cls, context, logical_module = None, *,
-            iter_instances = lambda m: itervalues(m.instances),
-            timing_enclosure = lambda m: m.module_class.is_block or m.module_class.is_routing_box):
-        """Inject the scanchain.
-        
-        Args:
-            context (`Context`):
-            logical_module (`Module`): The module (logical view) in which scanchain is injected. If not specified, the
-                top-level array in ``context`` is selected
+    def _plan_scanchain(cls, context, module, iter_instances):
+        """Plan the scanchain injection into ``module`` and all its sub-modules without scanchain yet.
 
-        Keyword Args:
-            iter_instances (:obj:`Function` [`Module` ] -> :obj:`Iterable` [`Instance` ]): Custom ordering of
-                the instances in a module
-            timing_enclosure (:obj:`Function` [`Module` ] -> :obj:`bool`): A function used to determine if
-                configuration enable signals should be registered for one configuration cycle in a module. This is
-                necessary because the configuration enable signal may control millions of registers across the entire
-                FPGA. This super high-fanout net, if not registered, will be very slow to drive
+        Output enables of IO blocks are injected when a module is first visited. The instances of the module are
+        taken afterwards, so they include the output enable cells.
 
-        This method calls itself recursively to process all the instances (sub-modules).
+        Returns:
+            :obj:`list` [:obj:`tuple` [`Module`, :obj:`tuple` [`Instance` ]]]: Modules in post-order, each with its
+                instances in the scanchain order
         """
-        cfg_width = context.summary.scanchain["cfg_width"]
-        module = uno(logical_module, context.database[ModuleView.logical, context.top.key])
-        # special processing needed for IO blocks (output enable)
-        if module.module_class.is_io_block:
-            oe = module.ports.get(IOType.oe)
-            if oe is not None:
+        def enter(module):
+            # special processing needed for IO blocks (output enable)
+            if module.module_class.is_io_block and (oe := module.ports.get(IOType.oe)) is not None:
                 inst = ModuleUtils.instantiate(module,
                         cls.get_cfg_data_cell(context, 1),
                         '_cfg_oe')
                 NetUtils.connect(inst.pins["cfg_d"], oe)
+            instances = tuple(iter_instances(module))
+            return module, instances, iter(instances)
+
+        schedule, visited = [], {module.key}
+        stack = [enter(module)]
+        while stack:
+            module, instances, it = stack[-1]
+            for instance in it:
+                model = instance.model
+                if not (model.module_class in (ModuleClass.primitive, ModuleClass.switch, ModuleClass.cfg)
+                        or model.key in visited or hasattr(model, 'cfg_bitcount')):
+                    visited.add(model.key)
+                    stack.append(enter(model))
+                    break
+            else:
+                stack.pop()
+                schedule.append( (module, instances) )
+        return schedule
+
+    @classmethod
+    def _inject_scanchain(cls, context, module, instances, timing_enclosure):
+        """Inject the scanchain into ``module``, assuming all sub-modules already have the scanchain injected.
+
+        Returns:
+            :obj:`int`: Number of configuration bits in ``module``
+        """
+        cfg_width = context.summary.scanchain["cfg_width"]
+        # configuration ports of ``module``, created on first use
+        ports = {}
+        def port(key):
+            if key not in ports:
+                if key == "cfg_e":
+                    ports["cfg_e"] = cls._get_or_create_cfg_ports(module, cfg_width, enable_only = True)
+                else:
+                    ports.update(cls._get_or_create_cfg_ports(module, cfg_width))
+            return ports[key]
+        # connections are collected and made at once
+        sources, sinks = [], []
+        def connect(source, sink):
+            sources.append(source)
+            sinks.append(sink)
         # connecting scanchain ports
         cfg_bitoffset = 0
         cfg_nets = {}
-        instances_snapshot = tuple(iter_instances(module))
-        for instance in instances_snapshot:
-            if instance.model.module_class not in (ModuleClass.primitive, ModuleClass.switch, ModuleClass.cfg):
-                if not hasattr(instance.model, 'cfg_bitcount'):
-                    cls.complete_scanchain(context, instance.model, iter_instances = iter_instances)
+        for instance in instances:
             # enable pin
             if (inst_cfg_e := instance.pins.get("cfg_e")) is None:
                 continue
@@ -581,16 +663,14 @@ class Scanchain(object):
                     ereg = ModuleUtils.instantiate(module,
                             context.database[ModuleView.logical, "cfg_e_reg"],
                             "_cfg_ereg")
-                    NetUtils.connect(cls._get_or_create_cfg_ports(module, cfg_width, enable_only = True),
-                            ereg.pins["cfg_e_i"])
+                    connect(port("cfg_e"), ereg.pins["cfg_e_i"])
                     cfg_e = cfg_nets["cfg_e"] = ereg.pins["cfg_e"]
-                    for k, v in iteritems(cls._get_or_create_cfg_ports(module, cfg_width)):
-                        cfg_nets.setdefault(k, v)
-                    NetUtils.connect(cfg_nets["cfg_clk"], ereg.pins["cfg_clk"])
+                    for k in ("cfg_clk", "cfg_we", "cfg_i", "cfg_o"):
+                        cfg_nets.setdefault(k, port(k))
+                    connect(cfg_nets["cfg_clk"], ereg.pins["cfg_clk"])
                 else:
-                    cfg_e = cfg_nets["cfg_e"] = cls._get_or_create_cfg_ports(module, cfg_width,
-                            enable_only = True)
-            NetUtils.connect(cfg_e, inst_cfg_e)
+                    cfg_e = cfg_nets["cfg_e"] = port("cfg_e")
+            connect(cfg_e, inst_cfg_e)
             # actual bitstream loading pin
             inst_cfg_i = instance.pins.get('cfg_i')
             if inst_cfg_i is None:
@@ -600,11 +680,11 @@ class Scanchain(object):
             cfg_bitoffset += instance.model.cfg_bitcount
             # connect nets
             if "cfg_clk" not in cfg_nets:
-                for k, v in iteritems(cls._get_or_create_cfg_ports(module, cfg_width)):
-                    cfg_nets.setdefault(k, v)
-            NetUtils.connect(cfg_nets["cfg_clk"], instance.pins['cfg_clk'])
-            NetUtils.connect(cfg_nets["cfg_i"], inst_cfg_i)
-            NetUtils.connect(cfg_nets["cfg_we"], instance.pins["cfg_we"])
+                for k in ("cfg_clk", "cfg_e", "cfg_we", "cfg_i", "cfg_o"):
+                    cfg_nets.setdefault(k, port(k))
+            connect(cfg_nets["cfg_clk"], instance.pins['cfg_clk'])
+            connect(cfg_nets["cfg_i"], inst_cfg_i)
+            connect(cfg_nets["cfg_we"], instance.pins["cfg_we"])
             cfg_nets["cfg_i"] = instance.pins['cfg_o']
             cfg_we_o = instance.pins.get("cfg_we_o")
             if cfg_we_o:
@@ -620,11 +700,10 @@ class Scanchain(object):
                     filler = ModuleUtils.instantiate(module,
                             cls.get_cfg_data_cell(context, remainder),
                             "_cfg_filler_inst")
-                    NetUtils.connect(cls._get_or_create_cfg_ports(module, cfg_width, enable_only = True),
-                            filler.pins["cfg_e"])
-                    NetUtils.connect(cfg_nets["cfg_clk"], filler.pins["cfg_clk"])
-                    NetUtils.connect(cfg_nets["cfg_we"], filler.pins["cfg_we"])
-                    NetUtils.connect(cfg_nets["cfg_i"], filler.pins["cfg_i"])
+                    connect(port("cfg_e"), filler.pins["cfg_e"])
+                    connect(cfg_nets["cfg_clk"], filler.pins["cfg_clk"])
+                    connect(cfg_nets["cfg_we"], filler.pins["cfg_we"])
+                    connect(cfg_nets["cfg_i"], filler.pins["cfg_i"])
                     cfg_nets["cfg_i"] = filler.pins["cfg_o"]
                     cfg_bitoffset += remainder
                 # inject cfg_we register
@@ -635,23 +714,58 @@ class Scanchain(object):
                 delimiter = ModuleUtils.instantiate(module, 
                         context.database[ModuleView.logical, "cfg_delim"],
                         "_cfg_delim")
-                NetUtils.connect(cfg_nets["cfg_clk"], delimiter.pins["cfg_clk"])
-                NetUtils.connect(cfg_nets["cfg_e"], delimiter.pins["cfg_e"])
-                NetUtils.connect(cfg_nets["cfg_we"], delimiter.pins["cfg_we"])
-                NetUtils.connect(cfg_nets["cfg_i"], delimiter.pins["cfg_i"])
-                NetUtils.connect(delimiter.pins["cfg_o"], cfg_nets["cfg_o"])
-                NetUtils.connect(delimiter.pins["cfg_we_o"], cfg_we_o)
+                connect(cfg_nets["cfg_clk"], delimiter.pins["cfg_clk"])
+                connect(cfg_nets["cfg_e"], delimiter.pins["cfg_e"])
+                connect(cfg_nets["cfg_we"], delimiter.pins["cfg_we"])
+                connect(cfg_nets["cfg_i"], delimiter.pins["cfg_i"])
+                connect(delimiter.pins["cfg_o"], cfg_nets["cfg_o"])
+                connect(delimiter.pins["cfg_we_o"], cfg_we_o)
             else:
-                NetUtils.connect(cfg_nets["cfg_i"], cfg_nets["cfg_o"])
+                connect(cfg_nets["cfg_i"], cfg_nets["cfg_o"])
                 cfg_we_o = cfg_nets.get("cfg_we_o")
                 if cfg_we_o:
-                    NetUtils.connect(cfg_nets["cfg_we"], cfg_we_o)
+                    connect(cfg_nets["cfg_we"], cfg_we_o)
+        if sources:
+            NetUtils.connect(sources, sinks)
         module.cfg_bitcount = cfg_bitoffset
-        _logger.info("Scanchain injected to {}. Total bits: {}".format(module, cfg_bitoffset))
-        if module.key == context.top.key:
-            if not hasattr(context.summary, "scanchain"):
-                context.summary.scanchain = {}
-            context.summary.scanchain["bitstream_size"] = cfg_bitoffset
+        return cfg_bitoffset
+
+    @classmethod
+    def complete_scanchain(cls, context, logical_module = None, *,
+            iter_instances = lambda m: itervalues(m.instances),
+            timing_enclosure = lambda m: m.module_class.is_block or m.module_class.is_routing_box):
+        """Inject the scanchain.
+        
+        Args:
+            context (`Context`):
+            logical_module (`Module`): The module (logical view) in which scanchain is injected. If not specified, the
+                top-level array in ``context`` is selected
+
+        Keyword Args:
+            iter_instances (:obj:`Function` [`Module` ] -> :obj:`Iterable` [`Instance` ]): Custom ordering of
+                the instances in a module
+            timing_enclosure (:obj:`Function` [`Module` ] -> :obj:`bool`): A function used to determine if
+                configuration enable signals should be registered for one configuration cycle in a module. This is
+                necessary because the configuration enable signal may control millions of registers across the entire
+                FPGA. This super high-fanout net, if not registered, will be very slow to drive
+
+        Returns:
+            :obj:`dict` [:obj:`Hashable`, :obj:`int` ]: Mapping from the keys of the processed modules to the length
+                of the scanchain in them, in the order the modules are processed
+
+        All sub-modules without scanchain are scheduled first, then processed bottom-up, each only once.
+        """
+        module = uno(logical_module, context.database[ModuleView.logical, context.top.key])
+        chain_lengths = {}
+        for module, instances in cls._plan_scanchain(context, module, iter_instances):
+            chain_lengths[module.key] = cfg_bitcount = cls._inject_scanchain(context, module, instances,
+                    timing_enclosure)
+            _logger.info("Scanchain injected to {}. Total bits: {}".format(module, cfg_bitcount))
+            if module.key == context.top.key:
+                if not hasattr(context.summary, "scanchain"):
+                    context.summary.scanchain = {}
+                context.summary.scanchain["bitstream_size"] = cfg_bitcount
+        return chain_lengths
 
     @classmethod
     def annotate_user_view(cls, context, user_module = None, *, _annotated = None):
@@ -754,11 +868,12 @@ class Scanchain(object):
                 FPGA. This super high-fanout net, if not registered, will be very slow to drive
         """
 
-        __slots__ = ["iter_instances", "timing_enclosure"]
+        __slots__ = ["iter_instances", "timing_enclosure", "chain_lengths"]
 
         def __init__(self, *, iter_instances = None, timing_enclosure = None):
             self.iter_instances = iter_instances
             self.timing_enclosure = timing_enclosure
+            self.chain_lengths = None
 
         def run(self, context, renderer = None):
             kwargs = {}
@@ -766,9 +881,16 @@ class Scanchain(object):
                 kwargs["iter_instances"] = self.iter_instances
             if callable(self.timing_enclosure):
                 kwargs["timing_enclosure"] = self.timing_enclosure
-            Scanchain.complete_scanchain(context, **kwargs)
+            self.chain_lengths = Scanchain.complete_scanchain(context, **kwargs)
             Scanchain.annotate_user_view(context)
 
+        @property
+        def profile_counters(self):
+            if self.chain_lengths is None:
+                return None
+            return {"scanchain_modules": len(self.chain_lengths),
+                    "scanchain_max_length": max(itervalues(self.chain_lengths), default = 0)}
+
         @property
         def key(self):
             return "config.injection.scanchain"
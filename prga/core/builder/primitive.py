@@ -349,7 +349,7 @@ class PrimitiveBuilder(_BasePrimitiveBuilder):
         .. _combinational\_sink\_ports:
             https://docs.verilogtorouting.org/en/latest/arch/reference/#tag-%3Cportname=
         """
-        vpr_combinational_sinks = tuple(set(vpr_combinational_sinks))
+        vpr_combinational_sinks = tuple(dict.fromkeys(vpr_combinational_sinks))
         try:
             clk = None if clock is None else self._module.ports[clock]
             sinks = tuple(self._module.ports[s] for s in vpr_combinational_sinks)
@@ -15,13 +15,14 @@ from ..netlist.module.module import Module
 from ..netlist.module.util import ModuleUtils
 from ..netlist.net.util import NetUtils
 from ..renderer.renderer import FileRenderer
+from .serialization import is_chunked_context, dump_context, load_context, load_summary
 from ..util import Object, ReadonlyMappingProxy, uno
 from ..exception import PRGAAPIError, PRGAInternalError
 
 # In Python 3.7 and above, ``dict`` preserves insertion order and is more performant than ``OrderedDict``
 OrderedDict = dict
 
-import os, sys
+import os, sys, io
 sys.setrecursionlimit(2**16)
 
 try:
@@ -607,14 +608,24 @@ class Context(Object):
         return ArrayBuilder(self, array)
 
     # -- Serialization -------------------------------------------------------
-    def pickle(self, file_):
+    def pickle(self, file_, *, chunked = False):
         """Pickle the architecture context into a file.
 
         Args:
             file_ (:obj:`str` or file-like object): output file or its name
+
+        Keyword Args:
+            chunked (:obj:`bool`): If set, the context is pickled in the chunked format, in which the summary and
+                groups of modules are pickled separately. When unpickled, modules are loaded on first access, and
+                `Context.unpickle_summary` loads the summary only. Otherwise, the context is pickled as one object.
+                Chunked contexts can be written into any stream, but reading them requires random access, so they
+                are read into memory first if unpickled from a non-seekable stream
         """
         if isinstance(file_, basestring):
-            pickle.dump(self, open(file_, OpenMode.wb))
+            with open(file_, OpenMode.wb) as f:
+                self.pickle(f, chunked = chunked)
+        elif chunked:
+            dump_context(self, file_)
         else:
             pickle.dump(self, file_)
 
@@ -630,14 +641,8 @@ class Context(Object):
             pickle.dump(self.summary, file_)
 
     @classmethod
-    def unpickle(cls, file_):
-        """Unpickle a pickled architecture context.
-
-        Args:
-            file_ (:obj:`str` or file-like object): the pickled file
-        """
-        obj = pickle.load(open(file_, OpenMode.rb) if isinstance(file_, basestring) else file_)
-        if isinstance(obj, cls) and (version := getattr(obj, "version", None)) != _VERSION:
+    def _check_version(cls, version):
+        if version != _VERSION:
             if version is None:
                 raise PRGAAPIError(
                         "The context is pickled by an old PRGA release, not supported by current version {}"
@@ -646,4 +651,54 @@ class Context(Object):
                 raise PRGAAPIError(
                         "The context is pickled by PRGA version {}, not supported by current version {}"
                         .format(version, _VERSION))
+
+    @classmethod
+    def unpickle(cls, file_):
+        """Unpickle a pickled architecture context.
+
+        Args:
+            file_ (:obj:`str` or file-like object): the pickled file. Contexts pickled in the chunked format keep the
+                file open until all modules are loaded, so file-like objects must not be closed before that
+        """
+        f = open(file_, OpenMode.rb) if isinstance(file_, basestring) else file_
+        if not f.seekable():
+            # chunked contexts are read with random access
+            buf = io.BytesIO(f.read())
+            if f is not file_:
+                f.close()
+            f = buf
+        if is_chunked_context(f):
+            obj = load_context(f, close = f is not file_)
+        else:
+            obj = pickle.load(f)
+            if f is not file_:
+                f.close()
+        if isinstance(obj, cls):
+            cls._check_version(getattr(obj, "version", None))
         return obj
+
+    @classmethod
+    def unpickle_summary(cls, file_):
+        """Unpickle the summary from a pickled architecture context or a pickled summary.
+
+        For contexts pickled in the chunked format, only the summary is loaded.
+
+        Args:
+            file_ (:obj:`str` or file-like object): the pickled file
+
+        Returns:
+            `ContextSummary`:
+        """
+        if isinstance(file_, basestring):
+            with open(file_, OpenMode.rb) as f:
+                return cls.unpickle_summary(f)
+        elif not file_.seekable():
+            return cls.unpickle_summary(io.BytesIO(file_.read()))
+        elif is_chunked_context(file_):
+            version, summary = load_summary(file_)
+            cls._check_version(version)
+            return summary
+        elif isinstance(obj := cls.unpickle(file_), cls):
+            return obj.summary
+        else:
+            return obj
@@ -0,0 +1,343 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+"""Chunked serialization of architecture contexts.
+
+A chunked context file contains the following sections, each of which is a separate pickle:
+
+    - the summary, pickled on its own so that it can be loaded without touching the rest of the file
+    - one chunk per group of modules in the module database
+    - the core: the context itself, with the module database replaced by a lazily-loaded one
+
+Modules in different chunks only reference each other as whole database modules, so a chunk is loaded only when
+one of its modules is accessed. Modules sharing other objects, or referencing each other in a cycle, are put into the
+same chunk so that object identities are preserved. The file starts with a magic string and the format version, and
+ends with the offset of the index, which records the position of each section.
+"""
+
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from ..util import uno
+from ..exception import PRGAAPIError, PRGAInternalError
+
+from enum import Enum
+from types import FunctionType, BuiltinFunctionType
+import io
+import struct
+import networkx as nx
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+__all__ = ['LazyModuleDatabase', 'is_chunked_context', 'dump_context', 'load_context', 'load_summary']
+
+_MAGIC = b"PRGACTX"
+_FORMAT = 1
+_HEADER = struct.Struct("<7sB")
+_FOOTER = struct.Struct("<Q")
+
+# objects of these types are never shared by reference between chunks
+_ATOMIC = (str, bytes, int, float, complex, type(None), tuple, frozenset, type, Enum,
+        FunctionType, BuiltinFunctionType)
+
+class _Unchunkable(Exception):
+    """Raised when a module references objects that cannot be split from the context."""
+    pass
+
+class _CountingStream(object):
+    """Write-only stream counting the written bytes."""
+
+    __slots__ = ["stream", "pos"]
+    def __init__(self, stream):
+        self.stream = stream
+        self.pos = 0
+
+    def write(self, b):
+        self.stream.write(b)
+        self.pos += len(b)
+
+class _ChunkPickler(pickle.Pickler):
+    """Pickler replacing modules in the database and objects pickled in other chunks with references.
+
+    Args:
+        file_ (file-like object): The output stream
+        modules (:obj:`Mapping` [:obj:`int`, :obj:`int` ]): Mapping from ``id`` of modules to their positions in the
+            database
+        inline (:obj:`Container` [:obj:`int` ]): ``id`` of modules pickled in this chunk
+        objects (:obj:`Mapping` [:obj:`int`, :obj:`tuple` [:obj:`int`, :obj:`int` ]]): Mapping from ``id`` of
+            objects pickled in other chunks to the chunk and their memo index in the chunk
+        special (:obj:`Mapping` [:obj:`int`, :obj:`Any` ]): Mapping from ``id`` of special objects to their
+            persistent IDs. If the persistent ID is ``None``, the object cannot be pickled in this chunk
+    """
+
+    def __init__(self, file_, modules, inline = (), objects = None, special = None):
+        super(_ChunkPickler, self).__init__(file_, pickle.HIGHEST_PROTOCOL)
+        self._modules = modules
+        self._inline = inline
+        self._objects = uno(objects, {})
+        self._special = uno(special, {})
+        self.refs = set()
+        self.chunk_refs = set()
+
+    def persistent_id(self, obj):
+        # only live objects are in the mappings, so atomic objects never match
+        if (pos := self._modules.get(id(obj))) is not None and id(obj) not in self._inline:
+            self.refs.add(pos)
+            return "module", pos
+        elif (ref := self._objects.get(id(obj))) is not None:
+            self.chunk_refs.add(ref[0])
+            return ("object", ) + ref
+        elif (pid := self._special.get(id(obj), False)) is not False:
+            if pid is None:
+                raise _Unchunkable()
+            return pid
+        return None
+
+    def shared(self):
+        """Memoized objects that may be shared with other chunks, mapped from their ``id`` to their memo index and
+        themselves."""
+        return {k: (idx, obj) for k, (idx, obj) in iteritems(self.memo.copy()) if not isinstance(obj, _ATOMIC)}
+
+def _dump_chunks(context, modules, stream):
+    """Dump modules in the database of ``context`` into chunks.
+
+    Each module is first pickled on its own. Modules sharing objects with each other, or referencing each other in a
+    cycle, are then grouped and pickled again together.
+
+    Returns:
+        :obj:`tuple`: Positions of the modules in each chunk, ordered so that modules are only referenced by modules
+            in later chunks; the offset and size of each chunk; and the objects pickled in the chunks, followed by
+            the memos that must be kept alive as long as the objects are in use
+    """
+    special = {id(context): None, id(context._database): None}
+    values = tuple(itervalues(context._database))
+    g = nx.DiGraph()
+    g.add_nodes_from(range(len(values)))
+    owners, dumps = {}, []
+    for pos, module in enumerate(values):
+        p = _ChunkPickler(f := io.BytesIO(), modules, (id(module), ), special = special)
+        p.dump( (module, ) )
+        for ref in p.refs:
+            g.add_edge(pos, ref)
+        # the memos are kept so that the ``id`` of temporary objects are not reused
+        dumps.append( (f.getvalue(), shared := p.shared()) )
+        for k in shared:
+            if (owner := owners.setdefault(k, pos)) != pos:
+                g.add_edge(pos, owner)
+                g.add_edge(owner, pos)
+    c = nx.condensation(g)
+    groups = [sorted(c.nodes[n]["members"]) for n in reversed(list(nx.topological_sort(c)))]
+    chunks, objects, memos = [], {}, []
+    for i, group in enumerate(groups):
+        start = stream.pos
+        if len(group) == 1:
+            data, shared = dumps[group[0]]
+            stream.write(data)
+        else:
+            p = _ChunkPickler(stream, modules, set(id(values[pos]) for pos in group))
+            p.dump(tuple(values[pos] for pos in group))
+            memos.append(shared := p.shared())
+        chunks.append( (start, stream.pos - start) )
+        for k, (idx, _) in iteritems(shared):
+            objects.setdefault(k, (i, idx))
+    return groups, chunks, (objects, dumps, memos)
+
+def dump_context(context, file_):
+    """Dump ``context`` into ``file_`` in the chunked format.
+
+    Args:
+        context (`Context`):
+        file_ (file-like object): The output stream. Must be opened in binary mode
+    """
+    stream = _CountingStream(file_)
+    stream.write(_HEADER.pack(_MAGIC, _FORMAT))
+    index = {"version": context.version}
+    # 1. summary
+    start = stream.pos
+    pickle.dump(context.summary, stream, pickle.HIGHEST_PROTOCOL)
+    index["summary"] = start, stream.pos - start
+    # 2. module chunks
+    database = context._database
+    modules = {}
+    for pos, module in enumerate(itervalues(database)):
+        modules.setdefault(id(module), pos)
+    try:
+        index["groups"], index["chunks"], (objects, *keepalive) = _dump_chunks(context, modules, stream)
+    except _Unchunkable:
+        # modules referencing the context: pickle the module database as part of the core
+        index["groups"], index["chunks"], objects, modules = [], [], {}, {}
+    # 3. core
+    start = stream.pos
+    special = {id(database): ("database", )} if index["groups"] else {}
+    p = _ChunkPickler(stream, modules, objects = objects, special = special)
+    p.dump( (tuple(database) if index["groups"] else None, context) )
+    index["core"] = start, stream.pos - start
+    index["referenced_chunks"] = sorted(p.chunk_refs)
+    # 4. index
+    start = stream.pos
+    pickle.dump(index, stream, pickle.HIGHEST_PROTOCOL)
+    stream.write(_FOOTER.pack(start))
+
+def is_chunked_context(file_):
+    """Test if ``file_`` is in the chunked format. The position of the stream is not changed.
+
+    Args:
+        file_ (file-like object): The input stream. Must be opened in binary mode and seekable
+    """
+    pos = file_.tell()
+    try:
+        header = file_.read(_HEADER.size)
+    finally:
+        file_.seek(pos)
+    return len(header) == _HEADER.size and header[:len(_MAGIC)] == _MAGIC
+
+def _read_index(file_):
+    start = file_.tell()
+    magic, format_ = _HEADER.unpack(file_.read(_HEADER.size))
+    if magic != _MAGIC:
+        raise PRGAAPIError("Not a chunked context file")
+    elif format_ != _FORMAT:
+        raise PRGAAPIError("Unsupported chunked context format: {}".format(format_))
+    file_.seek(-_FOOTER.size, 2)
+    offset, = _FOOTER.unpack(file_.read(_FOOTER.size))
+    file_.seek(start + offset)
+    return start, pickle.load(file_)
+
+def load_summary(file_):
+    """Load the summary from a chunked context file.
+
+    Args:
+        file_ (file-like object): The input stream. Must be opened in binary mode and seekable
+
+    Returns:
+        :obj:`tuple` [:obj:`str`, `ContextSummary` ]: The PRGA version that dumped the context, and the summary
+    """
+    start, index = _read_index(file_)
+    file_.seek(start + index["summary"][0])
+    return index["version"], pickle.load(file_)
+
+class _ChunkLoader(object):
+    """Loader of module chunks in a chunked context file."""
+
+    def __init__(self, file_, start, index, close):
+        self.file_ = file_
+        self.start = start
+        self.chunks = index["chunks"]
+        self.groups = index["groups"]
+        self.group_of = {}
+        for i, group in enumerate(self.groups):
+            for pos in group:
+                self.group_of[pos] = i
+        self.modules = [None] * len(self.group_of)
+        self.pending = len(self.groups)
+        self.memos = {}     # memos of chunks referenced by the core, only kept while the core is being loaded
+        self.referenced = set(index["referenced_chunks"])
+        self.close = close
+
+    def _unpickler(self, section):
+        offset, size = section
+        self.file_.seek(self.start + offset)
+        u = pickle.Unpickler(io.BytesIO(self.file_.read(size)))
+        u.persistent_load = self._persistent_load
+        return u
+
+    def _persistent_load(self, pid):
+        if pid[0] == "module":
+            return self.module(pid[1])
+        elif pid[0] == "object":
+            if (memo := self.memos.get(pid[1])) is None:
+                self._load_chunk(pid[1])
+                memo = self.memos[pid[1]]
+            return memo[pid[2]]
+        elif pid[0] == "database":
+            return self.database
+        raise PRGAInternalError("Unknown persistent ID: {}".format(pid))
+
+    def _load_chunk(self, i):
+        u = self._unpickler(self.chunks[i])
+        for pos, module in zip(self.groups[i], u.load()):
+            self.modules[pos] = module
+        self.pending -= 1
+        if self.memos is not None and i in self.referenced:
+            self.memos[i] = u.memo.copy()
+        elif self.pending == 0 and self.close:
+            self.file_.close()
+
+    def module(self, pos):
+        if (module := self.modules[pos]) is None:
+            self._load_chunk(self.group_of[pos])
+            module = self.modules[pos]
+        return module
+
+    def load_core(self, section):
+        self.database = LazyModuleDatabase(self)
+        keys, context = self._unpickler(section).load()
+        if keys is not None:
+            self.database._set_keys(keys)
+        self.memos = None
+        if self.pending == 0 and self.close:
+            self.file_.close()
+        return context
+
+class _Unloaded(object):
+    """Placeholder of a module not loaded yet."""
+
+    __slots__ = ["position"]
+    def __init__(self, position):
+        self.position = position
+
+class LazyModuleDatabase(MutableMapping):
+    """Module database which loads modules from a chunked context file on first access.
+
+    This database is pickled as a plain :obj:`dict`, loading all modules.
+    """
+
+    __slots__ = ["_loader", "_modules"]
+    def __init__(self, loader):
+        self._loader = loader
+        self._modules = {}
+
+    def _set_keys(self, keys):
+        for pos, key in enumerate(keys):
+            self._modules.setdefault(key, _Unloaded(pos))
+
+    def __getitem__(self, key):
+        if type(module := self._modules[key]) is _Unloaded:
+            module = self._modules[key] = self._loader.module(module.position)
+        return module
+
+    def __setitem__(self, key, value):
+        self._modules[key] = value
+
+    def __delitem__(self, key):
+        del self._modules[key]
+
+    def __contains__(self, key):
+        return key in self._modules
+
+    def __iter__(self):
+        return iter(self._modules)
+
+    def __len__(self):
+        return len(self._modules)
+
+    def __reduce__(self):
+        return dict, (), None, None, iter(list(iteritems(self)))
+
+    def loaded_values(self):
+        """Iterate over the modules that are already loaded, without loading the others."""
+        return (module for module in itervalues(self._modules) if type(module) is not _Unloaded)
+
+def load_context(file_, close = False):
+    """Load a context from a chunked context file.
+
+    Args:
+        file_ (file-like object): The input stream. Must be opened in binary mode and seekable. The stream must be
+            kept open until all modules are loaded
+        close (:obj:`bool`): If set, ``file_`` is closed when all modules are loaded
+    """
+    start, index = _read_index(file_)
+    loader = _ChunkLoader(file_, start, index, close)
+    return loader.load_core(index["core"])
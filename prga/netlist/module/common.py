@@ -109,16 +109,33 @@ class _Placeholder(Enum):
     placeholder = 0
 
 class _MemOptNonCoalescedNodeDict(MutableMapping):
+    """Node dict for bit-level connection graphs.
 
-    __slots__ = ['_dict']
+    Nodes in a non-coalesced connection graph are ``(index, bus_node)`` tuples. All bits of the same bus are stored in
+    one list indexed by the bit index, so getting, setting and deleting a bit are O(1), and the number of nodes is
+    tracked so ``len()`` is O(1) as well.
+    """
+
+    __slots__ = ['_dict', '_len']
     def __init__(self):
         self._dict = {}
+        self._len = 0
+
+    def __getstate__(self):
+        return {"_dict": self._dict}
+
+    def __setstate__(self, state):
+        # objects pickled by the tuple-based implementation carry a ``(None, slots)`` state
+        if isinstance(state, tuple):
+            _, state = state
+        self._dict = {key: list(l) for key, l in iteritems(state["_dict"])}
+        self._len = sum(1 for l in itervalues(self._dict) for item in l if item is not _Placeholder.placeholder)
 
     def __getitem__(self, k):
-        idx, key = k
         try:
+            idx, key = k
             v = self._dict[key][idx]
-        except (KeyError, IndexError):
+        except (KeyError, IndexError, TypeError, ValueError):
             raise KeyError(k)
         if v is _Placeholder.placeholder:
             raise KeyError(k)
@@ -129,28 +146,38 @@ class _MemOptNonCoalescedNodeDict(MutableMapping):
         try:
             l = self._dict[key]
         except KeyError:
-            l = tuple()
-            self._dict[key] = tuple(_Placeholder.placeholder for i in range(idx)) + (v, )
-        if idx >= len(l):
-            self._dict[key] = l +  tuple(_Placeholder.placeholder for i in range(idx - len(l))) + (v, )
+            l = self._dict[key] = []
+        if idx < len(l):
+            if l[idx] is _Placeholder.placeholder:
+                self._len += 1
+            l[idx] = v
         else:
-            self._dict[key] = tuple(v if i == idx else item for i, item in enumerate(l))
+            if idx > len(l):
+                l.extend([_Placeholder.placeholder] * (idx - len(l)))
+            l.append(v)
+            self._len += 1
 
     def __delitem__(self, k):
-        idx, key = k
-        l = self._dict[key]
-        if idx >= len(l):
+        try:
+            idx, key = k
+            l = self._dict[key]
+            v = l[idx]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise KeyError(k)
+        if v is _Placeholder.placeholder:
             raise KeyError(k)
-        elif idx == len(l) - 1:
-            if len(l) == 1:
+        self._len -= 1
+        if idx == len(l) - 1:
+            l.pop()
+            while l and l[-1] is _Placeholder.placeholder:
+                l.pop()
+            if not l:
                 del self._dict[key]
-            else:
-                self._dict[key] = tuple(iter(l[:-1]))
         else:
-            self._dict[key] = tuple(_Placeholder.placeholder if i == idx else item for i, item in enumerate(l))
+            l[idx] = _Placeholder.placeholder
 
     def __len__(self):
-        return sum(1 for _ in iter(self))
+        return self._len
 
     def __iter__(self):
         for key, l in iteritems(self._dict):
@@ -158,6 +185,65 @@ class _MemOptNonCoalescedNodeDict(MutableMapping):
                 if item is not _Placeholder.placeholder:
                     yield idx, key
 
+# ----------------------------------------------------------------------------
+# -- Node ID Table -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+class NodeIDTable(Object):
+    """Bidirectional mapping between (hierarchical) connection graph nodes and dense integer IDs.
+
+    IDs are assigned in the order nodes are first seen and never reused.
+    """
+
+    __slots__ = ['_ids', '_nodes']
+    def __init__(self):
+        self._ids = {}
+        self._nodes = []
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __getitem__(self, id_):
+        """:obj:`Hashable`: Get the node with ID ``id_``."""
+        return self._nodes[id_]
+
+    def __iter__(self):
+        """Iterate over the nodes in the order of their IDs."""
+        return iter(self._nodes)
+
+    def id_of(self, node):
+        """:obj:`int`: Get the ID of ``node``. A new ID is assigned if ``node`` is not seen before."""
+        try:
+            return self._ids[node]
+        except KeyError:
+            id_ = self._ids[node] = len(self._nodes)
+            self._nodes.append(node)
+            return id_
+
+# ----------------------------------------------------------------------------
+# -- Driver Index ------------------------------------------------------------
+# ----------------------------------------------------------------------------
+class DriverIndex(Object):
+    """Drivers of the sinks in a connection graph that does not coalesce connections, as returned by
+    `NetUtils.get_source` and `NetUtils.get_multisource`.
+
+    Entries are dropped by `NetUtils.connect` and `NetUtils._add_edges` when their sinks are connected. The index
+    must be cleared when the connection graph is modified otherwise. The index is a cache: it is not preserved when
+    pickled.
+    """
+
+    __slots__ = ['sources', 'multisources']
+    def __init__(self):
+        self.sources = {}       # bus node -> (start, stop) of a slice, or None for the bus -> source
+        self.multisources = {}  # bit node -> sources
+
+    def __reduce__(self):
+        return type(self), tuple()
+
+    def clear(self):
+        """Drop all entries."""
+        self.sources.clear()
+        self.multisources.clear()
+
 _attr_dict_factories = {}
 def _get_attr_dict_factory(slots = tuple()):
     slots = tuple(sorted(slots))
@@ -265,8 +351,8 @@ def _get_conn_graph_factory(
 
             def __reduce__(self):
                 d = copy(self.__dict__)
-                del d["node_attr_dict_factory"]
-                del d["edge_attr_dict_factory"]
+                d.pop("node_attr_dict_factory", None)
+                d.pop("edge_attr_dict_factory", None)
                 return ConnGraph, (True, node_attr_slots, edge_attr_slots), d
 
         factory = _ConnGraph
@@ -281,10 +367,10 @@ def _get_conn_graph_factory(
 
             def __reduce__(self):
                 d = copy(self.__dict__)
-                del d["node_dict_factory"]
-                del d["node_attr_dict_factory"]
-                del d["adjlist_outer_dict_factory"]
-                del d["edge_attr_dict_factory"]
+                d.pop("node_dict_factory", None)
+                d.pop("node_attr_dict_factory", None)
+                d.pop("adjlist_outer_dict_factory", None)
+                d.pop("edge_attr_dict_factory", None)
                 return ConnGraph, (False, node_attr_slots, edge_attr_slots), d
 
         factory = _ConnGraph
@@ -299,6 +385,9 @@ def ConnGraph(
         edge_attr_slots = tuple()):
     """Construct a memory-optimized connection graph.
 
+    Drivers in a connection graph that does not coalesce connections are cached in `DriverIndex`, so connections
+    must be added by `NetUtils.connect` or `NetUtils._add_edges` rather than directly into the graph.
+
     Args:
         coalesce_connections (:obj:`bool`): If set to ``True``, not bitwise connections are allowed in the connection
             graph
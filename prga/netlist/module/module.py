@@ -5,7 +5,7 @@
 from __future__ import division, absolute_import, print_function
 from prga.compatible import *
 
-from .common import AbstractModule, ConnGraph
+from .common import AbstractModule, ConnGraph, DriverIndex
 from ...util import Object, ReadonlyMappingProxy, uno
 from ...exception import PRGAInternalError
 
@@ -46,7 +46,7 @@ class Module(Object, AbstractModule):
     """
 
     __slots__ = ['_name', '_key', '_children', '_ports', '_instances', '_conn_graph',
-            '_allow_multisource', '_coalesce_connections', '__dict__']
+            '_allow_multisource', '_coalesce_connections', '_driver_index_table', '__dict__']
 
     # == internal API ========================================================
     def __init__(self, name, *,
@@ -126,6 +126,15 @@ class Module(Object, AbstractModule):
         # add instance to children mapping
         return self._children.setdefault(instance.name, instance)
 
+    @property
+    def _driver_index(self):
+        """`DriverIndex`: Drivers of the sinks in this module."""
+        try:
+            return self._driver_index_table
+        except AttributeError:
+            index = self._driver_index_table = DriverIndex()
+            return index
+
     # -- implementing properties/methods required by superclass --------------
     @property
     def name(self):
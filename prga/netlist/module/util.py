@@ -6,6 +6,7 @@ from __future__ import division, absolute_import, print_function
 from prga.compatible import *
 
 from .module import Module
+from .common import NodeIDTable
 from .instance import Instance
 from ..net.common import PortDirection
 from ..net.util import NetUtils
@@ -124,37 +125,62 @@ class ModuleUtils(object):
     #         graph.add_node(node, clock_group = clock_group)
 
     @classmethod
-    def _elaborate_sub_timing_graph(cls, module, graph, blackbox_instance, instance = None,
+    def _elaborate_sub_timing_graph(cls, model, blackbox_instance, templates, node_ids = None,
             coalesce_connections = False, elaborate_clocks = False):
-        model = instance.model if instance is not None else module
-        hierarchy = tuple(inst.key for inst in instance.hierarchy) if instance is not None else tuple()
+        """Elaborate the timing graph of ``model`` and all its sub-instances that are not blackboxed.
+
+        Args:
+            model (`AbstractModule`): The module to be elaborated
+            blackbox_instance (:obj:`Function` [`AbstractInstance` ] -> :obj:`bool`): See
+                `ModuleUtils.reduce_timing_graph`
+            templates (:obj:`MutableMapping` [:obj:`Hashable`, :obj:`tuple` ]): Memo of the elaborated timing graphs
+                of sub-modules, indexed by module keys. The elaborated graph of each unique sub-module is built once
+                and stamped out for each of its instances, with the key of the instance appended to the hierarchy
+            node_ids (`NodeIDTable`): IDs of the nodes in the elaborated graph. If not set, a new table is used
+            coalesce_connections (:obj:`bool`):
+            elaborate_clocks (:obj:`bool`):
+
+        Returns:
+            :obj:`tuple` [`NodeIDTable`, :obj:`list` [:obj:`tuple` [:obj:`int`, :obj:`int` ]]]: ``node_ids``, and
+                the elaborated edges on the IDs of the nodes. Nodes are relative to ``model``
+        """
+        if node_ids is None:
+            node_ids = NodeIDTable()
+        id_of = node_ids.id_of
         # 1. add connections in this model to the timing graph
         if coalesce_connections:
             if not model._coalesce_connections:
                 raise PRGAInternalError("{} supports bit-wise connections".format(model))
-            for u, v in model._conn_graph.edges:
-                graph.add_edge(u + hierarchy, v + hierarchy)
-        elif model._coalesce_connections:
-            for u, v in model._conn_graph.edges:
-                bu, bv = map(lambda node: NetUtils._dereference(model, node, coalesced = True), (u, v))
-                assert len(bu) == len(bv)
-                for i in range(len(bu)):
-                    graph.add_edge((i, u + hierarchy), (i, v + hierarchy))
+            edges = [(id_of(u), id_of(v)) for u, v in model._conn_graph.edges]
+            stamp = lambda node, hierarchy: node + hierarchy
         else:
-            for u, v in model._conn_graph.edges:
-                graph.add_edge((u[0], u[1] + hierarchy), (v[0], v[1] + hierarchy))
+            if model._coalesce_connections:
+                edges = []
+                for u, v in model._conn_graph.edges:
+                    bu, bv = map(lambda node: NetUtils._dereference(model, node, coalesced = True), (u, v))
+                    assert len(bu) == len(bv)
+                    for i in range(len(bu)):
+                        edges.append( (id_of((i, u)), id_of((i, v))) )
+            else:
+                edges = [(id_of(u), id_of(v)) for u, v in model._conn_graph.edges]
+            stamp = lambda node, hierarchy: (node[0], node[1] + hierarchy)
         # 2. elaborate clocks
         if elaborate_clocks:
             raise NotImplementedError("Unsupported option: elaborate_clocks")
             # cls._elaborate_clocks(module, graph, instance, coalesce_connections)
-        # 3. elaborate sub-instances
+        # 3. stamp out the elaborated timing graphs of sub-instances
         for sub in itervalues(model.instances):
-            if instance is not None:
-                sub = sub.extend_hierarchy(above = instance)
             if blackbox_instance(sub):
                 continue
-            cls._elaborate_sub_timing_graph(module, graph, blackbox_instance, sub,
-                    coalesce_connections, elaborate_clocks)
+            if (template := templates.get(sub.model.key)) is None:
+                template = templates[sub.model.key] = cls._elaborate_sub_timing_graph(sub.model,
+                        blackbox_instance, templates, coalesce_connections = coalesce_connections,
+                        elaborate_clocks = elaborate_clocks)
+            sub_ids, sub_edges = template
+            hierarchy = (sub.key, )
+            ids = [id_of(stamp(node, hierarchy)) for node in sub_ids]
+            edges.extend( (ids[u], ids[v]) for u, v in sub_edges )
+        return node_ids, edges
 
     @classmethod
     def reduce_timing_graph(cls, module, *,
@@ -173,55 +199,67 @@ class ModuleUtils(object):
             graph: Output graph. If not set, a new `networkx.DiGraph`_ is used
             blackbox_instance (:obj:`Function` [`AbstractInstance` ] -> :obj:`bool`): A function testing if an
                 instance should be blackboxed during elaboration. If ``True`` is returned, everything inside the
-                instance will be ignored. Only the pins of the instance will be kept.
+                instance will be ignored. Only the pins of the instance will be kept. The function is called once
+                for each instance in each unique module, so it must not depend on the hierarchy above the instance
             create_node (:obj:`Function` [`AbstractModule`, :obj:`Hashable` ] -> :obj:`Mapping`): A function that
                 returns a node attribute mapping. Return ``None`` if the node should be discarded
             create_path (:obj:`Function` [`AbstractModule`, :obj:`Sequence` [:obj:`Hashable` ] -> :obj:`Mapping`): A
                 function that returns an edge attribute mapping
             coalesce_connections (:obj:`bool`): If set, the reduced timing graph coalesce bus connections
 
+        The elaborated graph is built and reduced on dense integer IDs assigned to the nodes in a `NodeIDTable`
+        local to this call. Nodes in the output graph, and nodes passed to ``create_node`` and ``create_edge``, are
+        the original hierarchical nodes. The elaborated graph of each unique sub-module is built once and reused for
+        all its instances.
+
         .. _networkx.DiGraph: https://networkx.github.io/documentation/stable/reference/classes/digraph.html
         """
         if graph is None:
             graph = DiGraph()
-        tmp = type(graph)()
+        tmp = DiGraph()
         # 1. phase 1: elaborate the entire timing graph
-        cls._elaborate_sub_timing_graph(module, tmp, blackbox_instance, coalesce_connections = coalesce_connections)
+        node_ids, elaborated = cls._elaborate_sub_timing_graph(module, blackbox_instance, {},
+                coalesce_connections = coalesce_connections)
+        tmp.add_edges_from(elaborated)
         # 2. phase 2: reduce the timing graph
+        kept, edges = set(), set()  # IDs of the nodes/edges added into ``graph``
+        track_path = create_edge is not None
+        def add_edge(prev, tail, path):
+            if (prev, tail) in edges:
+                raise PRGAInternalError("Multiple paths found from {} to {}"
+                        .format(NetUtils._dereference(module, prev, node_ids = node_ids),
+                            NetUtils._dereference(module, tail, node_ids = node_ids)))
+            edges.add( (prev, tail) )
+            if track_path:
+                graph.add_edge(node_ids[prev], node_ids[tail],
+                        **create_edge(module, tuple(node_ids[i] for i in (prev, ) + path)))
+            else:
+                graph.add_edge(node_ids[prev], node_ids[tail])
         for node in tmp:
             # 2.1 filter out leaf nodes
             if tmp.out_degree(node) > 0:
                 continue
-            if (attributes := create_node(module, node)) is not None:
-                graph.add_node(node, **attributes)
+            if (attributes := create_node(module, node_ids[node])) is not None:
+                graph.add_node(node_ids[node], **attributes)
+                kept.add(node)
             # 2.2 DFS
             #         head node, tail node,                            path
             stack = [(node,      None if attributes is None else node, None if attributes is None else (node, ))]
             while stack:
                 head, tail, path = stack.pop()
                 for prev in tmp.predecessors(head):
-                    if prev in graph:                   # previous node already processed
-                        if tail is None:
-                            continue
-                        elif (prev, tail) in graph.edges:
-                            raise PRGAInternalError("Multiple paths found from {} to {}"
-                                    .format(NetUtils._dereference(module, prev),
-                                        NetUtils._dereference(module, tail)))
-                        elif create_edge is not None:
-                            graph.add_edge(prev, tail, **create_edge(module, (prev, ) + path))
-                        else:
-                            graph.add_edge(prev, tail)
+                    if prev in kept:                    # previous node already processed
+                        if tail is not None:
+                            add_edge(prev, tail, path)
                         continue
-                    if (prev_attrs := create_node(module, prev)) is not None:
-                        graph.add_node(prev, **prev_attrs)
+                    if (prev_attrs := create_node(module, node_ids[prev])) is not None:
+                        graph.add_node(node_ids[prev], **prev_attrs)
+                        kept.add(prev)
                         if tail is not None:
-                            if create_edge is not None:
-                                graph.add_edge(prev, tail, **create_edge(module, (prev, ) + path))
-                            else:
-                                graph.add_edge(prev, tail)
+                            add_edge(prev, tail, path)
                         stack.append( (prev, prev, (prev, )) )
                     elif tail is not None:
-                        stack.append( (prev, tail, (prev, ) + path) )
+                        stack.append( (prev, tail, ((prev, ) + path) if track_path else path) )
                     else:
                         stack.append( (prev, None, None) )
         return graph
@@ -61,19 +61,25 @@ class NetUtils(object):
             return (0, net.node) if net.bus_type.is_nonref else net.node
 
     @classmethod
-    def _dereference(cls, module, node, *, coalesced = False):
+    def _dereference(cls, module, node, *, coalesced = False, node_ids = None):
         """Dereference ``node`` in ``modules``'s connection graph.
 
         Args:
             module (`AbstractModule`):
-            node (:obj:`tuple` [:obj:`int`, :obj:`tuple` [:obj:`Hashable`, ... ]]):
+            node (:obj:`tuple` [:obj:`int`, :obj:`tuple` [:obj:`Hashable`, ... ]] or :obj:`int`): The node, or its
+                ID in ``node_ids``
 
         Keyword Args:
             coalesced (:obj:`bool`): Set if ``node`` is a reference to a bus
+            node_ids (`NodeIDTable`): Required if ``node`` is an ID
 
         Return:
             net (`Port`, `Pin`, `Slice` or `Const`): 
         """
+        if isinstance(node, int):
+            if node_ids is None:
+                raise PRGAInternalError("No ID table given to dereference node ID {}".format(node))
+            node = node_ids[node]
         # no matter if `coalesced` is set, check if the node refers to a constant net
         if node[0] is NetType.const:
             return Const(*node[1:])
@@ -91,6 +97,121 @@ class NetUtils(object):
         else:
             return bus
 
+    @classmethod
+    def _resolve_hierarchy(cls, module, net_key, resolved):
+        """Determine in which module to navigate from ``net_key``, based on the elaboration status of the
+        hierarchy.
+
+        Args:
+            module (`AbstractModule`): Top-level module to perform navigation
+            net_key (:obj:`tuple`): Hierarchical key of the net
+            resolved (:obj:`MutableMapping`): Memo of the resolutions, indexed by the hierarchical part of
+                ``net_key``
+
+        Returns:
+            :obj:`tuple` [`AbstractModule`, :obj:`tuple`, :obj:`tuple` ]: The module, the hierarchy key of the
+                module, and the key of the net in the module
+        """
+        # the resolution only depends on the hierarchical part of the key
+        if (r := resolved.get(net_key[1:])) is None:
+            key, model, hierarchy_key = net_key, module, tuple()
+            while len(key) >= 3 and key[2:] not in model._elaborated:
+                done = False
+                for split in range(3, len(key) - 1):
+                    cur_up, cur_down = key[split:], key[:split]
+                    if cur_up in model._elaborated:
+                        model = model.hierarchy[cur_up].model
+                        hierarchy_key, key = cur_up + hierarchy_key, cur_down
+                        done = True
+                        break
+                if not done:
+                    model = model.instances[key[-1]].model
+                    hierarchy_key, key = key[-1:] + hierarchy_key, key[:-1]
+            r = resolved[net_key[1:]] = model, hierarchy_key, len(key)
+        model, hierarchy_key, length = r
+        return model, hierarchy_key, net_key[:length]
+
+    @classmethod
+    def _predecessors(cls, module, node, resolved):
+        """Get the hierarchical predecessors of ``node``.
+
+        Returns:
+            :obj:`list` [:obj:`tuple` [:obj:`Hashable`, :obj:`bool` ]]: The predecessors, and if they are clocks
+        """
+        idx, net_key = node
+        model, hierarchy_key, net_key = cls._resolve_hierarchy(module, net_key, resolved)
+        while True:
+            try:
+                nodes = tuple(model._conn_graph.predecessors(
+                    net_key if model._coalesce_connections else (idx, net_key) ))
+            except NetworkXError:
+                nodes = tuple()
+            if nodes:
+                attrs = model._conn_graph.nodes
+                if model._coalesce_connections:
+                    return [((idx, n + hierarchy_key), 'clock' in attrs[n]) for n in nodes]
+                else:
+                    return [((n[0], n[1] + hierarchy_key), 'clock' in attrs[n]) for n in nodes]
+            # one more chance if this net is an output pin of a leaf instance (in terms of elaboration)
+            if len(net_key) == 1 or net_key[1:] in model._elaborated:
+                return []
+            model, hierarchy_key = model.hierarchy[net_key[1:]].model, net_key[1:] + hierarchy_key
+            net_key = net_key[:1]
+
+    @classmethod
+    def _navigate_backwards_batch(cls, module, endpoints, *,
+            path = tuple(),
+            yield_ = lambda module, node: True,
+            stop = lambda module, node: False,
+            skip = lambda module, node: False,
+            limit = None):
+        """Navigate the connection graph backwards from each of ``endpoints`` in turn, yielding startpoints and paths
+        from the startpoints to the endpoints. Refer to `NetUtils._navigate_backwards` for the arguments.
+
+        Args:
+            module (`AbstractModule`): Top-level module to perform navigation
+            endpoints (:obj:`Iterable` [:obj:`Hashable` ]): Endpoints for the navigation
+
+        Keyword Arguments:
+            limit (:obj:`int`): If set, the navigation from an endpoint stops after ``limit`` paths are yielded
+
+        Yields:
+            :obj:`tuple` [:obj:`Hashable`, :obj:`Sequence` [:obj:`Hashable` ]]: an endpoint and a path to it
+        """
+        resolved = {}
+        for endpoint in endpoints:
+            if limit is not None and limit <= 0:
+                continue
+            count = 0
+            # paths are linked lists of (node, rest of the path towards the endpoint), so that prefixes are shared
+            # stack of (iterator over the predecessors, path to the node, the node)
+            stack = [(iter(cls._predecessors(module, endpoint, resolved)), None, endpoint)]
+            visiting = {endpoint}
+            while stack:
+                it, link, node = stack[-1]
+                for cur, is_clock in it:
+                    next_link = link if skip( module, cur ) else (cur, link)
+                    if yield_( module, cur ):
+                        ret, l = [], next_link
+                        while l is not None:
+                            ret.append( l[0] )
+                            l = l[1]
+                        yield endpoint, tuple(ret) + path
+                        if limit is not None and (count := count + 1) >= limit:
+                            stack = []
+                            break
+                    if stop( module, cur ) or is_clock:
+                        continue
+                    if cur in visiting:
+                        raise PRGAInternalError("Combinational loop found at {} when navigating from {}"
+                                .format(cur, endpoint))
+                    visiting.add(cur)
+                    stack.append( (iter(cls._predecessors(module, cur, resolved)), next_link, cur) )
+                    break
+                else:
+                    visiting.discard(node)
+                    stack.pop()
+
     @classmethod
     def _navigate_backwards(cls, module, endpoint, *,
             path = tuple(),
@@ -106,7 +227,7 @@ class NetUtils(object):
 
         Keyword Arguments:
             path (:obj:`Sequence` [:obj:`Hashable` ]): An additional path appended to any path reported by this
-                method. This is mainly used in recusive calls to this method
+                method
             yield_ (:obj:`Function` [`AbstractModule`, :obj:`Hashable` ] -> :obj:`bool`): Test if
                 a path should be yielded when reaching this node
             stop (:obj:`Function` [`AbstractModule`, :obj:`Hashable` ] -> :obj:`bool`): Test if
@@ -116,50 +237,13 @@ class NetUtils(object):
 
         Yields:
             path (:obj:`Sequence` [:obj:`Hashable` ]): a path to the endpoint
+
+        The navigation is depth-first with an explicit stack, so deep hierarchies or long paths do not hit the
+        recursion limit.
         """
-        # 1. disassemble the node
-        idx, net_key = endpoint
-        # 2. check elaboration status and determine in which module to do the navigation
-        model, hierarchy_key = module, tuple()
-        while len(net_key) >= 3 and net_key[2:] not in model._elaborated:
-            done = False
-            for split in range(3, len(net_key) - 1):
-                cur_up, cur_down = net_key[split:], net_key[:split]
-                if cur_up in model._elaborated:
-                    model = model.hierarchy[cur_up].model
-                    hierarchy_key, net_key = cur_up + hierarchy_key, cur_down
-                    done = True
-                    break
-            if not done:
-                model = model.instances[net_key[-1]].model
-                hierarchy_key, net_key = net_key[-1:] + hierarchy_key, net_key[:-1]
-        # 3. move forward
-        while True:
-            while True:
-                try:
-                    nodes = tuple(model._conn_graph.predecessors( 
-                        net_key if model._coalesce_connections else (idx, net_key) ))
-                except NetworkXError:
-                    break
-                if not nodes:
-                    break
-                for node in nodes:
-                    cur = ((idx, node + hierarchy_key) if model._coalesce_connections else 
-                            (node[0], node[1] + hierarchy_key))
-                    next_path = path if skip( module, cur ) else ((cur, ) + path)
-                    if yield_( module, cur ):
-                        yield next_path
-                    if stop( module, cur ) or 'clock' in model._conn_graph.nodes[node]:
-                        continue
-                    for p in cls._navigate_backwards(module, cur,
-                            path = next_path, yield_ = yield_, stop = stop, skip = skip):
-                        yield p
-                return
-            # 4. one more chance if this net is an output pin of a leaf instance (in terms of elaboration)
-            if len(net_key) == 1 or net_key[1:] in model._elaborated:
-                return
-            model, hierarchy_key = model.hierarchy[net_key[1:]].model, net_key[1:] + hierarchy_key
-            net_key = net_key[:1]
+        for _, p in cls._navigate_backwards_batch(module, (endpoint, ),
+                path = path, yield_ = yield_, stop = stop, skip = skip):
+            yield p
 
     @classmethod
     def concat(cls, items, *, skip_flatten = False):
@@ -203,6 +287,115 @@ class NetUtils(object):
         else:
             return Concat(tuple(iter(concat)))
 
+    @classmethod
+    def _validate_connection(cls, module, src, sink):
+        """Validate the connection from ``src`` to ``sink`` in ``module``.
+
+        Returns:
+            :obj:`bool`: ``False`` if the connection should be skipped, i.e. ``src`` is unconnected
+        """
+        if not src.is_source:
+            raise PRGAInternalError("'{}' is not a valid source".format(src))
+        elif not src.net_type.is_const and src.parent is not module:
+            raise PRGAInternalError("Cannot connect {}: different parent module".format(src))
+        elif not sink.is_sink and not (module.is_cell and src.is_clock and not sink.is_clock):
+            raise PRGAInternalError("'{}' is not a valid sink".format(sink))
+        elif sink.parent is not module:
+            raise PRGAInternalError("Cannot connect {}: different parent module".format(sink))
+        elif sink.is_clock and not src.is_clock:
+            raise PRGAInternalError("{} is a clock but {} is not".format(sink, src))
+        elif src.net_type.is_const and src.value is None:
+            return False
+        return True
+
+    @classmethod
+    def _segments(cls, bus):
+        """Split ``bus`` into its items, each with the references to its bits. Unconnected bits are referred to as
+        ``None``."""
+        segments = []
+        for item in (bus.items if bus.bus_type.is_concat else (bus, )):
+            if item.net_type.is_const:
+                if (value := item.value) is None:
+                    nodes = [None] * len(item)
+                else:
+                    nodes = [(0, Const(value >> i, 1).node) for i in range(len(item))]
+            elif item.bus_type.is_slice:
+                start, node = item.index.start, item.bus.node
+                nodes = [(start + i, node) for i in range(len(item))]
+            else:
+                node = item.node
+                nodes = [(i, node) for i in range(len(item))]
+            segments.append( (item, nodes) )
+        return segments
+
+    @classmethod
+    def _connect_bitwise(cls, module, sources, sinks, fully, kwargs):
+        """Connect ``sources`` and ``sinks`` bit by bit in ``module``, which does not coalesce connections.
+
+        Nets are validated once for each pair of source and sink items, with the bits connected between them
+        validated together. Connections are only made after all of them are validated.
+        """
+        src_segments, sink_segments = cls._segments(sources), cls._segments(sinks)
+        # 1. validate each pair of items, or the parts of them connected to each other
+        if fully:
+            for (src, _), (sink, _) in product(src_segments, sink_segments):
+                cls._validate_connection(module, src, sink)
+        else:
+            i, j, src_offset, sink_offset = 0, 0, 0, 0
+            while i < len(src_segments) and j < len(sink_segments):
+                (src, src_nodes), (sink, sink_nodes) = src_segments[i], sink_segments[j]
+                step = min(len(src_nodes) - src_offset, len(sink_nodes) - sink_offset)
+                cls._validate_connection(module,
+                        src[src_offset:src_offset + step], sink[sink_offset:sink_offset + step])
+                src_offset += step
+                sink_offset += step
+                if src_offset == len(src_nodes):
+                    i, src_offset = i + 1, 0
+                if sink_offset == len(sink_nodes):
+                    j, sink_offset = j + 1, 0
+        # 2. check multi-source connections, including the ones made in this call
+        src_nodes = [node for _, nodes in src_segments for node in nodes]
+        sink_nodes = [node for _, nodes in sink_segments for node in nodes]
+        pairs = product(src_nodes, sink_nodes) if fully else zip(src_nodes, sink_nodes)
+        if module._allow_multisource:
+            edges = [(src, sink) for src, sink in pairs if src is not None]
+        else:
+            edges, drivers, pred = [], {}, module._conn_graph.pred
+            for src, sink in pairs:
+                if src is None:
+                    continue
+                if (driver := drivers.get(sink, False)) is False:
+                    driver = next(iter(pred[sink]), None) if sink in pred else None
+                if driver is None:
+                    drivers[sink] = src
+                elif driver != src:
+                    raise PRGAInternalError(
+                            "'{}' does not support multi-source connections. ('{}' is already connected to '{}')"
+                            .format(module, cls._dereference(module, sink), cls._dereference(module, driver)))
+                edges.append( (src, sink) )
+        # 3. connect!
+        cls._add_edges(module, edges, **kwargs)
+
+    @classmethod
+    def _add_edges(cls, module, edges, **kwargs):
+        """Add ``edges`` into the connection graph of ``module`` without validation, and drop the cached drivers of
+        their sinks.
+
+        Connections must be added into the connection graph of a module that does not coalesce connections either
+        by `NetUtils.connect` or by this method, otherwise `NetUtils.get_source` and `NetUtils.get_multisource` may
+        return outdated results.
+        """
+        module._conn_graph.add_edges_from(edges, **kwargs)
+        if module._coalesce_connections:
+            return
+        index = module._driver_index
+        if index.sources:
+            for _, (_, bus) in edges:
+                index.sources.pop(bus, None)
+        if index.multisources:
+            for _, sink in edges:
+                index.multisources.pop(sink, None)
+
     @classmethod
     def connect(cls, sources, sinks, *, fully = False, **kwargs):
         """Connect ``sources`` and ``sinks``.
@@ -214,6 +407,8 @@ class NetUtils(object):
         Keyword Args:
             fully (:obj:`bool`): If set, every bit in ``sources`` is connected to all bits in ``sinks``.
             **kwargs: Custom attibutes assigned all connections
+
+        All connections are validated before any of them is made.
         """
         # 1. concat the sources & sinks
         sources, sinks = map(cls.concat, (sources, sinks))
@@ -243,22 +438,13 @@ class NetUtils(object):
         if not fully and len(sources) != len(sinks):
             _logger.warning("Width mismatch: len({}) = {} != len({}) = {}"
                     .format(sources, len(sources), sinks, len(sinks)))
-        pairs = product(sources, sinks) if fully else zip(sources, sinks)
-        for src, sink in pairs:
-            if not src.is_source:
-                raise PRGAInternalError("'{}' is not a valid source".format(src))
-            elif not src.net_type.is_const and src.parent is not module:
-                raise PRGAInternalError("Cannot connect {}: different parent module".format(src))
-            elif not sink.is_sink and not (module.is_cell and src.is_clock and not sink.is_clock):
-                raise PRGAInternalError("'{}' is not a valid sink".format(sink))
-            elif sink.parent is not module:
-                raise PRGAInternalError("Cannot connect {}: different parent module".format(sink))
-            elif sink.is_clock and not src.is_clock:
-                raise PRGAInternalError("{} is a clock but {} is not".format(sink, src))
-            elif src.net_type.is_const and src.value is None:
+        if not module._coalesce_connections:
+            cls._connect_bitwise(module, sources, sinks, fully, kwargs)
+            return
+        for src, sink in zip(sources, sinks):
+            if not cls._validate_connection(module, src, sink):
                 continue
-            src_node, sink_node = map(lambda x: cls._reference(x, coalesced = module._coalesce_connections),
-                    (src, sink))
+            src_node, sink_node = map(lambda x: cls._reference(x, coalesced = True), (src, sink))
             if not (module._allow_multisource or
                     sink_node not in module._conn_graph or 
                     module._conn_graph.in_degree( sink_node ) == 0 or
@@ -268,6 +454,37 @@ class NetUtils(object):
                         .format(module, sink, cls.get_source(sink)))
             module._conn_graph.add_edge( src_node, sink_node, **kwargs )
 
+    @classmethod
+    def _get_bitwise_source(cls, sink):
+        """Get the source connected to ``sink`` in a module that does not coalesce connections.
+
+        Consecutive bits driven by consecutive bits of the same bus are collected into one slice, and each source
+        bus is dereferenced only once.
+        """
+        module = sink.parent
+        pred = module._conn_graph.pred
+        start, node = (sink.index.start, sink.bus.node) if sink.bus_type.is_slice else (0, sink.node)
+        runs = []   # [source bus node or None if unconnected, start, stop]
+        for i in range(start, start + len(sink)):
+            bit = i, node
+            if bit in pred and (src := next(iter(pred[bit]), None)) is not None:
+                idx, bus = src
+            else:
+                idx, bus = 0, None
+            if runs and runs[-1][0] == bus and (bus is None or runs[-1][2] == idx):
+                runs[-1][2] += 1
+            else:
+                runs.append( [bus, idx, idx + 1] )
+        items, buses = [], {}
+        for bus, start, stop in runs:
+            if bus is None:
+                items.append( Const(width = stop - start) )
+            else:
+                if (net := buses.get(bus)) is None:
+                    net = buses[bus] = cls._dereference(module, bus, coalesced = True)
+                items.append( cls._slice(net, slice(start, stop)) )
+        return cls.concat(items, skip_flatten = True)
+
     @classmethod
     def get_source(cls, sink, *, return_none_if_unconnected = False):
         """Get the source connected to ``sink``. This method is for accessing connections in modules that do not allow
@@ -286,15 +503,13 @@ class NetUtils(object):
             except (StopIteration, NetworkXError):
                 ret = Const( width = len(sink) )
         else:
-            sources = []
-            for bit in sink:
-                try:
-                    node = next(sink.parent._conn_graph.predecessors( cls._reference(bit) ))
-                    sources.append( cls._dereference(sink.parent, node) )
-                except (StopIteration, NetworkXError):
-                    sources.append( Const(width = 1) )
-            ret = cls.concat(sources)
-            
+            node, key = (sink.bus.node, (sink.index.start, sink.index.stop)) if sink.bus_type.is_slice else (
+                    sink.node, None)
+            if (sources := (index := sink.parent._driver_index.sources).get(node)) is None:
+                sources = index[node] = {}
+            if (ret := sources.get(key)) is None:
+                ret = sources[key] = cls._get_bitwise_source(sink)
+
         if return_none_if_unconnected and ret.bus_type.is_nonref and ret.net_type.is_const and ret.value is None:
             return None
         else:
@@ -310,11 +525,16 @@ class NetUtils(object):
             raise PRGAInternalError("{} is not 1-bit wide".format(sink))
         elif not sink.parent._allow_multisource:
             raise PRGAInternalError("'{}' does not allow multi-source connections".format(sink.parent))
+        index = sink.parent._driver_index.multisources
+        if (ret := index.get(node := cls._reference(sink))) is not None:
+            return ret
         try:
-            return cls.concat( iter(cls._dereference(sink.parent, node) for node in
-                    sink.parent._conn_graph.predecessors( cls._reference(sink) )) )
+            ret = cls.concat( iter(cls._dereference(sink.parent, node) for node in
+                    sink.parent._conn_graph.predecessors( node )) )
         except NetworkXError:
-            return Const()
+            ret = Const()
+        index[node] = ret
+        return ret
     @classmethod
 
     def get_connection(cls, source, sink):
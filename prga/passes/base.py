@@ -35,6 +35,42 @@ class AbstractPass(Abstract):
         """:obj:`bool`: Test if this is a read-only pass that can be run multiple times."""
         return False
 
+    @property
+    def output_files(self):
+        """:obj:`Sequence` [:obj:`str` ]: Files generated by this pass, or ``None`` if unknown.
+
+        Read-only passes that know all their output files, `AbstractPass.fingerprint_inputs` and
+        `AbstractPass.fingerprint_state` may be skipped by `Flow` when their results are found in the cache.
+        """
+        return None
+
+    def fingerprint_inputs(self, context):
+        """Parts of ``context`` read by this pass, or ``None`` if unknown.
+
+        `Flow` keys the cached results of this pass on a fingerprint of the returned object,
+        `AbstractPass.fingerprint_state` and the context summary. Other references to ``context`` are fingerprinted
+        as a placeholder, so the returned object must cover everything this pass reads besides the summary.
+
+        Args:
+            context (`Context`):
+        """
+        return None
+
+    @property
+    def fingerprint_state(self):
+        """Configuration of this pass that affects its outputs, or ``None`` if unknown.
+
+        `Flow` fingerprints this instead of the pass object, so options that do not change the outputs (e.g. the
+        number of worker processes) and data kept by the pass after it is run do not invalidate the cache.
+        """
+        return None
+
+    @property
+    def profile_counters(self):
+        """:obj:`Mapping` [:obj:`str`, :obj:`int` ]: Custom counters reported to `FlowProfiler` after this pass is
+        run, or ``None``."""
+        return None
+
     @property
     def dependences(self):
         """Passes that this pass depend on."""
@@ -7,7 +7,19 @@ from ..util import Object, uno
 from ..exception import PRGAInternalError, PRGAAPIError
 
 import networkx as nx
+from itertools import chain
 import time
+import os
+import shutil
+import hashlib
+import tempfile
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 import logging
 _logger = logging.getLogger(__name__)
@@ -17,16 +29,108 @@ __all__ = ["Flow"]
 # ----------------------------------------------------------------------------
 # -- Flow --------------------------------------------------------------------
 # ----------------------------------------------------------------------------
+class _Fingerprinter(pickle.Pickler):
+    """Pickler producing stable outputs for fingerprinting: sets are pickled in sorted order so that the output does
+    not depend on string hash randomization. Objects in ``excluded`` are replaced by placeholders."""
+
+    def __init__(self, file_, protocol, excluded = tuple()):
+        super(_Fingerprinter, self).__init__(file_, protocol)
+        self._excluded = {id(obj): i for i, obj in enumerate(excluded)}
+
+    def persistent_id(self, obj):
+        # ``reducer_override`` is not consulted for built-in containers, but ``persistent_id`` is
+        if (i := self._excluded.get(id(obj))) is not None:
+            return "excluded", i
+        elif type(obj) in (set, frozenset):
+            try:
+                return type(obj).__name__, sorted(obj)
+            except TypeError:
+                return type(obj).__name__, sorted(obj, key = self._digest)
+        return None
+
+    @classmethod
+    def _digest(cls, obj):
+        h = hashlib.sha256()
+        cls(_HashStream(h), pickle.HIGHEST_PROTOCOL).dump(obj)
+        return h.digest()
+
+class _HashStream(object):
+    """Write-only stream feeding a hash object."""
+
+    __slots__ = ["_h"]
+    def __init__(self, h):
+        self._h = h
+
+    def write(self, b):
+        self._h.update(b)
+
+def _summary_snapshot(summary):
+    """Snapshot of ``summary`` for detecting updates made by a pass run in a worker process."""
+    snapshot = {}
+    for name in chain(summary.__slots__, vars(summary)):
+        if name == "__dict__" or (value := getattr(summary, name, None)) is None:
+            continue
+        elif isinstance(value, dict):
+            snapshot[name] = value, {k: pickle.dumps(v, pickle.HIGHEST_PROTOCOL) for k, v in iteritems(value)}
+        else:
+            snapshot[name] = value, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return snapshot
+
+def _summary_updates(summary, snapshot):
+    """Updates made to ``summary`` since ``snapshot`` was taken.
+
+    Returns:
+        :obj:`dict` [:obj:`str`, :obj:`tuple` [:obj:`bool`, :obj:`Any` ]]: Mapping from attribute names to whether the
+            value is merged into a :obj:`dict`, and the updated value or items. Dicts created by the pass are merged
+            too, as if they were empty before
+    """
+    updates = {}
+    for name in chain(summary.__slots__, vars(summary)):
+        if name == "__dict__" or (value := getattr(summary, name, None)) is None:
+            continue
+        old, pickled = snapshot.get(name, (None, None))
+        if old is None and isinstance(value, dict):
+            # created by the pass: merge it in case a concurrent pass creates the same attribute
+            updates[name] = True, value
+        elif old is not value:
+            updates[name] = False, value
+        elif isinstance(value, dict):
+            items = {k: v for k, v in iteritems(value) if pickled.get(k) != pickle.dumps(v, pickle.HIGHEST_PROTOCOL)}
+            if items:
+                updates[name] = True, items
+        elif pickled != pickle.dumps(value, pickle.HIGHEST_PROTOCOL):
+            updates[name] = False, value
+    return updates
+
 class Flow(Object):
     """Flow manager of PRGA.
     
     Args:
         *args: Passes
+
+    Keyword Args:
+        cache_dir (:obj:`str`): If set, results of read-only passes which declare their `AbstractPass.output_files`,
+            `AbstractPass.fingerprint_inputs` and `AbstractPass.fingerprint_state` are cached in this directory. The
+            cache is keyed on a fingerprint of the pass configuration, its inputs and the context summary, so when
+            none of them changes, the pass is skipped, its
+            output files are restored from the cache, and the context summary is restored to the state after the
+            pass. Passes that only add tasks to the renderer, e.g. `VerilogCollection` and `YosysScriptsCollection`,
+            are always run
+        profiler (`FlowProfiler`): If set, each pass and the rendering are profiled with this profiler
+        jobs (:obj:`int`): If larger than 1, read-only passes which declare their `AbstractPass.output_files` are
+            run in up to ``jobs - 1`` forked processes, concurrently with other passes and the rendering in the main
+            process. Each forked process works on a copy-on-write snapshot of the context, and the updates it makes
+            to the context summary are merged back when it finishes. Files are also rendered in forked processes,
+            as many as ``jobs`` minus the forked passes still running. If a pass fails, the forked passes still
+            running are terminated. Only supported on platforms with ``fork``
     """
 
-    __slots__ = ["_passes"]
-    def __init__(self, *passes):
+    __slots__ = ["_passes", "_cache_dir", "_profiler", "_jobs"]
+    def __init__(self, *passes, cache_dir = None, profiler = None, jobs = None):
         self._passes = list(iter(passes))
+        self._cache_dir = cache_dir
+        self._profiler = profiler
+        self._jobs = jobs
 
     def __key_is_prefix(self, key, other):
         """Check if ``key`` is a prefix of ``other``.
@@ -58,6 +162,155 @@ class Flow(Object):
         """
         return not (self.__key_is_prefix(key, other) or self.__key_is_prefix(other, key))
 
+    def _fingerprint(self, context, pass_):
+        """Fingerprint of the configuration of ``pass_``, its inputs and the summary of ``context``, or ``None`` if
+        any of them is unknown or cannot be pickled."""
+        if (inputs := pass_.fingerprint_inputs(context)) is None or (state := pass_.fingerprint_state) is None:
+            return None
+        h = hashlib.sha256()
+        try:
+            # the summary is fingerprinted separately: when restored from the cache, it does not share any object with
+            # the inputs, which changes the memoization in the pickle even if the contents do not change
+            _Fingerprinter(_HashStream(h), pickle.HIGHEST_PROTOCOL).dump(context.summary)
+            _Fingerprinter(_HashStream(h), pickle.HIGHEST_PROTOCOL, (context.summary, context)).dump(
+                    (type(pass_).__module__, type(pass_).__qualname__, pass_.key, state, inputs) )
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            _logger.info("pass '%s' cannot be cached: %s", pass_.key, e)
+            return None
+        return h.hexdigest()
+
+    def _run_pass(self, context, renderer, pass_):
+        """Run ``pass_``, or restore its results from the cache."""
+        outputs = pass_.output_files if pass_.is_readonly_pass and self._cache_dir is not None else None
+        if outputs is None or (fingerprint := self._fingerprint(context, pass_)) is None:
+            pass_.run(context, renderer)
+            return
+        entry = os.path.join(self._cache_dir, pass_.key, fingerprint)
+        # 1. cache hit: restore outputs and the summary
+        if os.path.isdir(entry):
+            for i, f in enumerate(outputs):
+                f = os.path.abspath(f)
+                makedirs(os.path.dirname(f))
+                shutil.copyfile(os.path.join(entry, str(i)), f)
+            with open(os.path.join(entry, "summary.pkl"), OpenMode.rb) as f:
+                context.summary = pickle.load(f)
+            _logger.info("pass '%s' restored from cache %s", pass_.key, entry)
+            return
+        # 2. cache miss: run the pass then store its results
+        pass_.run(context, renderer)
+        makedirs(os.path.dirname(entry))
+        tmp = tempfile.mkdtemp(dir = os.path.dirname(entry))
+        try:
+            for i, f in enumerate(outputs):
+                shutil.copyfile(f, os.path.join(tmp, str(i)))
+            with open(os.path.join(tmp, "summary.pkl"), OpenMode.wb) as f:
+                pickle.dump(context.summary, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors = True)
+
+    def _run_pass_profiled(self, context, renderer, pass_):
+        """Run ``pass_`` with logging and profiling."""
+        _logger.info("running pass '%s'", pass_.key)
+        t = time.time()
+        if self._profiler is not None:
+            self._profiler.begin(pass_.key, context)
+        self._run_pass(context, renderer, pass_)
+        record = None
+        if self._profiler is not None:
+            record = self._profiler.end(context, pass_)
+        _logger.info("pass '%s' took %f seconds", pass_.key, time.time() - t)
+        return record
+
+    def _run_pass_forked(self, context, renderer, pass_, conn):
+        """Run ``pass_`` in a forked process and send the summary updates through ``conn``."""
+        try:
+            snapshot = _summary_snapshot(context.summary)
+            record = self._run_pass_profiled(context, renderer, pass_)
+            conn.send( (None, _summary_updates(context.summary, snapshot), record) )
+        except BaseException as e:
+            try:
+                conn.send( (e, None, None) )
+            except Exception:
+                conn.send( (PRGAInternalError("{!r}".format(e)), None, None) )
+        finally:
+            conn.close()
+
+    def _join_forked(self, context, conn, process, pass_):
+        """Collect the results of ``pass_`` run in a forked process."""
+        try:
+            e, updates, record = conn.recv()
+        except EOFError:
+            e, updates, record = PRGAInternalError("Process running pass '{}' died".format(pass_.key)), None, None
+        conn.close()
+        process.join()
+        if e is not None:
+            raise e
+        for name, (merge, value) in iteritems(updates):
+            if merge and isinstance(current := getattr(context.summary, name, None), dict):
+                current.update(value)
+            else:
+                setattr(context.summary, name, value)
+        if record is not None:
+            self._profiler.records.append(record)
+
+    def _run_passes_parallel(self, context, renderer, passes, g):
+        """Run ``passes`` ordered by the dependency graph ``g``, forking read-only passes into separate processes,
+        then render all files while forked passes are still running."""
+        mpctx = mp.get_context("fork")
+        order = {i: o for o, i in enumerate(nx.topological_sort(g))}
+        pending = set(g)
+        finished = set()
+        running = {}    # connection -> (process, pass index)
+        rendered = renderer is None
+        try:
+            while pending or running:
+                ready = sorted((i for i in pending if all(j in finished for j in g.predecessors(i))),
+                        key = order.get)
+                # 1. fork read-only passes as long as there are available processes
+                for i in ready:
+                    pass_ = passes[i]
+                    if len(running) < self._jobs - 1 and pass_.is_readonly_pass and pass_.output_files is not None:
+                        recv, send = mpctx.Pipe(duplex = False)
+                        process = mpctx.Process(target = self._run_pass_forked,
+                                args = (context, renderer, pass_, send))
+                        process.start()
+                        send.close()
+                        running[recv] = process, i
+                        pending.remove(i)
+                # 2. run one pass in this process
+                if (i := next((i for i in ready if i in pending), None)) is not None:
+                    self._run_pass_profiled(context, renderer, passes[i])
+                    pending.remove(i)
+                    finished.add(i)
+                # 3. render when only forked passes are left, with the processes they do not occupy
+                elif not pending and not rendered:
+                    self._render(context, renderer, self._jobs - len(running))
+                    rendered = True
+                # 4. wait for forked passes
+                else:
+                    for conn in wait(list(running)):
+                        process, i = running.pop(conn)
+                        self._join_forked(context, conn, process, passes[i])
+                        finished.add(i)
+        finally:
+            # if anything fails, the remaining forked passes are terminated
+            for conn, (process, _) in iteritems(running):
+                process.terminate()
+                process.join()
+                conn.close()
+        if not rendered:
+            self._render(context, renderer, self._jobs)
+
+    def _render(self, context, renderer, jobs = None):
+        """Render all files with ``jobs`` processes."""
+        if self._profiler is not None:
+            self._profiler.begin("render", context)
+        renderer.render(jobs)
+        if self._profiler is not None:
+            # files skipped by the renderer because they are unchanged are not written
+            self._profiler.end(context, output_files = renderer.changed_files)
+
     def add_pass(self, pass_):
         """Add one pass to the flow.
 
@@ -125,17 +378,19 @@ class Flow(Object):
                 if any(self.__key_is_prefix(rule, other.key) for rule in pass_.passes_after_self):
                     # ``other`` cannot be executed before ``pass_``
                     g.add_edge(i, j)
-        # sort
-        try:
-            passes = [passes[i] for i in nx.topological_sort(g)]
-        except nx.exception.NetworkXUnfeasible:
+        if not nx.is_directed_acyclic_graph(g):
             raise PRGAAPIError("Cannot determine a feasible order of the passes")
-        # 3. run passes
-        for pass_ in passes:
-            _logger.info("running pass '%s'", pass_.key)
-            t = time.time()
-            pass_.run(context, renderer)
-            _logger.info("pass '%s' took %f seconds", pass_.key, time.time() - t)
-        # 4. render all files
-        if renderer is not None:
-            renderer.render()
+        # 3. run passes and render all files
+        if self._jobs is not None and self._jobs > 1:
+            if "fork" in mp.get_all_start_methods():
+                self._run_passes_parallel(context, renderer, passes, g)
+                passes = None
+            else:
+                _logger.warning("Parallel flow requires 'fork'. Passes are run sequentially")
+        if passes is not None:
+            for i in nx.topological_sort(g):
+                self._run_pass_profiled(context, renderer, passes[i])
+            if renderer is not None:
+                self._render(context, renderer, self._jobs)
+        if self._profiler is not None:
+            self._profiler.close()
@@ -0,0 +1,203 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from ..core.serialization import LazyModuleDatabase
+from ..util import Object
+from ..exception import PRGAAPIError
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ["FlowProfiler"]
+
+# ----------------------------------------------------------------------------
+# -- Flow Profiler -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+class FlowProfiler(Object):
+    """Per-pass profiler for `Flow`.
+
+    Keyword Args:
+        tracemalloc (:obj:`bool`): If set, Python memory allocations are traced with :obj:`tracemalloc` and the
+            allocation delta and peak of each pass are recorded. This slows down the passes considerably
+        count_netlist (:obj:`bool`): If set, the number of modules, instances and connection graph nodes in the
+            module database are counted before and after each pass. For a context unpickled from a chunked file,
+            only the modules already loaded are counted
+        hooks (:obj:`Sequence` [``lambda (context, pass_) -> Mapping``]): Additional counters. Each hook is called
+            after each pass, and the returned mapping is merged into the record of the pass
+
+    Each record is a :obj:`dict` containing:
+
+        - ``name``: key of the pass, or "render" for the renderer
+        - ``start``: start time in seconds relative to the first record
+        - ``wall`` and ``cpu``: wall and CPU time in seconds
+        - ``max_rss``: peak resident set size of the process in bytes after the pass, if available
+        - ``alloc`` and ``alloc_peak``: net and peak traced allocations in bytes during the pass, if ``tracemalloc``
+          is set. ``alloc_peak`` is not recorded before Python 3.9, where the traced peak cannot be reset
+        - ``modules``, ``instances``, ``nodes``: netlist counts after the pass and their deltas (``*_delta``), if
+          ``count_netlist`` is set
+        - ``bytes_written``: bytes written into the output files. For the renderer, only the files whose contents
+          are changed are counted
+        - counters returned by `AbstractPass.profile_counters` and ``hooks``
+    """
+
+    __slots__ = ["tracemalloc", "count_netlist", "hooks", "records", "_t0", "_started_tracemalloc", "_current"]
+    def __init__(self, *, tracemalloc = False, count_netlist = True, hooks = tuple()):
+        self.tracemalloc = tracemalloc
+        self.count_netlist = count_netlist
+        self.hooks = list(hooks)
+        self.records = []
+        self._t0 = None
+        self._started_tracemalloc = False
+        self._current = None
+
+    def add_hook(self, hook):
+        """Add a counter hook.
+
+        Args:
+            hook (``lambda (context, pass_) -> Mapping``): Called after each pass. The returned mapping is merged
+                into the record of the pass
+        """
+        self.hooks.append(hook)
+
+    @classmethod
+    def _max_rss(cls):
+        if resource is None:
+            return None
+        # ``ru_maxrss`` is in kilobytes on Linux but in bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+    @classmethod
+    def _count_netlist(cls, context):
+        modules, instances, nodes = 0, 0, 0
+        # counting must not load the modules of a lazily unpickled context
+        database = context._database
+        for module in (database.loaded_values() if isinstance(database, LazyModuleDatabase)
+                else itervalues(database)):
+            modules += 1
+            instances += len(getattr(module, "_instances", ()))
+            if (g := getattr(module, "_conn_graph", None)) is not None:
+                nodes += len(g)
+        return {"modules": modules, "instances": instances, "nodes": nodes}
+
+    @classmethod
+    def _file_size(cls, f):
+        try:
+            return os.path.getsize(f)
+        except OSError:
+            return 0
+
+    def begin(self, name, context = None):
+        """Start profiling a pass or the renderer.
+
+        Args:
+            name (:obj:`str`): Name of the record
+            context (`Context`): The context the pass works on
+        """
+        if self._current is not None:
+            raise PRGAAPIError("Profiling of '{}' is not ended yet".format(self._current["name"]))
+        if self._t0 is None:
+            self._t0 = time.time()
+        if self.tracemalloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            # ``reset_peak`` is only available from Python 3.9
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        record = self._current = {"name": name}
+        if self.count_netlist and context is not None:
+            record["_counts"] = self._count_netlist(context)
+        if self.tracemalloc:
+            record["_alloc"] = tracemalloc.get_traced_memory()[0]
+        record["_cpu"] = time.process_time()
+        record["_wall"] = time.time()
+
+    def end(self, context = None, pass_ = None, output_files = None):
+        """End profiling the current pass or the renderer.
+
+        Args:
+            context (`Context`): The context the pass works on
+            pass_ (`AbstractPass`): The profiled pass
+            output_files (:obj:`Sequence` [:obj:`str` ]): Files written during the profiled run
+        """
+        wall, cpu = time.time(), time.process_time()
+        if (record := self._current) is None:
+            raise PRGAAPIError("No profiling started")
+        self._current = None
+        wall0, cpu0 = record.pop("_wall"), record.pop("_cpu")
+        record["start"] = wall0 - self._t0
+        record["wall"] = wall - wall0
+        record["cpu"] = cpu - cpu0
+        if self.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            alloc0 = record.pop("_alloc")
+            record["alloc"] = current - alloc0
+            if hasattr(tracemalloc, "reset_peak"):
+                record["alloc_peak"] = peak - alloc0
+        if (rss := self._max_rss()) is not None:
+            record["max_rss"] = rss
+        if (counts := record.pop("_counts", None)) is not None:
+            for k, v in iteritems(self._count_netlist(context)):
+                record[k] = v
+                record[k + "_delta"] = v - counts[k]
+        if output_files is None and pass_ is not None:
+            output_files = pass_.output_files
+        if output_files is not None:
+            record["bytes_written"] = sum(self._file_size(f) for f in output_files)
+        if pass_ is not None and (counters := pass_.profile_counters):
+            record.update(counters)
+        for hook in self.hooks:
+            if (counters := hook(context, pass_)):
+                record.update(counters)
+        self.records.append(record)
+        _logger.debug("profile: %s", ", ".join("{}={}".format(k, v) for k, v in iteritems(record)))
+        return record
+
+    def close(self):
+        """Stop :obj:`tracemalloc` if it's started by this profiler."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def dump(self, file_, format_ = "json"):
+        """Write the records into ``file_``.
+
+        Args:
+            file_ (:obj:`str` or file-like object): The output file
+            format_ (:obj:`str`): "json" for a list of the records, or "chrome" for the Chrome trace event format which
+                can be loaded in ``chrome://tracing`` or Perfetto
+        """
+        if format_ == "json":
+            data = self.records
+        elif format_ == "chrome":
+            events = []
+            for record in self.records:
+                events.append({"name": record["name"], "cat": "pass", "ph": "X", "pid": 0, "tid": 0,
+                    "ts": record["start"] * 1e6, "dur": record["wall"] * 1e6,
+                    "args": {k: v for k, v in iteritems(record) if k not in ("name", "start", "wall")}})
+                for k in ("max_rss", "alloc_peak", "nodes"):
+                    if k in record:
+                        events.append({"name": k, "ph": "C", "pid": 0, "tid": 0,
+                            "ts": (record["start"] + record["wall"]) * 1e6, "args": {k: record[k]}})
+            data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        else:
+            raise PRGAAPIError("Unknown profile format: {}".format(format_))
+        if isinstance(file_, basestring):
+            with open(file_, "w") as f:
+                json.dump(data, f, indent = 1)
+        else:
+            json.dump(data, file_, indent = 1)
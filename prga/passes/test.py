@@ -8,18 +8,88 @@ from ..core.builder.array.array import ArrayBuilder,_ArrayInstancesMapping
 from ..core.common import ModuleView,ModuleClass,PrimitiveClass,Position, SegmentID,BridgeID
 from ..util import Object, uno
 from ..exception import PRGAInternalError
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import os
 from os import path
 from prga.compatible import *
 from itertools import chain
 from prga.netlist.net.util import NetUtils
+from prga.netlist.net.common import PortDirection
 import networkx as nx
 import numpy as np
 import random
 
 __all__ = ['Tester']
 
+# ----------------------------------------------------------------------------
+# -- Reachability Queries ----------------------------------------------------
+# ----------------------------------------------------------------------------
+class _Reachability(object):
+    """Reachability queries on a directed graph.
+
+    The graph is condensed into a DAG of its strongly connected components once, so nodes in the same component
+    reach each other without searching. Each source component gets one breadth-first search on the DAG, which is
+    advanced only as far as needed to answer a query and resumed by later queries from the same component. Nodes not
+    in the graph are treated as isolated nodes.
+
+    Args:
+        graph (:obj:`networkx.DiGraph`): The graph. Must not be modified while queries are made
+        max_searches (:obj:`int`): Maximum number of searches kept. The least recently used search is dropped when
+            the limit is reached
+    """
+
+    __slots__ = ['max_searches', '_component', '_dag', '_searches']
+
+    def __init__(self, graph, max_searches = 1024):
+        self.max_searches = max_searches
+        dag = nx.condensation(graph)
+        self._component = dag.graph["mapping"]
+        self._dag = dag.succ
+        self._searches = OrderedDict()
+
+    def _search(self, component):
+        try:
+            search = self._searches.pop(component)
+        except KeyError:
+            if len(self._searches) >= self.max_searches:
+                self._searches.popitem(last = False)
+            search = {component}, deque([component])
+        self._searches[component] = search
+        return search
+
+    def _visited(self, source, targets):
+        """Advance the search from the component of ``source`` until the components of all of ``targets`` are
+        visited or no more components are reachable, and return the visited components."""
+        if (component := self._component.get(source)) is None:
+            return set()
+        visited, frontier = self._search(component)
+        remaining = set(c for t in targets if (c := self._component.get(t)) is not None and c not in visited)
+        while remaining and frontier:
+            for next_ in self._dag[frontier.popleft()]:
+                if next_ not in visited:
+                    visited.add(next_)
+                    frontier.append(next_)
+                    remaining.discard(next_)
+        return visited
+
+    def has_path(self, source, target):
+        """Test if ``target`` is reachable from ``source``."""
+        return source == target or self._component.get(target) in self._visited(source, (target, ))
+
+    def reachable(self, source, targets):
+        """Get the nodes in ``targets`` that are reachable from ``source``, in the order they appear in ``targets``.
+        """
+        visited = self._visited(source, targets)
+        return [t for t in targets if t == source or self._component.get(t) in visited]
+
+    def first_reachable(self, source, targets):
+        """Get the index of the first node in ``targets`` that is reachable from ``source``, or ``None`` if none of
+        them is reachable."""
+        for i, target in enumerate(targets):
+            if self.has_path(source, target):
+                return i
+        return None
+
 # ----------------------------------------------------------------------------
 # -- Tester Pass ------------------------------------------------------
 # ----------------------------------------------------------------------------
@@ -363,8 +433,33 @@ class Tester(Object, AbstractPass):
         # Vertical Path
         for i in range(2,height-1):
             path.append((i,width-2))
-        
-        path.reverse()
+
+        self.route(top,G,path)
+
+    @classmethod
+    def _tile_nets(cls,tile,direction):
+        """
+        Get the references to the non-clock bits of the pins of ``tile`` in the given direction
+        """
+        nets = []
+        for _,pin in iteritems(tile.pins):
+            if pin.model.direction is direction and not pin.model.is_clock and not 'cu' in pin.model.name:
+                for net in pin:
+                    nets.append(NetUtils._reference(net))
+        return nets
+
+    def route(self,top,G,path):
+        """
+        Find a route through the tiles at the given positions and annotate it to the logical view of ``top``
+
+        Args:
+            top (`Module`): User view of the top-level array
+            G (:obj:`networkx.DiGraph`): Connection graph of the whole fabric
+            path (:obj:`Sequence` [:obj:`tuple` [:obj:`int`, :obj:`int` ]]): Positions of the tiles the route goes
+                through, from the start point to the end point. Consecutive tiles need not be adjacent
+        """
+        reach = _Reachability(G)
+        path = list(reversed(path))
             
         print(path)
         
@@ -373,69 +468,40 @@ class Tester(Object, AbstractPass):
         for i in range(1,len(path)):
             sink = path[i-1]
             src = path[i]
-            srcs = []
-            sinks = []
             tile_src = top._instances[Position(src[0],src[1])]
             tile_sink = top._instances[Position(sink[0],sink[1])]
             
-            for _,src_pin in iteritems(tile_src.pins):
-                if src_pin.model.direction.is_output and not src_pin.model.is_clock and not 'cu' in src_pin.model.name:
-                    for net in src_pin:
-                        srcs.append(NetUtils._reference(net))
-            
-            for _,sink_pin in iteritems(tile_sink.pins):
-                if sink_pin.model.direction.is_input and not sink_pin.model.is_clock and not 'cu' in sink_pin.model.name:
-                    for net in sink_pin:
-                        sinks.append(NetUtils._reference(net))
+            srcs = self._tile_nets(tile_src,PortDirection.output)
+            sinks = self._tile_nets(tile_sink,PortDirection.input_)
 
+            # one search for each source
             for src_net in srcs:
-                for sink_net in sinks:
-                    if nx.has_path(G,src_net,sink_net):
-                        connections[i-1].append((src_net,sink_net))
+                for sink_net in reach.reachable(src_net,sinks):
+                    connections[i-1].append((src_net,sink_net))
 
         # Get Intra Tile Connections of the start point i.e connections between inports and outports of a tile
-        sink = path[len(path)-1]
-        src = path[len(path)-1]
-        srcs = []
-        sinks = []
-        tile_src = top._instances[Position(src[0],src[1])]
-        tile_sink = top._instances[Position(sink[0],sink[1])]
-
-        for _,src_pin in iteritems(tile_src.pins):
-            if src_pin.model.direction.is_input and not src_pin.model.is_clock and not 'cu' in src_pin.model.name:
-                for net in src_pin:
-                    srcs.append(NetUtils._reference(net))
-
-        for _,sink_pin in iteritems(tile_sink.pins):
-            if sink_pin.model.direction.is_output and not sink_pin.model.is_clock and not 'cu' in sink_pin.model.name:
-                for net in sink_pin:
-                    sinks.append(NetUtils._reference(net))
+        tile_start = top._instances[Position(*path[len(path)-1])]
+        srcs = self._tile_nets(tile_start,PortDirection.input_)
+        sinks = self._tile_nets(tile_start,PortDirection.output)
         
         for src_net in srcs:
-            for sink_net in sinks:
-                if nx.has_path(G,src_net,sink_net):
-                    connections[len(path)-1].append((src_net,sink_net))
+            for sink_net in reach.reachable(src_net,sinks):
+                connections[len(path)-1].append((src_net,sink_net))
         
         # Return the individual connections which form the route 
         route = [] # Final Route
         for index in range(1,len(connections)):
-            # print(index)
-            connection_found = False
+            # the first connection in ``connections[index]`` that reaches any connection in ``connections[index-1]``
+            heads = [conn[0] for conn in connections[index-1]]
             for i in range(len(connections[index])):
-                for j in range(len(connections[index-1])):
-                    if nx.has_path(G,connections[index][i][1],connections[index-1][j][0]):
-                        connection_found = True
-                        route.append((NetUtils._dereference(top,connections[index-1][j][0]),NetUtils._dereference(top,connections[index-1][j][1])))
-                        if index == (len(connections)-1): 
-                            route.append((NetUtils._dereference(top,connections[index][i][0]),NetUtils._dereference(top,connections[index][i][1])))
-                        else:
-                            route.append((NetUtils._dereference(top,connections[index][i][1]),NetUtils._dereference(top,connections[index-1][j][0])))
-                        
-                    if connection_found:
-                        break
-                if connection_found:
+                if (j := reach.first_reachable(connections[index][i][1],heads)) is not None:
+                    route.append((NetUtils._dereference(top,connections[index-1][j][0]),NetUtils._dereference(top,connections[index-1][j][1])))
+                    if index == (len(connections)-1): 
+                        route.append((NetUtils._dereference(top,connections[index][i][0]),NetUtils._dereference(top,connections[index][i][1])))
+                    else:
+                        route.append((NetUtils._dereference(top,connections[index][i][1]),NetUtils._dereference(top,connections[index-1][j][0])))
                     break
-            if not connection_found:
+            else:
                 print("PATH DOESNT EXIST BETWEEN path index ",index,"and path index",index-1)
 
         route_vars = [] # Extra data to be used for templating
@@ -226,8 +226,8 @@ class TranslationPass(Object, AbstractPass):
             pass
         elif not module._allow_multisource:
             if module._coalesce_connections is logical._coalesce_connections:
-                for u, v in module._conn_graph.edges:
-                    logical._conn_graph.add_edge(self._u2l(logical, u), self._u2l(logical, v))
+                NetUtils._add_edges(logical, [(self._u2l(logical, u), self._u2l(logical, v))
+                    for u, v in module._conn_graph.edges])
             else:   # module._coalesce_connections and not logical._coalesce_connections
                 for u, v in module._conn_graph.edges:
                     lu, lv = map(lambda x: NetUtils._dereference(logical, self._u2l(logical, x), coalesced = True),
@@ -248,7 +248,7 @@ class TranslationPass(Object, AbstractPass):
                         continue
                     logical_sink = self._u2l(logical, user_sink)
                     if len(user_sources) == 1:
-                        logical._conn_graph.add_edge(self._u2l(logical, user_sources[0]), logical_sink)
+                        NetUtils._add_edges(logical, [(self._u2l(logical, user_sources[0]), logical_sink)])
                         continue
                     bit = NetUtils._dereference(logical, logical_sink)
                     switch_model = context.switch_database.get_switch(len(user_sources), logical)
@@ -268,10 +268,9 @@ class TranslationPass(Object, AbstractPass):
                             switch_name.append( bit.name )
                     switch = ModuleUtils.instantiate(logical, switch_model, "_".join(switch_name),
                             key = (ModuleClass.switch, ) + logical_sink)
-                    for user_source, switch_input in zip(user_sources, switch.pins['i']):
-                        logical._conn_graph.add_edge(self._u2l(logical, user_source),
-                                NetUtils._reference(switch_input))
-                    logical._conn_graph.add_edge(NetUtils._reference(switch.pins['o']), logical_sink)
+                    NetUtils._add_edges(logical, [(self._u2l(logical, user_source), NetUtils._reference(switch_input))
+                        for user_source, switch_input in zip(user_sources, switch.pins['i'])])
+                    NetUtils._add_edges(logical, [(NetUtils._reference(switch.pins['o']), logical_sink)])
         context._database[ModuleView.logical, module.key] = logical
         _logger.info("Translated: {}".format(module))
         return logical
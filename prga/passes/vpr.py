@@ -12,11 +12,14 @@ from ..netlist.net.util import NetUtils
 from ..netlist.module.common import ConnGraph
 from ..netlist.module.util import ModuleUtils
 from ..util import Object, uno
-from ..xml import XMLGenerator
+from ..xml import XMLGenerator, XMLFragment
+from ..capnproto import CapnpGenerator
 from ..exception import PRGAInternalError, PRGAAPIError
 
 import os
 import networkx as nx
+import multiprocessing as mp
+from array import array
 from itertools import product, chain
 from collections import namedtuple
 from abc import abstractproperty, abstractmethod
@@ -36,6 +39,14 @@ OrderedDict = dict
 class FASMDelegate(Object):
     """FASM delegate supplying FASM metadata."""
 
+    # methods supplying the FASM metadata inside logic/io blocks
+    _intrablock_methods = ("fasm_mux_for_intrablock_switch", "fasm_prefix_for_intrablock_module",
+            "fasm_features_for_mode", "fasm_params_for_primitive", "fasm_lut")
+
+    def _overrides_intrablock_methods(self, base):
+        """Test if the class of this delegate overrides any intrablock method of ``base``."""
+        return any(getattr(type(self), name) is not getattr(base, name) for name in self._intrablock_methods)
+
     def reset(self):
         """Reset the delegate."""
         pass
@@ -99,6 +110,20 @@ class FASMDelegate(Object):
             :obj:`str`: "fasm_lut" feature for the LUT instance
         """
         return ''
+
+    def fasm_memo_key_for_intrablock_module(self, instance):
+        """Get a hashable key for the FASM metadata of hierarchical cluster/primitive ``instance`` and everything
+        inside it. The ``<pb_type>`` generated for ``instance`` is reused for other instances of the same module
+        with the same name, "fasm_prefix" and key.
+
+        Args:
+            instance (`Instance`): Hierarchical instance in the logic/io block
+
+        Returns:
+            :obj:`Hashable`: The key. Return ``None`` if the metadata must be generated for each instance, which is
+                the default for sub-classes overriding any method that supplies intrablock metadata
+        """
+        return None if self._overrides_intrablock_methods(FASMDelegate) else tuple()
     
     def fasm_prefix_for_tile(self, instance):
         """Get the "fasm_prefix" strings for hierarchical tile ``instance``.
@@ -128,6 +153,14 @@ class FASMDelegate(Object):
 class TimingDelegate(Object):
     """Timing delegate for VPR generation."""
 
+    # methods supplying the timing inside logic/io blocks
+    _intrablock_methods = ("vpr_delay_of_intrablock_switch", "vpr_setup_time_of_primitive_port",
+            "vpr_hold_time_of_primitive_port", "vpr_clk2q_time_of_primitive_port", "vpr_delay_of_primitive_path")
+
+    def _overrides_intrablock_methods(self, base):
+        """Test if the class of this delegate overrides any intrablock method of ``base``."""
+        return any(getattr(type(self), name) is not getattr(base, name) for name in self._intrablock_methods)
+
     def reset(self):
         """Reset the delegate."""
         pass
@@ -224,6 +257,20 @@ class TimingDelegate(Object):
         """
         return 1e-11, None
 
+    def vpr_memo_key_of_intrablock_module(self, instance):
+        """Get a hashable key for the timing of hierarchical cluster/primitive ``instance`` and everything inside
+        it. The ``<pb_type>`` generated for ``instance`` is reused for other instances of the same module with the
+        same name, "fasm_prefix" and key.
+
+        Args:
+            instance (`Instance`): Hierarchical instance in the logic/io block
+
+        Returns:
+            :obj:`Hashable`: The key. Return ``None`` if the timing must be generated for each instance, which is
+                the default for sub-classes overriding any method that supplies intrablock timing
+        """
+        return None if self._overrides_intrablock_methods(TimingDelegate) else tuple()
+
     def vpr_interblock_routing_switch(self, source, sink, delay = 1e-11):
         """Get the routing switch for connection ``source`` -> ``sink``.
 
@@ -254,7 +301,7 @@ class _VPRArchGeneration(Object, AbstractPass):
             # customizable variables
             'output_file', 'fasm', 'timing',
             # temporary variables
-            'xml', 'lut_sizes', 'active_primitives', 'active_blocks', 'active_tiles',
+            'xml', 'lut_sizes', 'active_primitives', 'active_blocks', 'active_tiles', 'pb_type_fragments',
             ]
     def __init__(self, output_file, *, fasm = None, timing = None):
         self.output_file = output_file
@@ -265,6 +312,18 @@ class _VPRArchGeneration(Object, AbstractPass):
     def is_readonly_pass(self):
         return True
 
+    @property
+    def output_files(self):
+        return (self.output_file, ) if isinstance(self.output_file, basestring) else None
+
+    def fingerprint_inputs(self, context):
+        return (context.top, context.segments, context.tunnels,
+                context.fasm_delegate if self.fasm is None else self.fasm)
+
+    @property
+    def fingerprint_state(self):
+        return (self.output_file, self.timing)
+
     @classmethod
     def _net2vpr(cls, net, parent_name = None, bitwise = False):
         if net.bus_type.is_concat:
@@ -590,9 +649,9 @@ class _VPRArchGeneration(Object, AbstractPass):
                 else:
                     sub_prefix = ''
                 if sub.model.module_class.is_cluster:
-                    self._pb_type(sub.model, hierarchical, sub_prefix)
+                    self._sub_pb_type(hierarchical, sub_prefix)
                 elif sub.model.module_class.is_primitive:
-                    self._leaf_pb_type(hierarchical, sub_prefix)
+                    self._sub_pb_type(hierarchical, sub_prefix)
                     if sub.model.primitive_class.is_lut:
                         for i, subsub in enumerate(group):
                             fasm_lut = self.fasm.fasm_lut(subsub)
@@ -604,9 +663,9 @@ class _VPRArchGeneration(Object, AbstractPass):
             else:
                 sub_prefix = self.fasm.fasm_prefix_for_intrablock_module(hierarchical)
                 if sub.model.module_class.is_cluster:
-                    self._pb_type(sub.model, hierarchical, sub_prefix)
+                    self._sub_pb_type(hierarchical, sub_prefix)
                 elif sub.model.module_class.is_primitive:
-                    self._leaf_pb_type(hierarchical, sub_prefix)
+                    self._sub_pb_type(hierarchical, sub_prefix)
                     if sub.model.primitive_class.is_lut:
                         fasm_lut = self.fasm.fasm_lut(hierarchical)
                         if fasm_lut:
@@ -644,6 +703,30 @@ class _VPRArchGeneration(Object, AbstractPass):
                 self.xml.element_leaf('meta', {'name': 'fasm_lut'},
                         '{} = {}'.format(lut, name))
 
+    def _sub_pb_type(self, instance, fasm_prefix):
+        """Emit the ``<pb_type>`` for hierarchical cluster/primitive ``instance``.
+
+        The emitted elements are recorded, and replayed for other instances of the same module with the same name,
+        "fasm_prefix", and memo keys supplied by the FASM and timing delegates.
+        """
+        key, leaf = None, instance.hierarchy[0]
+        if ((fasm_key := self.fasm.fasm_memo_key_for_intrablock_module(instance)) is not None and
+                (timing_key := self.timing.vpr_memo_key_of_intrablock_module(instance)) is not None):
+            key = (instance.model.key, leaf.key, leaf.name, getattr(leaf, "vpr_num_pb", None), fasm_prefix,
+                    fasm_key, timing_key)
+            if (fragment := self.pb_type_fragments.get(key)) is not None:
+                fragment.replay(self.xml)
+                return
+            xml, self.xml = self.xml, XMLFragment()
+        if instance.model.module_class.is_cluster:
+            self._pb_type(instance.model, instance, fasm_prefix)
+        else:
+            self._leaf_pb_type(instance, fasm_prefix)
+        if key is not None:
+            fragment, self.xml = self.xml, xml
+            self.pb_type_fragments[key] = fragment
+            fragment.replay(self.xml)
+
     def _pb_type(self, module, instance = None, fasm_prefix = None):
         attrs, parent_name = {}, module.name
         if instance:
@@ -713,6 +796,7 @@ class _VPRArchGeneration(Object, AbstractPass):
         if not hasattr(context.summary, 'vpr'):
             context.summary.vpr = {}
         # output file update to the VPR summary is done per subclass
+        output_file, fasm, timing = self.output_file, self.fasm, self.timing
         if isinstance(self.output_file, basestring):
             f = os.path.abspath(self.output_file)
             makedirs(os.path.dirname(f))
@@ -730,6 +814,7 @@ class _VPRArchGeneration(Object, AbstractPass):
         if self.timing is None:
             self.timing = TimingDelegate()  # fake timing
         self.timing.reset()
+        self.pb_type_fragments = {}
         # link and reset context summary
         if self._update_summary:
             self.active_tiles = context.summary.active_tiles = OrderedDict()
@@ -806,6 +891,12 @@ class _VPRArchGeneration(Object, AbstractPass):
                                 ' '.join(map(str, segment.cb_pattern)))
             # clean up
             del xml
+        # close the output file if it's opened by this pass
+        if isinstance(output_file, basestring):
+            self.output_file.close()
+            self.output_file = output_file
+        # restore the delegates so this pass can be reused with another context
+        self.fasm, self.timing = fasm, timing
 
     # -- properties/methods to be overriden/implemented by sub-classes -------
     @abstractproperty
@@ -999,6 +1090,10 @@ class VPRScalableArchGeneration(_VPRArchGeneration):
     def _update_summary(self):
         return self.update_summary
 
+    @property
+    def fingerprint_state(self):
+        return (self.output_file, self.timing, self.delegate, self.update_summary)
+
     def _update_output_file(self, summary, output_file):
         summary["scalable_arch"] = output_file
 
@@ -1037,17 +1132,40 @@ class VPR_RRG_Generation(Object, AbstractPass):
     Keyword Args:
         fasm (`FASMDelegate`): Overwrite the deafult fasm delegate provided by the context
         timing (`TimingDelegate`): Overwrite the default iming delegate provided by the context
+        pretty (:obj:`bool`): If set, the output XML is broken into multiple lines and indented
+        jobs (:obj:`int`): If set to a number larger than 1, edges are generated in parallel by this many worker
+            processes. Only supported on platforms where processes can be forked, and only for XML outputs
+        output_format (:obj:`str`): "xml" (default), or "capnp" for the binary (Cap'n Proto) format supported by
+            recent versions of VPR. The latter requires the optional dependency ``pycapnp``
+        capnp_schema (:obj:`str`): Path to VPR's Cap'n Proto schema for the routing resource graph, i.e.
+            ``rr_graph_uxsdcxx.capnp`` in VPR's source tree. Required if ``output_format`` is "capnp"
+
+    Nodes and edges are serialized from pre-formatted string templates and written in large chunks, bypassing
+    `XMLGenerator.element_leaf`. The output is identical to what `XMLGenerator` would generate.
     """
 
-    __slots__ = ['output_file', 'fasm', 'timing',                           # customizable variables
+    __slots__ = ['output_file', 'fasm', 'timing', 'pretty', 'jobs',         # customizable variables
+            'output_format', 'capnp_schema',
             # temporary variables:
             'xml', 'tile2id', 'tilepin2ptc', 'switch2id', 'sgmt2id', 'sgmt2ptc',
-            'chanx', 'chany', 'conn_graph',
+            'chanx', 'chany', 'conn_graph', 'rawfmt', 'chunk', 'edges', 'box_switches',
             ]
-    def __init__(self, output_file, *, fasm = None, timing = None):
+
+    _chunk_size = 4096      # number of nodes/edges buffered before written into the output stream
+
+    def __init__(self, output_file, *, fasm = None, timing = None, pretty = True, jobs = None,
+            output_format = "xml", capnp_schema = None):
+        if output_format not in ("xml", "capnp"):
+            raise PRGAAPIError("Unsupported RRG output format: {}".format(output_format))
+        elif output_format == "capnp" and capnp_schema is None:
+            raise PRGAAPIError("Cap'n Proto schema is required for the binary RRG output format")
         self.output_file = output_file
         self.fasm = fasm
         self.timing = timing
+        self.pretty = pretty
+        self.jobs = jobs
+        self.output_format = output_format
+        self.capnp_schema = capnp_schema
 
     @property
     def key(self):
@@ -1061,6 +1179,19 @@ class VPR_RRG_Generation(Object, AbstractPass):
     def is_readonly_pass(self):
         return True
 
+    @property
+    def output_files(self):
+        return (self.output_file, ) if isinstance(self.output_file, basestring) else None
+
+    def fingerprint_inputs(self, context):
+        return (context.top, context.segments, context.tunnels,
+                context.fasm_delegate if self.fasm is None else self.fasm)
+
+    @property
+    def fingerprint_state(self):
+        # ``jobs`` does not change the output
+        return (self.output_file, self.timing, self.pretty, self.output_format, self.capnp_schema)
+
     def _analyze_track(self, node):
         """Analyze a track node.
 
@@ -1128,6 +1259,7 @@ class VPR_RRG_Generation(Object, AbstractPass):
             return chan - (1, 0), ori, block_position
 
     def _construct_conn_graph(self, top):
+        """Construct the coalesced connection graph, and return the number of RRG nodes."""
         node_id = 0
         def create_node(m, n):
             nonlocal node_id
@@ -1169,6 +1301,7 @@ class VPR_RRG_Generation(Object, AbstractPass):
                 create_node = create_node,
                 create_edge = None,
                 coalesce_connections = True)
+        return node_id
 
     def _tile_pinlist(self, pin, srcsink_ptc, iopin_ptc):
         subtile_name = pin.parent.name
@@ -1227,8 +1360,92 @@ class VPR_RRG_Generation(Object, AbstractPass):
                     "block_type_id": self.tile2id[instance.model.key], "x": x, "y": y,
                     "width_offset": x - rootpos.x, "height_offset": y - rootpos.y})
 
+    def _prepare_raw_output(self):
+        if not isinstance(self.xml, XMLGenerator):
+            # binary outputs: edges are buffered in arrays (source, sink, switch ID, and FASM features by index)
+            # until all of them are generated, so that the list of edges is allocated once with the right size
+            self.rawfmt, self.chunk, self.edges = None, [], (array('i'), array('i'), array('i'), {})
+            return
+        self.edges = None
+        if self.xml.pretty:
+            i0, i1, i2, i3 = ('\t' * (self.xml.depth + i) for i in range(4))
+            nl = '\n'
+        else:
+            i0 = i1 = i2 = i3 = nl = ''
+        loc = i1 + '<loc xlow="{}" ylow="{}" ptc="{}" xhigh="{}" yhigh="{}"'
+        timing = i1 + '<timing C="0" R="0"></timing>' + nl
+        edge = i0 + '<edge src_node="{}" sink_node="{}" switch_id="{}">'
+        self.rawfmt = {
+                "track": (i0 + '<node capacity="{}" id="{}" type="{}" direction="{}">' + nl +
+                    loc + '></loc>' + nl + timing +
+                    i1 + '<segment segment_id="{}"></segment>' + nl + i0 + '</node>' + nl),
+                "iopin": (i0 + '<node capacity="{}" id="{}" type="{}">' + nl +
+                    loc + ' side="{}"></loc>' + nl + timing + i0 + '</node>' + nl),
+                "srcsink": (i0 + '<node capacity="{}" id="{}" type="{}">' + nl +
+                    loc + '></loc>' + nl + timing + i0 + '</node>' + nl),
+                "edge": edge + '</edge>' + nl,
+                "edge_fasm": (edge + nl + i1 + '<metadata>' + nl + i2 + '<meta name="fasm_features">{}</meta>' + nl +
+                    i1 + '</metadata>' + nl + i0 + '</edge>' + nl),
+                "fasm_line": i3 + '{}' + nl,
+                "fasm_end": i2,
+                "newline": nl,
+                }
+        self.chunk = []
+
+    def _write_raw(self, text):
+        self.chunk.append(text)
+        if self.xml is not None and len(self.chunk) >= self._chunk_size:
+            self._flush_raw_output()
+
+    def _flush_raw_output(self):
+        if self.chunk:
+            self.xml.write_raw("".join(self.chunk))
+            self.chunk = []
+
     def _node(self, type_, id_, ptc, xlow, ylow, *,
             track_dir = None, port_ori = None, xhigh = None, yhigh = None, segment = None, capacity = 1):
+        if self.rawfmt is None:
+            self._node_element(type_, id_, ptc, xlow, ylow, track_dir = track_dir, port_ori = port_ori,
+                    xhigh = xhigh, yhigh = yhigh, segment = segment, capacity = capacity)
+        elif type_ in ("CHANX", "CHANY"):
+            assert track_dir is not None and segment is not None
+            self._write_raw(self.rawfmt["track"].format(capacity, id_, type_, track_dir.case("INC_DIR", "DEC_DIR"),
+                xlow, ylow, ptc, uno(xhigh, xlow), uno(yhigh, ylow), self.sgmt2id[segment.name]))
+        elif type_ in ("IPIN", "OPIN"):
+            assert port_ori is not None
+            self._write_raw(self.rawfmt["iopin"].format(capacity, id_, type_,
+                xlow, ylow, ptc, uno(xhigh, xlow), uno(yhigh, ylow), port_ori.case("TOP", "RIGHT", "BOTTOM", "LEFT")))
+        else:
+            self._write_raw(self.rawfmt["srcsink"].format(capacity, id_, type_,
+                xlow, ylow, ptc, uno(xhigh, xlow), uno(yhigh, ylow)))
+
+    def _edge(self, src_id, sink_id, head_pin_bit = None, tail_pin_bit = None, delay = 0.0, fasm_features = tuple(),
+            switch_id = None):
+        if switch_id is None:
+            switch = self.timing.vpr_interblock_routing_switch(head_pin_bit, tail_pin_bit, delay)
+            switch_id = self.switch2id[switch.name]
+        if self.rawfmt is None:
+            src, sink, switch, fasm = self.edges
+            if fasm_features:
+                fasm[len(src)] = fasm_features
+            src.append(src_id)
+            sink.append(sink_id)
+            switch.append(switch_id)
+        elif fasm_features:
+            # keep in sync with `XMLGenerator.element_leaf`
+            lines = "\n".join(fasm_features).splitlines()
+            if len(lines) > 1:
+                text = (self.rawfmt["newline"] +
+                        "".join(self.rawfmt["fasm_line"].format(XMLGenerator.escape(line.strip())) for line in lines) +
+                        self.rawfmt["fasm_end"])
+            else:
+                text = XMLGenerator.escape(lines[0].strip()) if lines else ""
+            self._write_raw(self.rawfmt["edge_fasm"].format(src_id, sink_id, switch_id, text))
+        else:
+            self._write_raw(self.rawfmt["edge"].format(src_id, sink_id, switch_id))
+
+    def _node_element(self, type_, id_, ptc, xlow, ylow, *,
+            track_dir = None, port_ori = None, xhigh = None, yhigh = None, segment = None, capacity = 1):
         node_attr = {"capacity": capacity, "id": id_, "type": type_}
         loc_attr = {"xlow": xlow, "ylow": ylow, "ptc": ptc,
                 "xhigh": uno(xhigh, xlow), "yhigh": uno(yhigh, ylow)}
@@ -1245,11 +1462,7 @@ class VPR_RRG_Generation(Object, AbstractPass):
             if type_ in ("CHANX", "CHANY"):
                 self.xml.element_leaf("segment", {"segment_id": self.sgmt2id[segment.name]})
 
-    def _edge(self, src_id, sink_id, head_pin_bit = None, tail_pin_bit = None, delay = 0.0, fasm_features = tuple(),
-            switch_id = None):
-        if switch_id is None:
-            switch = self.timing.vpr_interblock_routing_switch(head_pin_bit, tail_pin_bit, delay)
-            switch_id = self.switch2id[switch.name]
+    def _edge_element(self, src_id, sink_id, switch_id, fasm_features = tuple()):
         attrs = {"src_node": src_id,
                 "sink_node": sink_id,
                 "switch_id": switch_id,
@@ -1261,12 +1474,32 @@ class VPR_RRG_Generation(Object, AbstractPass):
         else:
             self.xml.element_leaf("edge", attrs)
 
+    def _edge_elements(self):
+        """Write the edges buffered for binary outputs."""
+        src, sink, switch, fasm = self.edges
+        self.xml.reserve("edge", len(src))
+        for i, (src_id, sink_id, switch_id) in enumerate(zip(src, sink, switch)):
+            self._edge_element(src_id, sink_id, switch_id, fasm.get(i, tuple()))
+
+    def _routing_switches(self, sink_port_bit):
+        """Get the sources of routing box port bit ``sink_port_bit`` together with the delay of each switch. Cached
+        per (routing box, sink port bit) since routing boxes are instantiated many times in the array."""
+        key = (sink_port_bit.parent, NetUtils._reference(sink_port_bit))
+        try:
+            return self.box_switches[key]
+        except KeyError:
+            pass
+        switches = self.box_switches[key] = tuple(
+                (src_port_bit, self.timing.vpr_delay_of_routing_switch(src_port_bit, sink_port_bit))
+                for src_port_bit in NetUtils.get_multisource(sink_port_bit))
+        return switches
+
     def _edge_box_output(self, head_pin_bit, tail_pin_bit, tail_pkg, fasm_features = tuple(), delay = 0.0):
         sink_port_bit = head_pin_bit.bus.model[head_pin_bit.index]
-        for src_port_bit in NetUtils.get_multisource(sink_port_bit):
+        for src_port_bit, switch_delay in self._routing_switches(sink_port_bit):
             this_fasm = fasm_features + self.fasm.fasm_features_for_routing_switch(src_port_bit, sink_port_bit,
                     head_pin_bit.bus.instance)
-            this_delay = delay + self.timing.vpr_delay_of_routing_switch(src_port_bit, sink_port_bit)
+            this_delay = delay + switch_delay
             self._edge_box_input(head_pin_bit.bus.instance.pins[src_port_bit.bus.key][src_port_bit.index],
                     tail_pin_bit, tail_pkg, this_fasm, this_delay)
 
@@ -1321,6 +1554,44 @@ class VPR_RRG_Generation(Object, AbstractPass):
                 return
         _logger.info("Physical connection {} -> {} ignored due to reachability".format(head_pin_bit, tail_pin_bit))
 
+    def _sink_edges(self, top, sink_node):
+        sink_data = self.conn_graph.nodes[sink_node]
+        if (type_ := sink_data["type"]) in ("CHANX", "CHANY"):
+            # 1. get the pin
+            sink_pin = NetUtils._dereference(top, sink_node, coalesced = True)
+            # 2. prepare the tail package
+            ori, lower, higher, _ = self._analyze_track(sink_node)
+            # 3. emit edges
+            for i, sink_pin_bit in enumerate(sink_pin):
+                self._edge_box_output(sink_pin_bit, sink_pin_bit,
+                        # tail_type, tail_id,             lower_pos, higher_pos, orientation
+                        (type_,      sink_data["id"] + i, lower,     higher,     ori))
+        elif type_ == "IPIN":
+            # 1. get the pin
+            sink_pin = NetUtils._dereference(top, sink_node, coalesced = True)
+            # 2. prepare the tail package
+            chan, ori, _ = self._analyze_blockpin(sink_pin)
+            iopin_id = sink_data["id"]
+            srcsink_id = sink_data["srcsink_id"]
+            equivalent = sink_data.get("equivalent", False)
+            # 3. emit edges
+            for i, sink_pin_bit in enumerate(sink_pin):
+                # 3.1 IPIN -> SINK
+                self._edge(iopin_id + i, srcsink_id + (0 if equivalent else i), switch_id = 0)
+                # 3.2 ??? -> IPIN
+                self._edge_box_input(sink_pin_bit, sink_pin_bit,
+                        # tail_type, tail_id,      chan_pos, dimension
+                        (type_,      iopin_id + i, chan,     ori.dimension.perpendicular))
+        elif type_ == "OPIN":
+            # 1. get the pin
+            sink_pin = NetUtils._dereference(top, sink_node, coalesced = True)
+            # 2. emit SOURCE -> OPIN edges
+            iopin_id = sink_data["id"]
+            srcsink_id = sink_data["srcsink_id"]
+            equivalent = sink_data.get("equivalent", False)
+            for i in range(len(sink_pin)):
+                self._edge(srcsink_id + (0 if equivalent else i), iopin_id + i, switch_id = 0)
+
     def run(self, context, renderer = None):
         # runtime-generated data
         self.tile2id = OrderedDict()
@@ -1329,6 +1600,7 @@ class VPR_RRG_Generation(Object, AbstractPass):
         self.switch2id = OrderedDict()
         self.sgmt2id = OrderedDict()
         self.sgmt2ptc = OrderedDict()
+        self.box_switches = {}
         self.chanx = [[(0 < x < context.top.width - 1 and 0 <= y < context.top.height - 1)
             for y in range(context.top.height)] for x in range(context.top.width)]
         self.chany = [[(0 <= x < context.top.width - 1 and 0 < y < context.top.height - 1)
@@ -1336,6 +1608,7 @@ class VPR_RRG_Generation(Object, AbstractPass):
         channel_width = context.summary.vpr["channel_width"] = 2 * sum(sgmt.width * sgmt.length
                 for sgmt in itervalues(context.segments))
         # update VPR summary
+        output_file, fasm, timing = self.output_file, self.fasm, self.timing
         if isinstance(self.output_file, basestring):
             f = os.path.abspath(self.output_file)
             makedirs(os.path.dirname(f))
@@ -1354,7 +1627,29 @@ class VPR_RRG_Generation(Object, AbstractPass):
             self.timing = TimingDelegate()  # fake timing
         self.timing.reset()
         # routing resource graph generation
-        with XMLGenerator(self.output_file, True) as xml, xml.element("rr_graph"):
+        try:
+            self._rr_graph(context, channel_width)
+        except BaseException:
+            # do not leave a truncated RRG behind
+            if isinstance(output_file, basestring):
+                self.output_file.close()
+                os.remove(f)
+            raise
+        finally:
+            # close the output file if it's opened by this pass
+            if isinstance(output_file, basestring):
+                self.output_file.close()
+                self.output_file = output_file
+            # restore the delegates so this pass can be reused with another context
+            self.fasm, self.timing = fasm, timing
+
+    def _rr_graph(self, context, channel_width):
+        """Generate the routing resource graph into the opened output file."""
+        if self.output_format == "capnp":
+            generator = CapnpGenerator(self.output_file, self.capnp_schema, "RrGraph")
+        else:
+            generator = XMLGenerator(self.output_file, self.pretty)
+        with generator as xml, xml.element("rr_graph"):
             self.xml = xml
             # channels:
             with xml.element("channels"):
@@ -1400,9 +1695,12 @@ class VPR_RRG_Generation(Object, AbstractPass):
             # flatten grid and create coalesced connection graph
             with xml.element("grid"):
                 self._grid(context.top)
-                self._construct_conn_graph(context.top)
+                num_nodes = self._construct_conn_graph(context.top)
             # nodes
             with xml.element("rr_nodes"):
+                self._prepare_raw_output()
+                if self.rawfmt is None:
+                    xml.reserve("node", num_nodes)
                 for node, data in self.conn_graph.nodes(data = True):
                     if "id" not in data:
                         continue
@@ -1455,42 +1753,47 @@ class VPR_RRG_Generation(Object, AbstractPass):
                                     pos.x + pin.model.position.x,
                                     pos.y + pin.model.position.y,
                                     port_ori = ori)
+                self._flush_raw_output()
             # edges
             with xml.element("rr_edges"):
-                for sink_node, sink_data in self.conn_graph.nodes(data = True):
-                    if (type_ := sink_data.get("type")) in ("CHANX", "CHANY"):
-                        # 1. get the pin
-                        sink_pin = NetUtils._dereference(context.top, sink_node, coalesced = True)
-                        # 2. prepare the tail package
-                        ori, lower, higher, _ = self._analyze_track(sink_node)
-                        # 3. emit edges
-                        for i, sink_pin_bit in enumerate(sink_pin):
-                            self._edge_box_output(sink_pin_bit, sink_pin_bit,
-                                    # tail_type, tail_id,             lower_pos, higher_pos, orientation
-                                    (type_,      sink_data["id"] + i, lower,     higher,     ori))
-                    elif type_ == "IPIN":
-                        # 1. get the pin
-                        sink_pin = NetUtils._dereference(context.top, sink_node, coalesced = True)
-                        # 2. prepare the tail package
-                        chan, ori, _ = self._analyze_blockpin(sink_pin)
-                        iopin_id = sink_data["id"]
-                        srcsink_id = sink_data["srcsink_id"]
-                        equivalent = sink_data.get("equivalent", False)
-                        # 3. emit edges
-                        for i, sink_pin_bit in enumerate(sink_pin):
-                            # 3.1 IPIN -> SINK
-                            self._edge(iopin_id + i, srcsink_id + (0 if equivalent else i), switch_id = 0)
-                            # 3.2 ??? -> IPIN
-                            self._edge_box_input(sink_pin_bit, sink_pin_bit,
-                                    # tail_type, tail_id,      chan_pos, dimension
-                                    (type_,      iopin_id + i, chan,     ori.dimension.perpendicular))
-                    elif type_ == "OPIN":
-                        # 1. get the pin
-                        sink_pin = NetUtils._dereference(context.top, sink_node, coalesced = True)
-                        # 2. emit SOURCE -> OPIN edges
-                        iopin_id = sink_data["id"]
-                        srcsink_id = sink_data["srcsink_id"]
-                        equivalent = sink_data.get("equivalent", False)
-                        for i in range(len(sink_pin)):
-                            self._edge(srcsink_id + (0 if equivalent else i), iopin_id + i, switch_id = 0)
-            del self.xml
+                sinks = [node for node, data in self.conn_graph.nodes(data = True)
+                        if data.get("type") in ("CHANX", "CHANY", "IPIN", "OPIN")]
+                if (self.jobs is not None and self.jobs > 1 and self.rawfmt is not None and
+                        "fork" in mp.get_all_start_methods()):
+                    # partition sinks into contiguous ranges. Nodes are added into the connection graph tile by
+                    # tile, so each range covers a region of the array. Worker processes are forked from this one
+                    # and share a read-only snapshot of the connection graph and the delegates. Results are
+                    # collected in the order of the ranges so the output is deterministic
+                    self._flush_raw_output()
+                    global _rrg_edges_worker_state
+                    _rrg_edges_worker_state = self, context.top
+                    step = max(1, -(-len(sinks) // (self.jobs * 4)))
+                    try:
+                        with mp.get_context("fork").Pool(self.jobs) as pool:
+                            for text in pool.imap(_rrg_edges_worker,
+                                    (sinks[i:i + step] for i in range(0, len(sinks), step))):
+                                xml.write_raw(text)
+                    finally:
+                        _rrg_edges_worker_state = None
+                else:
+                    if self.jobs is not None and self.jobs > 1:
+                        _logger.warning("Parallel RRG edge generation is not supported {}. "
+                                "Generating RRG edges serially"
+                                .format("for binary outputs" if self.rawfmt is None else "on this platform"))
+                    for sink_node in sinks:
+                        self._sink_edges(context.top, sink_node)
+                    if self.rawfmt is None:
+                        self._edge_elements()
+                self._flush_raw_output()
+            del self.xml, self.rawfmt, self.chunk, self.edges, self.box_switches
+
+# (pass, top) inherited by forked worker processes of `VPR_RRG_Generation`
+_rrg_edges_worker_state = None
+
+def _rrg_edges_worker(sinks):
+    """Generate and serialize the RRG edges sinking to ``sinks`` in a forked worker process."""
+    pass_, top = _rrg_edges_worker_state
+    pass_.xml, pass_.chunk = None, []     # keep everything in ``chunk`` and return it to the parent process
+    for sink_node in sinks:
+        pass_._sink_edges(top, sink_node)
+    return "".join(pass_.chunk)
@@ -11,8 +11,14 @@ from ..util import Object, uno
 from ..exception import PRGAInternalError
 
 import os
+import json
+import hashlib
 import jinja2 as jj
 import fileinput
+import multiprocessing as mp
+
+import logging
+_logger = logging.getLogger(__name__)
 
 # In Python 3.7 and above, ``dict`` preserves insertion order and is more performant than ``OrderedDict``
 OrderedDict = dict
@@ -20,20 +26,67 @@ OrderedDict = dict
 __all__ = ['FileRenderer']
 
 DEFAULT_TEMPLATE_SEARCH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+_MANIFEST_VERSION = 1
+
+# ----------------------------------------------------------------------------
+# -- Template Bytecode Cache -------------------------------------------------
+# ----------------------------------------------------------------------------
+_bytecode_cache = None
+
+def get_bytecode_cache():
+    """Get the on-disk cache of compiled templates shared by all `FileRenderer` s in this process.
+
+    The cache directory is ``$PRGA_TEMPLATE_CACHE`` if set, or ``prga/jinja2`` in ``$XDG_CACHE_HOME`` (default:
+    ``~/.cache``). Setting ``$PRGA_TEMPLATE_CACHE`` to an empty string disables the cache. Cached templates are
+    invalidated when their sources change.
+
+    Returns:
+        :obj:`jinja2.BytecodeCache`: ``None`` if the cache is disabled or the cache directory cannot be created
+    """
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        if (d := os.environ.get("PRGA_TEMPLATE_CACHE")) is None:
+            d = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                    "prga", "jinja2")
+        cache = False
+        if d:
+            try:
+                makedirs(d)
+                cache = jj.FileSystemBytecodeCache(d)
+            except OSError as e:
+                _logger.warning("Template bytecode cache disabled: {}".format(e))
+        _bytecode_cache = cache
+    return _bytecode_cache or None
 
 # ----------------------------------------------------------------------------
 # -- File Renderer -----------------------------------------------------------
 # ----------------------------------------------------------------------------
 class FileRenderer(Object):
-    """File renderer based on Jinja2."""
+    """File renderer based on Jinja2.
+
+    Args:
+        *paths (:obj:`str`): Additional template search paths
+
+    Keyword Args:
+        manifest (:obj:`str`): Path to the render manifest. The manifest records the content hash, size and
+            modification time of each rendered file, so that unchanged files can be detected without reading them in
+            the next rendering
+
+    Files specified by name are only written if their contents change, so their timestamps are kept and downstream
+    builds are not invalidated.
+    """
 
-    __slots__ = ['template_search_paths', 'tasks', 'test_tasks','_yosys_synth_script_task']
-    def __init__(self, *paths):
+    __slots__ = ['template_search_paths', 'tasks', 'test_tasks','_yosys_synth_script_task', 'manifest',
+            'changed_files', '_environment']
+    def __init__(self, *paths, manifest = None):
         self.template_search_paths = [DEFAULT_TEMPLATE_SEARCH_PATH]
         self.template_search_paths.extend(paths)
         self.tasks = OrderedDict()
         self.test_tasks = OrderedDict()
         self._yosys_synth_script_task = None
+        self.manifest = manifest
+        self.changed_files = []
+        self._environment = None
 
     @classmethod
     def _net2verilog(cls, net):
@@ -334,17 +387,161 @@ class FileRenderer(Object):
         # print(formatted_syntax)
         return formatted_syntax
 
-    def render(self):
-        """Render all added files and clear the task queue."""
-        env = jj.Environment(loader = jj.FileSystemLoader(self.template_search_paths))
+    def _new_environment(self):
+        """Get the Jinja2 environment for rendering.
+
+        The environment is reused as long as the template search paths are not changed, and compiled templates are
+        cached on disk and shared by all renderers. Refer to `get_bytecode_cache` for more details.
+        """
+        paths = tuple(self.template_search_paths)
+        if self._environment is not None and self._environment[0] == paths:
+            return self._environment[1]
+        env = jj.Environment(loader = jj.FileSystemLoader(paths), bytecode_cache = get_bytecode_cache())
         env.globals.update(NetUtils=NetUtils)
         env.globals.update(handle_names_with_underscore=self.handle_names_with_underscore)
-        while self.tasks:
-            file_, l = self.tasks.popitem()
-            if isinstance(file_, basestring):
-                d = os.path.dirname(file_)
-                if d:
-                    makedirs(d)
-                file_ = open(file_, OpenMode.wb)
+        self._environment = paths, env
+        return env
+
+    @classmethod
+    def _render_file(cls, env, file_, l, manifest):
+        """Render one file.
+
+        Files specified by name are rendered into memory, and only written (atomically) if the contents differ from
+        the existing file.
+
+        Args:
+            env (:obj:`jinja2.Environment`):
+            file_ (:obj:`str` of file-like object): The output file
+            l (:obj:`Sequence` [:obj:`tuple` [:obj:`str`, :obj:`Mapping` ]]): Templates and their parameters
+            manifest (:obj:`Mapping`): The manifest of the previous rendering
+
+        Returns:
+            :obj:`tuple` [:obj:`str`, :obj:`list`, :obj:`bool` ]: Absolute path of the file, its manifest entry, and
+                if the file is changed. ``None`` if ``file_`` is a file-like object
+        """
+        if not isinstance(file_, basestring):
             for template, parameters in l:
                 env.get_template(template).stream(parameters).dump(file_, encoding="ascii")
+            return None
+        data = b"".join(env.get_template(template).render(parameters).encode("ascii") for template, parameters in l)
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.abspath(file_)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is not None and stat.st_size == len(data):
+            # trust the manifest if the file is not touched since the previous rendering
+            if (entry := manifest.get(path)) is not None and entry[1:] == [stat.st_size, stat.st_mtime_ns]:
+                unchanged = entry[0] == digest
+            else:
+                with open(path, OpenMode.rb) as f:
+                    unchanged = f.read() == data
+            if unchanged:
+                return path, [digest, stat.st_size, stat.st_mtime_ns], False
+        d = os.path.dirname(path)
+        makedirs(d)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp, OpenMode.wb) as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        stat = os.stat(path)
+        return path, [digest, stat.st_size, stat.st_mtime_ns], True
+
+    def _load_manifest(self):
+        """Load the manifest of the previous rendering."""
+        if self.manifest is None or not os.path.exists(self.manifest):
+            return {}
+        try:
+            with open(self.manifest, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == _MANIFEST_VERSION:
+                return manifest["files"]
+        except (ValueError, KeyError, AttributeError):
+            pass
+        _logger.warning("Ignoring invalid render manifest: {}".format(self.manifest))
+        return {}
+
+    def _update_manifest(self, manifest, results):
+        """Update the manifest with rendering ``results`` and record the changed files."""
+        self.changed_files = sorted(path for path, _, changed in results if changed)
+        if results:
+            _logger.info("{} of {} rendered files changed".format(len(self.changed_files), len(results)))
+        if self.manifest is None:
+            return
+        for path, entry, _ in results:
+            manifest[path] = entry
+        d = os.path.dirname(os.path.abspath(self.manifest))
+        makedirs(d)
+        tmp = "{}.{}.tmp".format(self.manifest, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump({"version": _MANIFEST_VERSION, "files": manifest}, f, indent = 0, sort_keys = True)
+        os.replace(tmp, self.manifest)
+
+    def render(self, jobs = None):
+        """Render all added files and clear the task queue.
+
+        Args:
+            jobs (:obj:`int`): If larger than 1, files specified by name are rendered in this many forked processes.
+                The output is identical to rendering serially
+
+        Returns:
+            :obj:`list` [:obj:`str` ]: Absolute paths of the files specified by name whose contents are changed. Also
+                kept in `FileRenderer.changed_files`
+        """
+        manifest = self._load_manifest()
+        if jobs is not None and jobs > 1 and "fork" not in mp.get_all_start_methods():
+            _logger.warning("Parallel rendering is not supported on this platform. Rendering serially")
+            jobs = None
+        if jobs is not None and jobs > 1:
+            results = self._render_parallel(jobs, manifest)
+        else:
+            env = self._new_environment()
+            results = []
+            while self.tasks:
+                file_, l = self.tasks.popitem()
+                if (result := self._render_file(env, file_, l, manifest)) is not None:
+                    results.append(result)
+        self._update_manifest(manifest, results)
+        return self.changed_files
+
+    def _render_parallel(self, jobs, manifest):
+        """Render files specified by name in ``jobs`` forked processes, and the others in this process."""
+        global _render_worker_state
+        tasks = []
+        while self.tasks:
+            tasks.append(self.tasks.popitem())
+        named = [task for task in tasks if isinstance(task[0], basestring)]
+        step = max(1, -(-len(named) // (jobs * 4)))
+        results = []
+        _render_worker_state = self, named, manifest
+        try:
+            with mp.get_context("fork").Pool(jobs) as pool:
+                for r in pool.imap_unordered(_render_worker, (range(i, min(i + step, len(named)))
+                    for i in range(0, len(named), step))):
+                    results.extend(r)
+        finally:
+            _render_worker_state = None
+        env = self._new_environment()
+        for file_, l in tasks:
+            if not isinstance(file_, basestring):
+                self._render_file(env, file_, l, manifest)
+        return results
+
+# (renderer, tasks, manifest) inherited by forked worker processes of `FileRenderer`, and the environment of each
+# worker
+_render_worker_state = None
+_render_worker_env = None
+
+def _render_worker(indices):
+    """Render the tasks at ``indices`` in a forked worker process."""
+    global _render_worker_env
+    renderer, tasks, manifest = _render_worker_state
+    if _render_worker_env is None:
+        _render_worker_env = renderer._new_environment()
+    return [renderer._render_file(_render_worker_env, *tasks[i], manifest) for i in indices]
@@ -3,10 +3,14 @@
 from __future__ import division, absolute_import, print_function
 from prga.compatible import *
 
+from ....capnproto import load_capnp_schema, _snakecase
+
 import networkx as nx
+import io
 import lxml.etree as et
+from array import array
 
-__all__ = ['read_vpr_rrg']
+__all__ = ['read_vpr_rrg', 'CompactRRG', 'read_vpr_rrg_compact']
 
 class _VPRRRGTarget(object):
 
@@ -28,6 +32,8 @@ class _VPRRRGTarget(object):
                     self.g.add_node(i, **{"type": attrs["type"], "direction": attrs["direction"]})
                 else:
                     self.g.add_node(i, **{"type": attrs["type"]})
+            else:
+                self._cur_node = None
         elif self.path and self.path[-1] == "node" and self.info_level == 1 and self._cur_node is not None:
                 self.g.nodes[self._cur_node][tag] = attrs
         elif tag == "edge":
@@ -49,7 +55,63 @@ class _VPRRRGTarget(object):
     def close(self):
         pass
 
-def read_vpr_rrg(istream, ignore_iopin = False, keep_srcsink = False, info_level = 0):
+# attribute names in the XML format that are not the snake_case form of the field names
+_capnp_attr_names = {"r": "R", "c": "C"}
+
+def _capnp_attrs(struct):
+    attrs = {}
+    for k, v in iteritems(struct.to_dict()):
+        if isinstance(v, float):
+            v = '{:g}'.format(v)
+        elif isinstance(v, str) and str(struct.schema.fields[k].proto.slot.type.which) == "enum":
+            if v == "uxsdInvalid":      # not set
+                continue
+            v = _snakecase(v).upper()
+        k = _snakecase(k)
+        attrs[_capnp_attr_names.get(k, k)] = str(v)
+    return attrs
+
+def _read_vpr_rrg_capnp(g, istream, capnp_schema, ignore_iopin, keep_srcsink, info_level):
+    schema = load_capnp_schema(capnp_schema)
+    if isinstance(istream, basestring):
+        with open(istream, OpenMode.rb) as f:
+            rrg = schema.RrGraph.read(f, traversal_limit_in_words = 2 ** 63 - 1)
+            _add_capnp_rrg(g, rrg, ignore_iopin, keep_srcsink, info_level)
+        return
+    try:
+        istream.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        # streams without a file descriptor, e.g. in-memory streams
+        with schema.RrGraph.from_bytes(istream.read(), traversal_limit_in_words = 2 ** 63 - 1) as rrg:
+            _add_capnp_rrg(g, rrg, ignore_iopin, keep_srcsink, info_level)
+    else:
+        rrg = schema.RrGraph.read(istream, traversal_limit_in_words = 2 ** 63 - 1)
+        _add_capnp_rrg(g, rrg, ignore_iopin, keep_srcsink, info_level)
+
+def _add_capnp_rrg(g, rrg, ignore_iopin, keep_srcsink, info_level):
+    for node in rrg.rrNodes.nodes:
+        type_ = str(node.type).upper()
+        if ((type_ in ("SOURCE", "SINK") and keep_srcsink) or
+                (type_ in ("IPIN", "OPIN") and not ignore_iopin) or
+                (type_ in ("CHANX", "CHANY"))):
+            if info_level == 1:
+                attrs = {"type": type_}
+                if (direction := str(node.direction)) != "uxsdInvalid":
+                    attrs["direction"] = _snakecase(direction).upper()
+                for tag in ("loc", "timing", "segment"):
+                    if node._has(tag):
+                        attrs[tag] = _capnp_attrs(getattr(node, tag))
+                g.add_node(node.id, **attrs)
+            else:
+                g.add_node(node.id, type = type_)
+    for edge in rrg.rrEdges.edges:
+        if edge.srcNode in g and edge.sinkNode in g:
+            if info_level == 1:
+                g.add_edge(edge.srcNode, edge.sinkNode, switch_id = str(edge.switchId))
+            else:
+                g.add_edge(edge.srcNode, edge.sinkNode)
+
+def read_vpr_rrg(istream, ignore_iopin = False, keep_srcsink = False, info_level = 0, capnp_schema = None):
     """Read VPR's RRG graph and extract the connection graph.
 
     Args:
@@ -59,11 +121,219 @@ def read_vpr_rrg(istream, ignore_iopin = False, keep_srcsink = False, info_level
         info_level (:obj:`int`): Level of information stored in the graph:
                 - [0] no information is stored. only the abstract graph structure is preserved
                 - [1] all information is stored in the graph
+        capnp_schema (:obj:`str`): If set, ``istream`` is read as a binary (Cap'n Proto) RRG with this schema, i.e.
+            ``rr_graph_uxsdcxx.capnp`` in VPR's source tree. Requires the optional dependency ``pycapnp``. The same
+            graph is returned for the same RRG in either format
 
     Returns:
         ``networkx.DiGraph``
     """
     g = nx.DiGraph()
-    et.parse(istream, parser = et.XMLParser(target = _VPRRRGTarget(g,
-        ignore_iopin, not ignore_iopin and keep_srcsink, info_level)))
+    if capnp_schema is not None:
+        _read_vpr_rrg_capnp(g, istream, capnp_schema, ignore_iopin, not ignore_iopin and keep_srcsink, info_level)
+    else:
+        et.parse(istream, parser = et.XMLParser(target = _VPRRRGTarget(g,
+            ignore_iopin, not ignore_iopin and keep_srcsink, info_level)))
     return g
+
+# ----------------------------------------------------------------------------
+# -- Compact, Array-backed RRG -----------------------------------------------
+# ----------------------------------------------------------------------------
+class CompactRRG(object):
+    """VPR's routing resource graph stored in flat arrays.
+
+    Per-node data are stored in arrays indexed by node ID. Nodes without a segment have segment ID -1. Timing
+    attributes are interned: few distinct values are used by the nodes of an RRG, so each node only stores the index
+    of its values. Edges are stored in the compressed sparse row (CSR) format, once sorted by the source node, and
+    once sorted by the sink node. Use `read_vpr_rrg_compact` to load one from a file.
+    """
+
+    node_types = ("SOURCE", "SINK", "IPIN", "OPIN", "CHANX", "CHANY")
+    directions = (None, "INC_DIR", "DEC_DIR", "BI_DIR")
+    sides = (None, "TOP", "RIGHT", "BOTTOM", "LEFT")
+
+    __slots__ = ['type_', 'direction', 'side', 'xlow', 'ylow', 'xhigh', 'yhigh', 'ptc', 'segment_id',
+            '_timing', '_timing_attrs', '_out_ptr', '_out_idx', '_out_switch', '_in_ptr', '_in_idx']
+
+    # per-node arrays
+    _node_arrays = ('type_', 'direction', 'side', 'xlow', 'ylow', 'xhigh', 'yhigh', 'ptc', 'segment_id', '_timing')
+
+    def __init__(self):
+        for k in ('type_', 'direction', 'side'):
+            setattr(self, k, array('b'))
+        for k in ('xlow', 'ylow', 'xhigh', 'yhigh', 'ptc', 'segment_id', '_timing', '_out_ptr', '_out_idx',
+                '_out_switch', '_in_ptr', '_in_idx'):
+            setattr(self, k, array('i'))
+        self._timing_attrs = []     # distinct timing attributes, as in the file
+
+    def _build_edges(self, src, sink, switch):
+        """Build the CSR arrays from the edge lists."""
+        num_nodes = len(self.type_)
+        out_ptr, in_ptr = array('i', [0]) * (num_nodes + 1), array('i', [0]) * (num_nodes + 1)
+        for u in src:
+            out_ptr[u + 1] += 1
+        for v in sink:
+            in_ptr[v + 1] += 1
+        for i in range(num_nodes):
+            out_ptr[i + 1] += out_ptr[i]
+            in_ptr[i + 1] += in_ptr[i]
+        out_idx, out_switch, in_idx = (array('i', [0]) * len(src) for _ in range(3))
+        out_pos, in_pos = array('i', out_ptr), array('i', in_ptr)
+        for u, v, s in zip(src, sink, switch):
+            out_idx[out_pos[u]] = v
+            out_switch[out_pos[u]] = s
+            out_pos[u] += 1
+            in_idx[in_pos[v]] = u
+            in_pos[v] += 1
+        self._out_ptr, self._out_idx, self._out_switch = out_ptr, out_idx, out_switch
+        self._in_ptr, self._in_idx = in_ptr, in_idx
+
+    def __len__(self):
+        return len(self.type_)
+
+    @property
+    def num_edges(self):
+        """:obj:`int`: Number of edges in the graph."""
+        return len(self._out_idx)
+
+    def node_type(self, node):
+        """:obj:`str`: Type of ``node``."""
+        return self.node_types[self.type_[node]]
+
+    def node_timing(self, node):
+        """:obj:`tuple` [:obj:`float`, :obj:`float` ]: Resistance and capacitance of ``node``, or ``None`` if not
+        specified."""
+        if (i := self._timing[node]) < 0:
+            return None
+        attrs = self._timing_attrs[i]
+        return float(attrs["R"]), float(attrs["C"])
+
+    def successors(self, node):
+        """`array`: IDs of the nodes that ``node`` drives."""
+        return self._out_idx[self._out_ptr[node]:self._out_ptr[node + 1]]
+
+    def predecessors(self, node):
+        """`array`: IDs of the nodes driving ``node``."""
+        return self._in_idx[self._in_ptr[node]:self._in_ptr[node + 1]]
+
+    def out_edges(self, node):
+        """Iterate through (sink, switch ID) pairs of the edges from ``node``."""
+        lo, hi = self._out_ptr[node], self._out_ptr[node + 1]
+        return zip(self._out_idx[lo:hi], self._out_switch[lo:hi])
+
+    def nodes_by_type(self, *types):
+        """:obj:`list` [:obj:`int` ]: IDs of the nodes of any of the given ``types``, e.g. "CHANX"."""
+        codes = set(self.node_types.index(t) for t in types)
+        return [i for i, t in enumerate(self.type_) if t in codes]
+
+    def nodes_at(self, x, y):
+        """:obj:`list` [:obj:`int` ]: IDs of the nodes spanning location (``x``, ``y``)."""
+        return [i for i in range(len(self.type_))
+                if self.xlow[i] <= x <= self.xhigh[i] and self.ylow[i] <= y <= self.yhigh[i]]
+
+    def to_networkx(self, ignore_iopin = False, keep_srcsink = False, info_level = 0):
+        """Convert to the graph `read_vpr_rrg` returns, with the same arguments."""
+        keep_srcsink = not ignore_iopin and keep_srcsink
+        g = nx.DiGraph()
+        for i, t in enumerate(self.type_):
+            type_ = self.node_types[t]
+            if not ((type_ in ("SOURCE", "SINK") and keep_srcsink) or
+                    (type_ in ("IPIN", "OPIN") and not ignore_iopin) or
+                    (type_ in ("CHANX", "CHANY"))):
+                continue
+            elif info_level == 1:
+                attrs = {"type": type_}
+                if (direction := self.directions[self.direction[i]]) is not None:
+                    attrs["direction"] = direction
+                loc = attrs["loc"] = {"xlow": str(self.xlow[i]), "ylow": str(self.ylow[i]),
+                        "ptc": str(self.ptc[i]), "xhigh": str(self.xhigh[i]), "yhigh": str(self.yhigh[i])}
+                if (side := self.sides[self.side[i]]) is not None:
+                    loc["side"] = side
+                if (timing := self._timing[i]) >= 0:
+                    attrs["timing"] = dict(self._timing_attrs[timing])
+                if (segment_id := self.segment_id[i]) >= 0:
+                    attrs["segment"] = {"segment_id": str(segment_id)}
+                g.add_node(i, **attrs)
+            else:
+                g.add_node(i, type = type_)
+        for u in g:
+            for v, switch in self.out_edges(u):
+                if v in g:
+                    if info_level == 1:
+                        g.add_edge(u, v, switch_id = str(switch))
+                    else:
+                        g.add_edge(u, v)
+        return g
+
+class _VPRRRGArrayTarget(object):
+
+    def __init__(self, rrg):
+        self.rrg = rrg
+        self.ids = array('i')
+        self.src, self.sink, self.switch = array('i'), array('i'), array('i')
+        self._type_codes = {t: i for i, t in enumerate(rrg.node_types)}
+        self._direction_codes = {d: i for i, d in enumerate(rrg.directions)}
+        self._side_codes = {s: i for i, s in enumerate(rrg.sides)}
+        self._timing_codes = {}
+        self._in_node = False
+
+    def start(self, tag, attrs, nsmap = None):
+        if tag == "edge":
+            self.src.append(int(attrs["src_node"]))
+            self.sink.append(int(attrs["sink_node"]))
+            self.switch.append(int(attrs["switch_id"]))
+        elif tag == "node":
+            self._in_node = True
+            self.ids.append(int(attrs["id"]))
+            self.rrg.type_.append(self._type_codes[attrs["type"]])
+            self.rrg.direction.append(self._direction_codes[attrs.get("direction")])
+            self.rrg.segment_id.append(-1)
+            self.rrg._timing.append(-1)
+        elif tag == "loc" and self._in_node:
+            for k in ("xlow", "ylow", "xhigh", "yhigh", "ptc"):
+                getattr(self.rrg, k).append(int(attrs[k]))
+            self.rrg.side.append(self._side_codes[attrs.get("side")])
+        elif tag == "timing" and self._in_node:
+            key = tuple(sorted(iteritems(attrs)))
+            if (code := self._timing_codes.get(key)) is None:
+                code = self._timing_codes[key] = len(self.rrg._timing_attrs)
+                self.rrg._timing_attrs.append(dict(key))
+            self.rrg._timing[-1] = code
+        elif tag == "segment" and self._in_node:
+            self.rrg.segment_id[-1] = int(attrs["segment_id"])
+
+    def end(self, tag):
+        if tag == "node":
+            self._in_node = False
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        rrg = self.rrg
+        # reorder nodes by ID if needed
+        if any(i != id_ for i, id_ in enumerate(self.ids)):
+            order = array('i', [0]) * len(self.ids)
+            for i, id_ in enumerate(self.ids):
+                order[id_] = i
+            for k in rrg._node_arrays:
+                a = getattr(rrg, k)
+                setattr(rrg, k, array(a.typecode, (a[i] for i in order)))
+        rrg._build_edges(self.src, self.sink, self.switch)
+
+def read_vpr_rrg_compact(istream):
+    """Read VPR's RRG graph into a `CompactRRG`.
+
+    Compared with `read_vpr_rrg`, this stores node types, locations, ptc, segment IDs, timing and edges (with switch
+    IDs) in flat arrays instead of one Python object per node/edge, and uses a small fraction of the memory. Use
+    `CompactRRG.to_networkx` to get the same graph `read_vpr_rrg` returns.
+
+    Args:
+        istream (:obj:`str` or file-like object): The XML RRG file
+
+    Returns:
+        `CompactRRG`
+    """
+    rrg = CompactRRG()
+    et.parse(istream, parser = et.XMLParser(target = _VPRRRGArrayTarget(rrg)))
+    return rrg
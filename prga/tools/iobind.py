@@ -105,9 +105,7 @@ def iobind(summary, mod_top, fixed = None):
 if __name__ == "__main__":
     args = _parser.parse_args()
     enable_stdout_logging(__name__, logging.INFO)
-    summary = Context.unpickle(args.summary)
-    if isinstance(summary, Context):
-        summary = summary.summary
+    summary = Context.unpickle_summary(args.summary)
     _logger.info("Architecture context summary parsed")
     assignments = iobind(summary, find_verilog_top(args.model, args.model_top),
             parse_io_bindings(args.fixed) if args.fixed is not None else {})
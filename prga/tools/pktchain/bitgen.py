@@ -11,6 +11,7 @@ from ...exception import PRGAInternalError
 from ...cfg.pktchain.protocol import PktchainProtocol
 
 import re
+import sys
 import struct
 from bitarray import bitarray
 import logging
@@ -29,15 +30,21 @@ _parser.add_argument('summary', type=argparse.FileType(OpenMode.rb),
         help="Pickled architecture context or summary object")
 _parser.add_argument('fasm', type=argparse.FileType('r'),
         help="FASM generated by the genfasm util of VPR")
-_parser.add_argument('memh', type=argparse.FileType('wb'),
-        help="Generated bitstream in MEMH format for Verilog simulation")
+_parser.add_argument('output', type=argparse.FileType(OpenMode.wb),
+        help="Generated bitstream")
 _parser.add_argument('-M', '--max_frames_per_packet', type=int, default=255, dest='max_packet_frames',
         help="Maximum number of 32b frames per packet. By default 255")
+_parser.add_argument('-f', '--format', choices=('memh', 'bin', 'raw32'), default='memh',
+        help="Format of the generated bitstream. 'memh' (default): MEMH format for Verilog simulation, with "
+        + "comments; 'bin': packed 32-bit little-endian packet headers and frames; 'raw32': same as 'bin', "
+        + "accepted so that the options match the scanchain bitstream generator")
 
 __doc__ = docstring_from_argparser(_parser)
 
 class PktchainBitgen(object):
     _reversed_crc_lookup = {}   # to be filled later
+    _crc_table = tuple()        # to be filled later
+    _reversed_crc_prefix = {}   # number of zeros -> reversed CRC lookup, filled on demand
 
     @classmethod
     def _int2bitseq(cls, v, bigendian = True):
@@ -49,22 +56,54 @@ class PktchainBitgen(object):
                 yield 1 if v & (1 << i) else 0
 
     @classmethod
-    def crc(cls, seq):
-        crc = 0
+    def crc(cls, seq, crc = 0):
         for i in seq:
             crc = ((crc << 1) & 0xFF) ^ (0x7 if bool(crc & 0x80) != bool(i) else 0x0)
         return crc
 
+    @classmethod
+    def crc_bits(cls, bits):
+        """Same as `crc`, but takes a `bitarray` and processes whole bytes with a lookup table."""
+        bits = bitarray(bits, endian='big')
+        full = len(bits) // 8 * 8
+        crc, table = 0, cls._crc_table
+        for byte in bits[:full].tobytes():
+            crc = table[crc ^ byte]
+        return cls.crc(bits[full:], crc)
+
+    @classmethod
+    def _reversed_crc_prefix_for(cls, zeros):
+        """Build the lookup table from CRC values to prefix checksums when prepended with ``zeros`` zeros.
+
+        Un-shifting a zero out of the CRC register is linear over GF(2), so un-shifting ``zeros`` zeros is computed
+        by exponentiating the linear map, represented by the images of the 8 basis vectors.
+        """
+        def apply(m, v):
+            r = 0
+            for k in range(8):
+                if v & (1 << k):
+                    r ^= m[k]
+            return r
+        result = tuple(1 << k for k in range(8))    # identity
+        base = tuple((1 << k >> 1) ^ (0x83 if k == 0 else 0x0) for k in range(8))
+        while zeros:
+            if zeros & 1:
+                result = tuple(apply(base, v) for v in result)
+            base = tuple(apply(base, v) for v in base)
+            zeros >>= 1
+        return tuple(cls._reversed_crc_lookup.get(apply(result, crc)) for crc in range(256))
+
     @classmethod
     def reverse_crc(cls, crc, zeros = 0):
-        for i in range(zeros):
-            crc = (crc >> 1) ^ (0x83 if crc & 1 else 0x0)
-        # check pre-built CRC lookup table
         try:
-            return cls._reversed_crc_lookup[crc]
+            lookup = cls._reversed_crc_prefix[zeros]
         except KeyError:
+            lookup = cls._reversed_crc_prefix[zeros] = cls._reversed_crc_prefix_for(zeros)
+        # check pre-built CRC lookup table
+        if (prefix := lookup[crc]) is None:
             raise PRGAInternalError("No prefix checksum found for CRC-8 CCITT value 0x{:08x} prepended with {} zeros"
                     .format(crc, zeros))
+        return prefix
 
     @classmethod
     def bitgen(cls,
@@ -72,14 +111,22 @@ class PktchainBitgen(object):
             , istream                   # input file-like object
             , ostream                   # output file-like object
             , max_packet_frames = 255   # maximum number of frames per packet
+            , format_ = "memh"          # output format
             ):
         """Generate bitstream for pktchain configuration circuitry.
 
         Args:
             summary (:obj:`Mappping`): Pktchain summary object
         istream (file-like object):
-        ostream (file-like object):
+        ostream (file-like object): Opened in binary mode
+        max_packet_frames (:obj:`int`): Maximum number of frames per packet
+        format_ (:obj:`str`): "memh", or "bin" (packed 32-bit little-endian packet headers and frames, in the same
+            order as in the MEMH format). "raw32" is an alias of "bin", since pktchain frames are already 32-bit
         """
+        if format_ == "raw32":
+            format_ = "bin"
+        elif format_ not in ("memh", "bin"):
+            raise PRGAInternalError("Unsupported bitstream format: {}".format(format_))
         bits = [[bitarray('0', endian='little') * bitcount
             for y, bitcount in enumerate(col)] for x, col in enumerate(summary.pktchain["fabric"]["chains"])]
         # process features
@@ -120,8 +167,8 @@ class PktchainBitgen(object):
         cfg_width = summary.scanchain["cfg_width"]
         for x, col in enumerate(bits):
             for y, tile in enumerate(col):
-                crc = [cls.crc(iter(b for i, b in enumerate(reversed(tile)) if i % (cfg_width) == idx))
-                        for idx in reversed(range(cfg_width))]
+                reversed_tile = tile[::-1]
+                crc = [cls.crc_bits(reversed_tile[idx::cfg_width]) for idx in reversed(range(cfg_width))]
                 reversed_crc = [cls.reverse_crc(c, len(tile) // cfg_width) for c in crc]
                 checksum = bitarray(endian="little")
                 # fill checksum
@@ -153,11 +200,17 @@ class PktchainBitgen(object):
                             PktchainProtocol.Programming.MSGType.DATA_CHECKSUM if not init and checksum else
                             PktchainProtocol.Programming.MSGType.DATA)
                     payload = min(max_packet_frames, total_frames - pkt * max_packet_frames)
+                    header = PktchainProtocol.Programming.encode_msg_header(msg_type, x, y, payload)
+                    if format_ == "bin":
+                        hi = total_frames - pkt * max_packet_frames
+                        ostream.write(struct.pack("<L", header))
+                        # ``bitstream`` is little-endian, so each 4-byte chunk is a little-endian frame
+                        frames = bitstream[(hi - payload) * 32:hi * 32].tobytes()
+                        ostream.write(b"".join(frames[i:i + 4] for i in reversed(range(0, len(frames), 4))))
+                        continue
                     ostream.write("// {} packet to ({}, {}), {} frames\n"
                             .format(msg_type.name, x, y, payload).encode("ascii"))
-                    ostream.write("{:0>8x}\n"
-                            .format(PktchainProtocol.Programming.encode_msg_header(msg_type, x, y, payload))
-                            .encode("ascii"))
+                    ostream.write("{:0>8x}\n".format(header).encode("ascii"))
                     for i in range(payload):
                         i = total_frames - pkt * max_packet_frames - 1 - i
                         ostream.write("{:0>8x}\n".format(
@@ -169,13 +222,13 @@ class PktchainBitgen(object):
 PktchainBitgen._reversed_crc_lookup = {
         PktchainBitgen.crc(PktchainBitgen._int2bitseq(i)) : i
         for i in range(256)}
+PktchainBitgen._crc_table = tuple(PktchainBitgen.crc(PktchainBitgen._int2bitseq(i)) for i in range(256))
 
 if __name__ == '__main__':
     args = _parser.parse_args()
-    enable_stdout_logging(__name__, logging.INFO)
-    summary = Context.unpickle(args.summary)
-    if isinstance(summary, Context):
-        summary = summary.summary
+    if args.output is not getattr(sys.stdout, "buffer", sys.stdout):     # keep the bitstream clean on stdout
+        enable_stdout_logging(__name__, logging.INFO)
+    summary = Context.unpickle_summary(args.summary)
     _logger.info("Architecture context summary parsed")
-    PktchainBitgen.bitgen(summary, args.fasm, args.memh, args.max_packet_frames)
+    PktchainBitgen.bitgen(summary, args.fasm, args.output, args.max_packet_frames, args.format)
     _logger.info("Bitstream generated. Bye")
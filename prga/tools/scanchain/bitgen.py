@@ -9,7 +9,7 @@ from ...core.common import ModuleView
 from ...util import enable_stdout_logging
 
 import re   # for the simple FASM, regexp processing is good enough
-import struct
+import sys
 from bitarray import bitarray
 import logging
 
@@ -23,8 +23,12 @@ _parser.add_argument('summary', type=argparse.FileType(OpenMode.rb),
         help="Pickled architecture context or summary object")
 _parser.add_argument('fasm', type=argparse.FileType('r'),
         help="FASM generated by the genfasm util of VPR")
-_parser.add_argument('memh', type=argparse.FileType('w'),
-        help="Generated bitstream in MEMH format for Verilog simulation")
+_parser.add_argument('output',
+        help="Generated bitstream. '-' for stdout")
+_parser.add_argument('-f', '--format', choices=('memh', 'bin', 'raw32'), default='memh',
+        help="Format of the generated bitstream. 'memh' (default): MEMH format for Verilog simulation, one 64-bit "
+        + "word per line; 'bin': packed 64-bit little-endian words in the same order as 'memh'; "
+        + "'raw32': packed 32-bit little-endian words in the same order as 'memh'")
 
 # update docstring
 __doc__ = docstring_from_argparser(_parser)
@@ -32,57 +36,108 @@ __doc__ = docstring_from_argparser(_parser)
 _logger = logging.getLogger(__name__)
 _reprog_param = re.compile("^b(?P<offset>\d+)\[(?P<high>\d+):(?P<low>\d+)\]=(?P<width>\d+)'b(?P<content>[01]+)$")
 
+def _parse_fasm(istream, bits):
+    """Parse all FASM features in ``istream`` and set the corresponding bits in ``bits``.
+
+    The whole file is read at once. Single-bit features are collected into index lists and set with scatter
+    operations, and parameters are copied in as bit slices.
+    """
+    singles = []
+    def flush_singles():
+        if singles:
+            try:
+                bits[singles] = True
+            except TypeError:   # sequence indexing is not supported by bitarray < 2.9
+                for i in singles:
+                    bits[i] = True
+            del singles[:]
+    for lineno, line in enumerate(istream.read().splitlines()):
+        prefix, _, feature = line.strip().rpartition('.')
+        if feature == 'ignored':
+            continue
+        base = sum(int(segment[1:]) for segment in prefix.split('.')) if prefix else 0
+        if '[' in feature:
+            matched = _reprog_param.match(feature)
+            base += int(matched.group('offset'))
+            content = matched.group('content')
+            high, low, width = map(lambda x: int(matched.group(x)), ('high', 'low', 'width'))
+            if high < low:
+                raise RuntimeError("LINE {:>08d}: Invalid range specifier".format(lineno + 1))
+            elif width != len(content):
+                raise RuntimeError("LINE {:>08d}: Explicit width specifier mismatches with number of bits"
+                        .format(lineno + 1))
+            actual_width = high - low + 1
+            segment = bitarray(content[::-1], endian='little')
+            if actual_width > width:
+                segment.extend((False, ) * (actual_width - width))
+            flush_singles()     # keep the order of features in case they overlap
+            bits[base + low: base + low + actual_width] = segment[0: actual_width]
+        else:
+            singles.append(base + int(feature[1:]))
+    flush_singles()
+
+def _write_memh(bits, ostream):
+    """Write ``bits`` into ``ostream`` in MEMH format, one quad word per line, most significant quad word first."""
+    digits = bits.tobytes()[::-1].hex()
+    for i in range(0, len(digits), 16):
+        ostream.write(digits[i:i + 16] + '\n')
+
+def _write_words(bits, ostream, wordsize):
+    """Write ``bits`` into ``ostream`` as packed little-endian words of ``wordsize`` bytes, most significant word
+    first."""
+    # ``bits`` is a little-endian bitarray, so each ``wordsize``-byte chunk of its buffer is already a little-endian
+    # word regardless of the byte order of the host
+    data = bits.tobytes()
+    ostream.write(b"".join(data[i:i + wordsize] for i in reversed(range(0, len(data), wordsize))))
+
 def bitgen_scanchain(bitstream_size     # bitstream size
         , istream                       # input file-like object
         , ostream                       # output file-like object
+        , format_ = "memh"              # output format
         ):
     """Generate bitstream for scanchain configuration circuitry.
 
     Args:
         bitstream_size (:obj:`int`): bitstream size
         istream (file-like object):
-        ostream (file-like object):
+        ostream (file-like object): Must be opened in binary mode unless ``format_`` is "memh"
+        format_ (:obj:`str`): "memh", "bin" (packed 64-bit little-endian words), or "raw32" (packed 32-bit
+            little-endian words). Words are written in the same order as in the MEMH format, so "bin" is the binary
+            form of the MEMH file, while "raw32" swaps the two halves of each quad word, for loaders that consume 32b
+            words
     """
     qwords = bitstream_size // 64
     remainder = bitstream_size % 64 
     if remainder > 0:
         qwords += 1
-    bits = bitarray('0', endian='little') * (qwords * 64)
+    bits = bitarray(qwords * 64, endian='little')
+    bits.setall(False)
     # process features
-    for lineno, line in enumerate(istream):
-        segments = line.strip().split('.')
-        if segments[-1] == 'ignored':
-            continue
-        base = sum(int(segment[1:]) for segment in segments[:-1])
-        if '[' in segments[-1]:
-            matched = _reprog_param.match(segments[-1])
-            base += int(matched.group('offset'))
-            segment = bitarray(matched.group('content'))
-            segment.reverse()
-            high, low, width = map(lambda x: int(matched.group(x)), ('high', 'low', 'width'))
-            if high < low:
-                raise RuntimeError("LINE {:>08d}: Invalid range specifier".format(lineno + 1))
-            elif width != len(segment):
-                raise RuntimeError("LINE {:>08d}: Explicit width specifier mismatches with number of bits"
-                        .format(lineno + 1))
-            actual_width = high - low + 1
-            if actual_width > width:
-                segment.extend((False, ) * (actual_width - width))
-            bits[base + low: base + low + actual_width] = segment[0: actual_width]
-        else:
-            bits[base + int(segments[-1][1:])] = True
+    _parse_fasm(istream, bits)
     # emit lines in quad words
-    for i in reversed(range(qwords)):
-        ostream.write('{:0>16x}'.format(struct.unpack('<Q', bits[i*64:(i + 1)*64].tobytes())[0]) + '\n')
+    if format_ == "memh":
+        _write_memh(bits, ostream)
+    elif format_ == "bin":
+        _write_words(bits, ostream, 8)
+    elif format_ == "raw32":
+        _write_words(bits, ostream, 4)
+    else:
+        raise RuntimeError("Unsupported bitstream format: {}".format(format_))
 
 if __name__ == '__main__':
     args = _parser.parse_args()
-    enable_stdout_logging(__name__, logging.INFO)
-    summary = Context.unpickle(args.summary)
-    if isinstance(summary, Context):
-        summary = summary.summary
+    if args.output != '-':     # keep the bitstream clean when it's written to stdout
+        enable_stdout_logging(__name__, logging.INFO)
+    summary = Context.unpickle_summary(args.summary)
     bitstream_size = summary.scanchain["bitstream_size"]
     _logger.info("Architecture context summary parsed")
     _logger.info("Bitstream size: {}".format(bitstream_size))
-    bitgen_scanchain(bitstream_size, args.fasm, args.memh)
+    # the output is opened after parsing, since its mode depends on the format
+    if args.output == '-':
+        bitgen_scanchain(bitstream_size, args.fasm, sys.stdout if args.format == 'memh' else sys.stdout.buffer,
+                args.format)
+        sys.stdout.flush()
+    else:
+        with open(args.output, 'w' if args.format == 'memh' else OpenMode.wb) as ostream:
+            bitgen_scanchain(bitstream_size, args.fasm, ostream, args.format)
     _logger.info("Bitstream generated. Bye")
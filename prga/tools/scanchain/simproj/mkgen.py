@@ -103,9 +103,7 @@ if __name__ == '__main__':
     behav_top = find_verilog_top(args.model, args.model_top)
     ostream = sys.stdout if args.output is None else args.output
 
-    summary = Context.unpickle(args.summary)
-    if isinstance(summary, Context):
-        summary = summary.summary
+    summary = Context.unpickle_summary(args.summary)
 
     # create renderer
     r = FileRenderer(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'templates'))
@@ -7,7 +7,6 @@ from .util import find_verilog_top, parse_io_bindings, parse_parameters, create_
 from ..core.context import Context
 from ..renderer.renderer import FileRenderer
 
-import jinja2 as jj
 import os
 import sys
 
@@ -19,7 +18,7 @@ _parser = create_argparser(__name__, description="Design-specific synthesis scri
 
 _parser.add_argument('summary', type=argparse.FileType(OpenMode.rb),
         help="Pickled architecture context summary object")
-_parser.add_argument('-o', '--output', type=argparse.FileType("w"), dest='output',
+_parser.add_argument('-o', '--output', type=argparse.FileType(OpenMode.wb), dest='output',
         help="Generated script")
 _parser.add_argument('-m', '--model', type=str, nargs='+', dest="model",
         help="Source file(s) for behavioral model")
@@ -49,12 +48,14 @@ def generate_yosys_script(summary, renderer, ostream, model, model_sources, temp
 if __name__ == '__main__':
     args = _parser.parse_args()
 
-    summary = Context.unpickle(args.summary)
+    summary = Context.unpickle_summary(args.summary)
     model_top = find_verilog_top(args.model, args.model_top)
     model_top.parameters = parse_parameters(args.model_parameters) 
-    ostream = sys.stdout if args.output is None else args.output
+    # the renderer writes encoded bytes into streams
+    ostream = sys.stdout.buffer if args.output is None else args.output
 
     # create renderer
     r = FileRenderer(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'templates'))
 
-    generate_yosys_script(summary, r, ostream.model, model_top, args.model)
+    generate_yosys_script(summary, r, ostream, model_top, args.model)
+    r.render()
@@ -5,9 +5,11 @@
 from __future__ import division, absolute_import, print_function
 from prga.compatible import *
 
+from .exception import PRGAInternalError
+
 from lxml.etree import xmlfile
 
-__all__ = ['XMLGenerator']
+__all__ = ['XMLGenerator', 'XMLFragment']
 
 # ----------------------------------------------------------------------------
 # -- Stream-based XML Generator ----------------------------------------------
@@ -35,6 +37,35 @@ class XMLGenerator(object):
     def __exit__(self, exc_type, exc_value, traceback):
         return self.__context.__exit__(exc_type, exc_value, traceback)
 
+    @property
+    def pretty(self):
+        """:obj:`bool`: If the output XML is nicely broken into multiple lines and indented."""
+        return self.__pretty
+
+    @property
+    def depth(self):
+        """:obj:`int`: Current depth of the element hierarchy."""
+        return self._depth
+
+    @classmethod
+    def escape(cls, text):
+        """Escape ``text`` so that it can be used as the text content of an XML element."""
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+    def write_raw(self, text):
+        """Write pre-serialized XML ``text`` directly into the output stream, bypassing lxml.
+
+        Args:
+            text (:obj:`str`): Serialized XML. Special characters must be escaped already (see `escape`), and
+                indentation/line breaks are the responsibility of the caller
+
+        This is only supported when the output stream is a binary file-like object.
+        """
+        if isinstance(self.__ostream, basestring):
+            raise PRGAInternalError("Raw output is not supported when the output stream is a file name")
+        self._xf.flush()
+        self.__ostream.write(text.encode('ascii', 'xmlcharrefreplace'))
+
     def _stringify(self, d):
         if self.__skip_stringify:
             return d
@@ -90,3 +121,51 @@ class XMLGenerator(object):
             elif len(lines) == 1:
                 self._xf.write(lines[0].strip())
         self._newline()
+
+# ----------------------------------------------------------------------------
+# -- Recorded XML Fragment ---------------------------------------------------
+# ----------------------------------------------------------------------------
+class XMLFragment(object):
+    """Recorder of XML elements with the same element interface as `XMLGenerator`. The recorded elements can be
+    written into generators with `replay`, any number of times and at any depth."""
+
+    def __init__(self):
+        self._stack = [[]]  # children lists of the open elements, each child being (tag, attrs, children, text)
+
+    class __ElementContextManager(object):
+        """Context manager for an element."""
+        def __init__(self, fragment, tag, attrs):
+            self.__fragment = fragment
+            self.__tag = tag
+            self.__attrs = attrs
+
+        def __enter__(self):
+            children = []
+            self.__fragment._stack[-1].append( (self.__tag, self.__attrs, children, None) )
+            self.__fragment._stack.append(children)
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.__fragment._stack.pop()
+
+    def element(self, tag, attrs = None):
+        return self.__ElementContextManager(self, tag, attrs)
+
+    def element_leaf(self, tag, attrs = None, text = ''):
+        self._stack[-1].append( (tag, attrs, None, text) )
+
+    def replay(self, generator):
+        """Write the recorded elements into ``generator``.
+
+        Args:
+            generator (`XMLGenerator` or `XMLFragment`):
+        """
+        self._replay(generator, self._stack[0])
+
+    @classmethod
+    def _replay(cls, generator, elements):
+        for tag, attrs, children, text in elements:
+            if children is None:
+                generator.element_leaf(tag, attrs, text)
+            else:
+                with generator.element(tag, attrs):
+                    cls._replay(generator, children)
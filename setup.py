@@ -21,6 +21,7 @@ setup(
             "Topic :: Scientific/Engineering :: Electronic Design Automation (EDA)",
             ],
         install_requires = ["future", "jinja2", "lxml", "networkx", "bitarray", "hdlparse", "cocotb"],
+        extras_require = {"capnp": ["pycapnp"]},
         setup_requires = ["pytest-runner"],
         tests_require = ["pytest"],
         )
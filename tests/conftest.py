@@ -0,0 +1,100 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga import *
+
+from itertools import product
+import pytest
+
+def build_scanchain_context(variants = 3, height = 4, inject = True):
+    """Build a small scanchain fabric with translation and configuration circuitry injection done.
+
+    The same cluster is used in ``variants`` logic blocks with 1 to 3 clusters each, one logic block per column.
+    Only translation is done if ``inject`` is ``False``.
+    """
+    context = Scanchain.new_context(1)
+    gbl_clk = context.create_global("clk", is_clock = True)
+    gbl_clk.bind((0, 1), 0)
+    context.create_segment('L1', 4, 1)
+    context.create_segment('L2', 2, 2)
+
+    builder = context.build_io_block("iob")
+    o = builder.create_input("outpad", 1)
+    i = builder.create_output("inpad", 1)
+    builder.connect(builder.instances['io'].pins['inpad'], i)
+    builder.connect(o, builder.instances['io'].pins['outpad'])
+    iob = builder.commit()
+
+    iotiles = {}
+    for ori in Orientation:
+        builder = context.build_tile(iob, 2, name = "t_io_{}".format(ori.name[0]),
+                edge = OrientationTuple(False, **{ori.name: True}))
+        iotiles[ori] = builder.fill( (1., 1.) ).auto_connect().commit()
+
+    builder = context.build_cluster("ble")
+    clk = builder.create_clock("clk")
+    i = builder.create_input("i", 4)
+    o = builder.create_output("o", 1)
+    lut = builder.instantiate(context.primitives["lut4"], "lut")
+    ff = builder.instantiate(context.primitives["flipflop"], "ff")
+    builder.connect(clk, ff.pins['clk'])
+    builder.connect(i, lut.pins['bits_in'])
+    builder.connect(lut.pins['out'], o)
+    builder.connect(lut.pins['out'], ff.pins['D'], vpr_pack_patterns = ('lut_dff', ))
+    builder.connect(ff.pins['Q'], o)
+    ble = builder.commit()
+
+    builder = context.build_cluster("cluster")
+    clk = builder.create_clock("clk")
+    i = builder.create_input("i", 6)
+    o = builder.create_output("o", 2)
+    bles = builder.instantiate(ble, "ble", 2)
+    for k, inst in enumerate(bles):
+        builder.connect(clk, inst.pins['clk'])
+        builder.connect(i, inst.pins['i'], fully = True)
+        builder.connect(inst.pins['o'], o[k])
+        for b in bles:
+            builder.connect(b.pins['o'], inst.pins['i'], fully = True)
+    cluster = builder.commit()
+
+    tiles = []
+    for v in range(variants):
+        builder = context.build_logic_block("clb{}".format(v))
+        clk = builder.create_global(gbl_clk, Orientation.south)
+        nc = 1 + v % 3
+        in_ = builder.create_input("in", 6 * nc, Orientation.west)
+        out = builder.create_output("out", 2 * nc, Orientation.east)
+        for k, inst in enumerate(builder.instantiate(cluster, "cluster", nc)):
+            builder.connect(clk, inst.pins['clk'])
+            builder.connect(in_[6 * k:6 * (k + 1)], inst.pins['i'])
+            builder.connect(inst.pins['o'], out[2 * k:2 * (k + 1)])
+        tiles.append(context.build_tile(builder.commit()).fill( (0.4, 0.25) ).auto_connect().commit())
+
+    builder = context.build_array('top', variants + 2, height, set_as_top = True)
+    for x, y in product(range(builder.width), range(builder.height)):
+        if x == 0:
+            if 0 < y < builder.height - 1:
+                builder.instantiate(iotiles[Orientation.west], (x, y))
+        elif x == builder.width - 1:
+            if 0 < y < builder.height - 1:
+                builder.instantiate(iotiles[Orientation.east], (x, y))
+        elif y == 0:
+            builder.instantiate(iotiles[Orientation.south], (x, y))
+        elif y == builder.height - 1:
+            builder.instantiate(iotiles[Orientation.north], (x, y))
+        else:
+            builder.instantiate(tiles[x - 1], (x, y))
+    builder.fill( SwitchBoxPattern.wilton ).auto_connect().commit()
+
+    if inject:
+        Flow(TranslationPass(), Scanchain.InjectConfigCircuitry()).run(context)
+    else:
+        Flow(TranslationPass()).run(context)
+    return context
+
+@pytest.fixture(scope = "session")
+def scanchain_context():
+    """A small scanchain fabric shared by tests that do not modify the netlist."""
+    return build_scanchain_context()
@@ -0,0 +1,120 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.tools.scanchain.bitgen import bitgen_scanchain
+from prga.tools.pktchain.bitgen import PktchainBitgen
+
+from bitarray import bitarray
+from io import StringIO, BytesIO
+from itertools import chain, repeat
+from types import SimpleNamespace
+import os
+import sys
+import random
+import subprocess
+import pytest
+
+_fasm = """x0.y0.b3
+b70
+b100[5:0]=6'b101101
+x1.b2.b125
+b7.ignored
+"""
+
+def _scanchain(format_, size = 150):
+    ostream = StringIO() if format_ == "memh" else BytesIO()
+    bitgen_scanchain(size, StringIO(_fasm), ostream, format_)
+    return ostream.getvalue()
+
+def _words(data, wordsize):
+    return [int.from_bytes(data[i:i + wordsize], "little") for i in range(0, len(data), wordsize)]
+
+def test_scanchain_memh():
+    value = (1 << 3) | (1 << 70) | (0b101101 << 100) | (1 << 128)
+    lines = _scanchain("memh").splitlines()
+    assert len(lines) == 3
+    assert int("".join(lines), 16) == value
+
+def test_scanchain_bin():
+    qwords = [int(line, 16) for line in _scanchain("memh").splitlines()]
+    data = _scanchain("bin")
+    assert len(data) == 8 * len(qwords)
+    assert _words(data, 8) == qwords
+
+def test_scanchain_raw32():
+    qwords = [int(line, 16) for line in _scanchain("memh").splitlines()]
+    data = _scanchain("raw32")
+    assert len(data) == 8 * len(qwords)
+    assert _words(data, 4) == [w for q in qwords for w in (q >> 32, q & 0xFFFFFFFF)]
+
+def test_scanchain_unknown_format():
+    with pytest.raises(RuntimeError):
+        _scanchain("hex")
+
+_summary = SimpleNamespace(
+        pktchain = {"fabric": {"chains": [[40, 100], [8, 16]]}},
+        scanchain = {"cfg_width": 1},
+        )
+
+_pkt_fasm = """x0.y0.b3
+x0.y1.b64[7:0]=8'b11001010
+x1.y0.b5
+"""
+
+def _pktchain(format_, max_packet_frames = 2):
+    ostream = BytesIO()
+    PktchainBitgen.bitgen(_summary, StringIO(_pkt_fasm), ostream, max_packet_frames, format_)
+    return ostream.getvalue()
+
+def test_pktchain_bin():
+    memh = [int(line, 16) for line in _pktchain("memh").decode("ascii").splitlines()
+            if line and not line.startswith("//")]
+    data = _pktchain("bin")
+    assert len(data) == 4 * len(memh)
+    assert _words(data, 4) == memh
+
+@pytest.mark.parametrize("length", [0, 5, 8, 13, 64, 131])
+def test_pktchain_crc_bits(length):
+    rng = random.Random(length)
+    bits = [rng.randrange(2) for _ in range(length)]
+    assert PktchainBitgen.crc_bits(bitarray(bits)) == PktchainBitgen.crc(bits)
+
+def _reverse_crc(crc, zeros):
+    for _ in range(zeros):
+        crc = (crc >> 1) ^ (0x83 if crc & 1 else 0x0)
+    return PktchainBitgen._reversed_crc_lookup[crc]
+
+@pytest.mark.parametrize("zeros", [0, 1, 7, 8, 100, 1027])
+def test_pktchain_reverse_crc(zeros):
+    for crc in range(256):
+        prefix = PktchainBitgen.reverse_crc(crc, zeros)
+        assert prefix == _reverse_crc(crc, zeros)
+        # the prefix checksum followed by ``zeros`` zeros yields ``crc``
+        assert PktchainBitgen.crc(chain(PktchainBitgen._int2bitseq(prefix), repeat(0, zeros))) == crc
+
+def test_pktchain_raw32():
+    # pktchain frames are 32-bit, so 'raw32' is the same as 'bin'
+    assert _pktchain("raw32") == _pktchain("bin")
+
+def _scanchain_cli(context, tmpdir, *args):
+    summary = str(tmpdir.join("summary.pkl"))
+    context.pickle_summary(summary)
+    fasm = tmpdir.join("design.fasm")
+    fasm.write(_fasm)
+    return subprocess.run([sys.executable, "-m", "prga.tools.scanchain.bitgen", summary, str(fasm)] + list(args),
+            stdout = subprocess.PIPE, stderr = subprocess.PIPE, check = True,
+            env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path))).stdout
+
+@pytest.mark.parametrize("format_", ["memh", "bin", "raw32"])
+def test_scanchain_cli(scanchain_context, tmpdir, format_):
+    size = scanchain_context.summary.scanchain["bitstream_size"]
+    expected = _scanchain(format_, size)
+    output = str(tmpdir.join("bitstream"))
+    _scanchain_cli(scanchain_context, tmpdir, output, "-f", format_)
+    with open(output, "r" if format_ == "memh" else "rb") as f:
+        assert f.read() == expected
+    # '-' writes to stdout
+    stdout = _scanchain_cli(scanchain_context, tmpdir, "-", "-f", format_)
+    assert stdout == (expected.encode("ascii") if format_ == "memh" else expected)
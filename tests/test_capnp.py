@@ -0,0 +1,109 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.capnproto import CapnpGenerator, load_capnp_schema
+from prga.passes.vpr import VPRArchGeneration, VPR_RRG_Generation
+from prga.tools.analysis.rrg.util import read_vpr_rrg
+from prga.exception import PRGAInternalError
+
+import os
+import io
+import lxml.etree as et
+import pytest
+
+pytest.importorskip("capnp")
+
+# set $PRGA_VPR_RRG_SCHEMA to VPR's rr_graph_uxsdcxx.capnp to test against VPR's schema instead of the approximation
+_schema = (os.environ.get("PRGA_VPR_RRG_SCHEMA") or
+        os.path.join(os.path.dirname(__file__), "data", "rr_graph_uxsdcxx.capnp"))
+
+@pytest.fixture(scope = "module")
+def rrg_files(scanchain_context, tmpdir_factory):
+    d = tmpdir_factory.mktemp("rrg")
+    VPRArchGeneration(str(d.join("arch.xml"))).run(scanchain_context)
+    VPR_RRG_Generation(str(d.join("rrg.xml"))).run(scanchain_context)
+    VPR_RRG_Generation(str(d.join("rrg.bin")), output_format = "capnp", capnp_schema = _schema).run(scanchain_context)
+    return str(d.join("rrg.xml")), str(d.join("rrg.bin"))
+
+@pytest.mark.parametrize("ignore_iopin, keep_srcsink", [(False, False), (False, True), (True, True)])
+@pytest.mark.parametrize("info_level", [0, 1])
+def test_capnp_rrg(rrg_files, ignore_iopin, keep_srcsink, info_level):
+    xml, bin_ = rrg_files
+    kwargs = dict(ignore_iopin = ignore_iopin, keep_srcsink = keep_srcsink, info_level = info_level)
+    g, expected = read_vpr_rrg(bin_, capnp_schema = _schema, **kwargs), read_vpr_rrg(xml, **kwargs)
+    assert dict(g.nodes(data = True)) == dict(expected.nodes(data = True))
+    assert sorted(g.edges(data = True)) == sorted(expected.edges(data = True))
+
+def test_capnp_rrg_header(rrg_files):
+    xml, bin_ = rrg_files
+    root = et.parse(xml).getroot()
+    with open(bin_, "rb") as f:
+        rrg = load_capnp_schema(_schema).RrGraph.read(f, traversal_limit_in_words = 2 ** 63 - 1)
+        channel = root.find("channels/channel")
+        assert rrg.channels.channel.chanWidthMax == int(channel.get("chan_width_max"))
+        assert len(rrg.channels.xLists) == len(root.findall("channels/x_list"))
+        assert ([(s.id, s.name, s.timing.r) for s in rrg.switches.switches] ==
+                [(int(e.get("id")), e.get("name"), float(e.find("timing").get("R")))
+                    for e in root.findall("switches/switch")])
+        assert ([(s.id, s.name) for s in rrg.segments.segments] ==
+                [(int(e.get("id")), e.get("name")) for e in root.findall("segments/segment")])
+        assert ([(b.name, [(str(c.type), [(p.ptc, p.value) for p in c.pins]) for c in b.pinClasses])
+            for b in rrg.blockTypes.blockTypes] ==
+            [(e.get("name"), [(c.get("type").lower(), [(int(p.get("ptc")), p.text) for p in c.findall("pin")])
+                for c in e.findall("pin_class")]) for e in root.findall("block_types/block_type")])
+        assert ([(l.x, l.y, l.blockTypeId) for l in rrg.grid.gridLocs] ==
+                [(int(e.get("x")), int(e.get("y")), int(e.get("block_type_id")))
+                    for e in root.findall("grid/grid_loc")])
+        assert len(rrg.rrNodes.nodes) == len(root.findall("rr_nodes/node"))
+        assert len(rrg.rrEdges.edges) == len(root.findall("rr_edges/edge"))
+
+def test_capnp_rrg_symbiflow(rrg_files):
+    # SymbiFlow's rr_graph package reads VPR's binary RRG independently of PRGA
+    graph2 = pytest.importorskip("rr_graph.capnp.graph2")
+    xml, bin_ = rrg_files
+    expected = read_vpr_rrg(xml, keep_srcsink = True, info_level = 1)
+    g = graph2.graph_from_capnp(load_capnp_schema(_schema), bin_, filter_nodes = False, load_edges = True)
+    assert len(g["nodes"]) == len(expected)
+    assert len(g["edges"]) == expected.number_of_edges()
+    for node in g["nodes"]:
+        data = expected.nodes[node.id]
+        assert node.type.name == data["type"]
+        assert (node.loc.x_low, node.loc.y_low, node.loc.x_high, node.loc.y_high, node.loc.ptc) == tuple(
+                int(data["loc"][k]) for k in ("xlow", "ylow", "xhigh", "yhigh", "ptc"))
+    assert sorted((e.src_node, e.sink_node, e.switch_id) for e in g["edges"]) == sorted(
+            (u, v, int(d["switch_id"])) for u, v, d in expected.edges(data = True))
+
+def _generate(*elements, reserved = None):
+    f = io.BytesIO()
+    with CapnpGenerator(f, _schema, "RrGraph") as g, g.element("rr_graph"), g.element("rr_nodes"):
+        if reserved is not None:
+            g.reserve("node", reserved)
+        for id_, fasm in elements:
+            with g.element("node", {"id": id_, "type": "CHANX", "direction": "INC_DIR"}):
+                g.element_leaf("loc", {"xlow": id_, "ylow": 1, "xhigh": 2, "yhigh": 1, "ptc": 0})
+                if fasm:
+                    with g.element("metadata"):
+                        g.element_leaf("meta", {"name": "fasm_features"}, fasm)
+    with load_capnp_schema(_schema).RrGraph.from_bytes(f.getvalue()) as rrg:
+        return rrg.to_dict()
+
+@pytest.mark.parametrize("reserved", [None, 3])
+def test_capnp_generator(reserved):
+    # reserved lists are written directly, other lists are buffered until their parent is closed
+    nodes = _generate((4, ""), (5, "a.b\n  c.d"), (6, ""), reserved = reserved)["rrNodes"]["nodes"]
+    assert [(n["id"], n["type"], n["direction"], n["loc"]["xlow"], n["loc"]["xhigh"]) for n in nodes] == [
+            (i, "chanx", "incDir", i, 2) for i in (4, 5, 6)]
+    assert [n.get("metadata") for n in nodes] == [
+            None, {"metas": [{"name": "fasm_features", "value": "a.b\nc.d"}]}, None]
+
+@pytest.mark.parametrize("reserved", [2, 4])
+def test_capnp_generator_reserved_mismatch(reserved):
+    with pytest.raises(PRGAInternalError, match = "reserved"):
+        _generate((0, ""), (1, ""), (2, ""), reserved = reserved)
+
+def test_capnp_generator_unknown_field():
+    with pytest.raises(PRGAInternalError, match = "No field"):
+        with CapnpGenerator(io.BytesIO(), _schema, "RrGraph") as g, g.element("rr_graph"):
+            g.element_leaf("channels", {"width": 1})
@@ -0,0 +1,70 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.netlist.module.common import ConnGraph, _MemOptNonCoalescedNodeDict, _Placeholder
+
+import pickle
+import random
+import pytest
+
+def _assert_same(d, expected):
+    assert len(d) == len(expected)
+    assert sorted(d) == sorted(expected)
+    assert dict(iteritems(d)) == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_node_dict(seed):
+    rng = random.Random(seed)
+    d, expected = _MemOptNonCoalescedNodeDict(), {}
+    for _ in range(2000):
+        k = rng.randrange(12), rng.choice("abc")
+        op = rng.randrange(3)
+        if op == 0:
+            d[k] = expected[k] = rng.random()
+        elif op == 1:
+            if k in expected:
+                del d[k]
+                del expected[k]
+            else:
+                with pytest.raises(KeyError):
+                    del d[k]
+        else:
+            assert d.get(k) == expected.get(k)
+            assert (k in d) == (k in expected)
+        assert len(d) == len(expected)
+    _assert_same(d, expected)
+    # trailing placeholders are dropped
+    assert all(l and l[-1] is not _Placeholder.placeholder for l in itervalues(d._dict))
+    _assert_same(pickle.loads(pickle.dumps(d)), expected)
+
+@pytest.mark.parametrize("k", [0, (0, ), ("a", 0), (0, "x"), (2, "x"), (0, "y")])
+def test_node_dict_missing(k):
+    d = _MemOptNonCoalescedNodeDict()
+    d[1, "x"] = 1
+    with pytest.raises(KeyError):
+        d[k]
+    with pytest.raises(KeyError):
+        del d[k]
+    assert len(d) == 1
+
+def test_node_dict_legacy_state():
+    # state pickled by the tuple-based implementation
+    d = _MemOptNonCoalescedNodeDict.__new__(_MemOptNonCoalescedNodeDict)
+    d.__setstate__((None, {"_dict": {"a": (_Placeholder.placeholder, 1, 2), "b": (3, )}}))
+    _assert_same(d, {(1, "a"): 1, (2, "a"): 2, (0, "b"): 3})
+    d[0, "a"] = 0
+    assert d[0, "a"] == 0 and len(d) == 4
+
+def test_conn_graph_pickle():
+    g = ConnGraph(False, edge_attr_slots = ("cfg_bits", ))
+    g.add_edge((0, "a"), (3, "b"), cfg_bits = (1, 2))
+    g.add_edge((1, "a"), (3, "b"))
+    g.add_node((5, "c"))
+    unpickled = pickle.loads(pickle.dumps(g))
+    assert type(unpickled) is type(g)
+    assert sorted(unpickled.nodes) == sorted(g.nodes)
+    assert sorted(unpickled.edges) == sorted(g.edges)
+    assert unpickled.edges[(0, "a"), (3, "b")]["cfg_bits"] == (1, 2)
+    assert sorted(unpickled.predecessors( (3, "b") )) == [(0, "a"), (1, "a")]
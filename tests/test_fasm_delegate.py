@@ -0,0 +1,73 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.cfg.scanchain.lib import ScanchainFASMDelegate
+from prga.netlist.net.util import NetUtils
+
+import pickle
+import random
+
+def _instances(instance):
+    yield instance
+    for sub in itervalues(instance.model.instances):
+        for i in _instances(sub.extend_hierarchy(above = instance)):
+            yield i
+
+def _bitoffset(instance):
+    cfg_bitoffset = 0
+    for i in reversed(instance.hierarchy):
+        if (offset := getattr(i, "cfg_bitoffset", None)) is None:
+            return None
+        cfg_bitoffset += offset
+    return cfg_bitoffset
+
+def test_instance_bitoffset(scanchain_context):
+    instances = [i for top in itervalues(scanchain_context.top.instances) for i in _instances(top)]
+    expected = [_bitoffset(i) for i in instances]
+    assert any(o is None for o in expected) and any(o for o in expected)
+    delegate = ScanchainFASMDelegate(scanchain_context)
+    assert delegate._instance_bitoffset(None) == 0
+    # children queried before their parents, and parents before their children
+    for order in (reversed(range(len(instances))), random.Random(0).sample(range(len(instances)), len(instances))):
+        for idx in order:
+            assert delegate._instance_bitoffset(instances[idx]) == expected[idx], instances[idx]
+        delegate.reset()
+
+def _routing_boxes(module, visited):
+    for instance in itervalues(module.instances):
+        model = instance.model
+        if model.key not in visited:
+            visited.add(model.key)
+            if model.module_class.is_routing_box:
+                yield model
+            for box in _routing_boxes(model, visited):
+                yield box
+
+def test_cfg_bits_for_connection(scanchain_context):
+    delegate = ScanchainFASMDelegate(scanchain_context)
+    connections = 0
+    for box in _routing_boxes(scanchain_context.top, set()):
+        for port in itervalues(box.ports):
+            if not port.is_sink:
+                continue
+            for sink in port:
+                for source in NetUtils.get_multisource(sink):
+                    expected = tuple(NetUtils.get_connection(source, sink).get("cfg_bits", tuple()))
+                    # the second lookup hits the cache
+                    for _ in range(2):
+                        assert delegate._cfg_bits_for_connection(source, sink) == expected
+                    connections += 1
+    assert connections > 0 and len(delegate._cfg_bits_cache) == connections
+    # caches are not pickled
+    assert not pickle.loads(pickle.dumps(delegate))._cfg_bits_cache
+    # unconnected pairs are cached as well
+    source, sink = next(iter((source, sink)
+        for sinks in itervalues(box.ports) if sinks.is_sink for sink in sinks
+        for sources in itervalues(box.ports) if sources.is_source for source in sources
+        if NetUtils.get_connection(source, sink) is None))
+    assert delegate._cfg_bits_for_connection(source, sink) is None
+    assert len(delegate._cfg_bits_cache) == connections + 1
+    delegate.reset()
+    assert not delegate._cfg_bits_cache
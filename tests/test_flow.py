@@ -0,0 +1,137 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.core.context import Context
+from prga.passes.base import AbstractPass
+from prga.passes.flow import Flow
+
+import os
+import time
+import multiprocessing as mp
+import pytest
+
+requires_fork = pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason = "requires 'fork'")
+
+_runs = []     # keys of the passes run in this process
+
+class _Pass(AbstractPass):
+    """Read-only pass writing its key into a file and the summary, optionally after sleeping or failing."""
+
+    def __init__(self, key, output = None, *, sleep = 0., fail = False, dependences = tuple(), inputs = None,
+            state = tuple()):
+        self._key = key
+        self._output = output
+        self._sleep = sleep
+        self._fail = fail
+        self._dependences = dependences
+        self._inputs = inputs
+        self._state = state
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def is_readonly_pass(self):
+        return True
+
+    @property
+    def output_files(self):
+        return None if self._output is None else (self._output, )
+
+    @property
+    def dependences(self):
+        return self._dependences
+
+    def fingerprint_inputs(self, context):
+        return self._inputs
+
+    @property
+    def fingerprint_state(self):
+        return self._state
+
+    def run(self, context, renderer = None):
+        _runs.append(self._key)
+        time.sleep(self._sleep)
+        if self._fail:
+            raise RuntimeError(self._key)
+        setattr(context.summary, "test_" + self._key, os.getpid())
+        if self._output is not None:
+            with open(self._output, "w") as f:
+                f.write(self._key)
+
+class _Renderer(object):
+    """Renderer recording the number of jobs it is given."""
+
+    def __init__(self):
+        self.tasks = {}
+        self.jobs = []
+        self.changed_files = []
+
+    def render(self, jobs = None):
+        self.jobs.append(jobs)
+
+@requires_fork
+def test_parallel_flow(tmpdir):
+    context = Context("test")
+    outputs = [str(tmpdir.join(str(i))) for i in range(3)]
+    renderer = _Renderer()
+    Flow(_Pass("a", outputs[0], sleep = .5),
+            _Pass("b", outputs[1]),
+            _Pass("c", outputs[2], dependences = ("a", )),
+            _Pass("d"),
+            jobs = 3).run(context, renderer)
+    for key, output in zip("abc", outputs):
+        with open(output) as f:
+            assert f.read() == key
+    # forked passes update the summary of this process
+    assert context.summary.test_a != os.getpid()
+    assert context.summary.test_d == os.getpid()
+    assert len(renderer.jobs) == 1
+
+@requires_fork
+def test_parallel_flow_render_budget(tmpdir):
+    # rendering shares the process budget with the forked passes still running
+    renderer = _Renderer()
+    Flow(_Pass("a", str(tmpdir.join("a")), sleep = .5), jobs = 4).run(Context("test"), renderer)
+    assert renderer.jobs == [3]
+    renderer = _Renderer()
+    Flow(_Pass("a"), jobs = 4).run(Context("test"), renderer)
+    assert renderer.jobs == [4]
+
+@requires_fork
+@pytest.mark.parametrize("forked", [False, True])
+def test_parallel_flow_failure(tmpdir, forked):
+    t = time.time()
+    with pytest.raises(RuntimeError):
+        Flow(_Pass("slow", str(tmpdir.join("slow")), sleep = 30.),
+                _Pass("fail", str(tmpdir.join("fail")) if forked else None, fail = True),
+                jobs = 3).run(Context("test"), _Renderer())
+    assert time.time() - t < 10.
+    assert not mp.active_children()
+    assert not tmpdir.join("slow").check()
+
+def test_flow_cache(tmpdir):
+    cache, output = str(tmpdir.join("cache")), str(tmpdir.join("a"))
+    def run(**kwargs):
+        del _runs[:]
+        context = Context("test")
+        Flow(_Pass("a", output, **kwargs), cache_dir = cache).run(context)
+        with open(output) as f:
+            assert f.read() == "a"
+        return _runs == ["a"], context.summary.test_a
+    ran, pid = run(inputs = (1, "x"))
+    assert ran
+    # outputs and the summary are restored from the cache
+    os.remove(output)
+    assert run(inputs = (1, "x")) == (False, pid)
+    # changed inputs
+    assert run(inputs = (2, "x"))[0]
+    # changed configuration
+    assert run(inputs = (1, "x"), state = (True, ))[0]
+    # unknown inputs or configuration
+    assert run()[0]
+    assert run()[0]
+    assert run(inputs = (1, "x"), state = None)[0]
@@ -0,0 +1,212 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.netlist.net.util import NetUtils
+from prga.exception import PRGAInternalError
+
+from networkx.exception import NetworkXError
+from itertools import islice
+import networkx as nx
+import random
+import zlib
+import sys
+import pytest
+
+class _DepthExceeded(Exception):
+    pass
+
+def _navigate_backwards_recursive(module, endpoint, *,
+        path = tuple(),
+        yield_ = lambda module, node: True,
+        stop = lambda module, node: False,
+        skip = lambda module, node: False,
+        depth = 200):
+    """The recursive implementation that `NetUtils._navigate_backwards` replaces, as the reference. It recurses
+    forever into loops, so the recursion is capped at ``depth`` to fail before the C stack overflows."""
+    if depth == 0:
+        raise _DepthExceeded()
+    idx, net_key = endpoint
+    model, hierarchy_key = module, tuple()
+    while len(net_key) >= 3 and net_key[2:] not in model._elaborated:
+        done = False
+        for split in range(3, len(net_key) - 1):
+            cur_up, cur_down = net_key[split:], net_key[:split]
+            if cur_up in model._elaborated:
+                model = model.hierarchy[cur_up].model
+                hierarchy_key, net_key = cur_up + hierarchy_key, cur_down
+                done = True
+                break
+        if not done:
+            model = model.instances[net_key[-1]].model
+            hierarchy_key, net_key = net_key[-1:] + hierarchy_key, net_key[:-1]
+    while True:
+        while True:
+            try:
+                nodes = tuple(model._conn_graph.predecessors(
+                    net_key if model._coalesce_connections else (idx, net_key) ))
+            except NetworkXError:
+                break
+            if not nodes:
+                break
+            for node in nodes:
+                cur = ((idx, node + hierarchy_key) if model._coalesce_connections else
+                        (node[0], node[1] + hierarchy_key))
+                next_path = path if skip( module, cur ) else ((cur, ) + path)
+                if yield_( module, cur ):
+                    yield next_path
+                if stop( module, cur ) or 'clock' in model._conn_graph.nodes[node]:
+                    continue
+                for p in _navigate_backwards_recursive(module, cur,
+                        path = next_path, yield_ = yield_, stop = stop, skip = skip, depth = depth - 1):
+                    yield p
+            return
+        if len(net_key) == 1 or net_key[1:] in model._elaborated:
+            return
+        model, hierarchy_key = model.hierarchy[net_key[1:]].model, net_key[1:] + hierarchy_key
+        net_key = net_key[:1]
+
+# ----------------------------------------------------------------------------
+# -- Synthetic Hierarchy -----------------------------------------------------
+# ----------------------------------------------------------------------------
+class _Instance(object):
+    def __init__(self, model):
+        self.model = model
+
+class _Module(object):
+    """The parts of a module used by the navigation."""
+
+    def __init__(self, name, coalesce_connections):
+        self.name = name
+        self._coalesce_connections = coalesce_connections
+        self._conn_graph = nx.DiGraph()
+        self._elaborated = set()
+        self.hierarchy = {}
+        self.instances = {}
+
+    def __repr__(self):
+        return self.name
+
+_ports, _instances = ("p0", "p1", "p2"), ("a", "b")
+
+def _build_hierarchy(rng):
+    """Build a random hierarchy of up to 4 levels, mixing coalesced and bitwise modules, partially elaborated
+    sub-hierarchies, clocks, and random connections that may form loops across the hierarchy."""
+    levels = rng.randint(1, 4)
+    models = [[_Module("m{}_{}".format(l, i), rng.random() < .5) for i in range(rng.randint(1, 2))]
+            for l in range(levels)]
+    for l, level in enumerate(models):
+        for m in level:
+            keys = [(p, ) for p in _ports]
+            if l + 1 < levels:
+                for k in _instances:
+                    m.instances[k] = m.hierarchy[k, ] = _Instance(rng.choice(models[l + 1]))
+                    for k2 in _instances:
+                        if rng.random() < .5:
+                            m.hierarchy[k2, k] = _Instance(rng.choice(models[min(l + 2, levels - 1)]))
+                            if rng.random() < .3:
+                                m._elaborated.add( (k2, k) )
+                    if rng.random() < .3:
+                        m._elaborated.add( (k, ) )
+                keys += [(p, k) for p in _ports for k in _instances]
+                keys += [(p, k2, k) for p in _ports for k in _instances for k2 in _instances if rng.random() < .4]
+                keys += [(p, k3, k2, k) for p in _ports for k in _instances for k2 in _instances for k3 in _instances
+                        if rng.random() < .15]
+            nodes = keys if m._coalesce_connections else [(i, k) for k in keys for i in range(2)]
+            rng.shuffle(nodes)
+            for i, v in enumerate(nodes):
+                for u in nodes[:i]:
+                    if rng.random() < .12:
+                        m._conn_graph.add_edge(u, v)
+                if rng.random() < .1:
+                    m._conn_graph.add_node(v, clock = True)
+    return models[0][0]
+
+_endpoints = [(i, (p, ) + tail) for p in _ports for i in range(2)
+        for tail in ((), ("a", ), ("b", ), ("a", "b"), ("b", "a", "a"))]
+
+def _run(navigation, limit = 2000):
+    """Collect up to ``limit`` paths, and how the navigation ends: "ok", "loop", "truncated", or "invalid" if the
+    endpoint refers to instances not in the hierarchy."""
+    paths = []
+    try:
+        for p in islice(navigation, limit):
+            paths.append(p)
+    except _DepthExceeded:
+        return "loop", paths
+    except PRGAInternalError as e:
+        assert "Combinational loop" in str(e)
+        return "loop", paths
+    except KeyError:
+        return "invalid", paths
+    return ("truncated" if len(paths) == limit else "ok"), paths
+
+@pytest.mark.parametrize("seed", range(100))
+def test_navigate_backwards(seed):
+    rng = random.Random(seed)
+    top = _build_hierarchy(rng)
+    salt = rng.randint(0, 1 << 30)
+    predicate = lambda k, p: (lambda m, n: zlib.crc32(repr((n, k, salt)).encode("ascii")) % 100 < p)
+    kwargs = dict(yield_ = predicate(1, rng.choice([100, 60])), stop = predicate(2, rng.choice([0, 20])),
+            skip = predicate(3, rng.choice([0, 30])), path = rng.choice([(), ((0, ("E", )), )]))
+    for endpoint in rng.sample(_endpoints, 6):
+        expected = _run(_navigate_backwards_recursive(top, endpoint, **kwargs))
+        result = _run(NetUtils._navigate_backwards(top, endpoint, **kwargs))
+        if result[0] == "loop":
+            # the recursion runs into the loop until it hits the depth limit or the path limit, and yields the same
+            # paths before that
+            assert expected[0] in ("loop", "truncated")
+            assert expected[1][:len(result[1])] == result[1]
+        else:
+            assert result == expected
+
+# ----------------------------------------------------------------------------
+# -- Loops, Limits and Deep Chains -------------------------------------------
+# ----------------------------------------------------------------------------
+def _chain(length, coalesce_connections = False):
+    m = _Module("chain", coalesce_connections)
+    node = (lambda i: ("n{}".format(i), )) if coalesce_connections else (lambda i: (0, ("n{}".format(i), )))
+    m._conn_graph.add_edges_from( (node(i), node(i + 1)) for i in range(length) )
+    return m, (0, ("n{}".format(length), ))
+
+def test_navigate_backwards_loop():
+    m, endpoint = _chain(5)
+    m._conn_graph.add_edge( (0, ("n3", )), (0, ("n1", )) )
+    with pytest.raises(PRGAInternalError, match = "Combinational loop"):
+        list(NetUtils._navigate_backwards(m, endpoint))
+    # stopping at a node in the loop breaks it
+    paths = list(NetUtils._navigate_backwards(m, endpoint, stop = lambda m, n: n == (0, ("n3", ))))
+    assert paths == [((0, ("n{}".format(i), )), ) + tuple((0, ("n{}".format(j), )) for j in range(i + 1, 5))
+            for i in (4, 3)]
+    # reconvergent paths are not loops
+    m, endpoint = _chain(4)
+    m._conn_graph.add_edge( (0, ("n0", )), (0, ("n3", )) )
+    assert sorted(NetUtils._navigate_backwards(m, endpoint, yield_ = lambda m, n: n == (0, ("n0", )))) == [
+            tuple((0, ("n{}".format(i), )) for i in range(4)),
+            ((0, ("n0", )), (0, ("n3", )))]
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("limit", [None, 0, 1, 3])
+def test_navigate_backwards_batch_limit(seed, limit):
+    top = _build_hierarchy(random.Random(seed))
+    endpoints, expected = [], []
+    for e in _endpoints:
+        try:
+            paths = [(e, p) for p in islice(NetUtils._navigate_backwards(top, e), limit)]
+        except (PRGAInternalError, KeyError):   # loops or invalid endpoints
+            continue
+        endpoints.append(e)
+        expected.extend(paths)
+    # ``limit`` caps the number of paths yielded for each endpoint, in the same order as without the limit
+    assert list(NetUtils._navigate_backwards_batch(top, endpoints, limit = limit)) == expected
+
+@pytest.mark.parametrize("coalesce_connections", [False, True])
+def test_navigate_backwards_deep(coalesce_connections):
+    length = 5 * sys.getrecursionlimit()
+    m, endpoint = _chain(length, coalesce_connections)
+    paths = list(NetUtils._navigate_backwards(m, endpoint, yield_ = lambda m, n: n[1] == ("n0", )))
+    assert len(paths) == 1
+    assert len(paths[0]) == length
+    assert paths[0][0] == (0, ("n0", ))
+    assert paths[0][-1] == (0, ("n{}".format(length - 1), ))
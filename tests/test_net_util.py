@@ -0,0 +1,165 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.netlist.module.module import Module
+from prga.netlist.module.util import ModuleUtils
+from prga.netlist.net.common import PortDirection, Const
+from prga.netlist.net.util import NetUtils
+from prga.exception import PRGAInternalError
+
+import pytest
+
+def _create_module(name, **kwargs):
+    m = Module(name, **kwargs)
+    ModuleUtils.create_port(m, "a", 8, PortDirection.input_)
+    ModuleUtils.create_port(m, "b", 4, PortDirection.input_)
+    ModuleUtils.create_port(m, "x", 8, PortDirection.output)
+    ModuleUtils.create_port(m, "y", 3, PortDirection.output)
+    return m
+
+def _refs(net):
+    """Bit references of ``net``. Unconnected bits are ``None``."""
+    return [None if bit.net_type.is_const and bit.value is None else NetUtils._reference(bit) for bit in net]
+
+# ----------------------------------------------------------------------------
+# -- Driver Index ------------------------------------------------------------
+# ----------------------------------------------------------------------------
+def test_get_source_after_connect():
+    m = _create_module("m")
+    x = m.ports["x"]
+    assert _refs(NetUtils.get_source(x)) == [None] * 8
+    assert NetUtils.get_source(x[2:4], return_none_if_unconnected = True) is None
+    NetUtils.connect(m.ports["a"][0:4], x[0:4])
+    assert _refs(NetUtils.get_source(x)) == [(i, ("a", )) for i in range(4)] + [None] * 4
+    assert _refs(NetUtils.get_source(x[2:4])) == [(2, ("a", )), (3, ("a", ))]
+    assert _refs(NetUtils.get_source(x[5])) == [None]
+    NetUtils.connect(m.ports["b"], x[4:8])
+    assert _refs(NetUtils.get_source(x)) == [(i, ("a", )) for i in range(4)] + [(i, ("b", )) for i in range(4)]
+    assert _refs(NetUtils.get_source(x[2:6])) == [(2, ("a", )), (3, ("a", )), (0, ("b", )), (1, ("b", ))]
+    assert _refs(NetUtils.get_source(x[5])) == [(1, ("b", ))]
+
+def test_get_source_after_add_edges():
+    m = _create_module("m")
+    y = m.ports["y"]
+    assert _refs(NetUtils.get_source(y)) == [None] * 3
+    assert _refs(NetUtils.get_source(y[1])) == [None]
+    NetUtils._add_edges(m, [((7, ("a", )), (1, ("y", )))])
+    assert _refs(NetUtils.get_source(y)) == [None, (7, ("a", )), None]
+    assert _refs(NetUtils.get_source(y[1])) == [(7, ("a", ))]
+
+def test_get_multisource_after_connect():
+    m = _create_module("m", allow_multisource = True)
+    y0 = m.ports["y"][0]
+    assert NetUtils.get_multisource(y0).net_type.is_const
+    NetUtils.connect(m.ports["a"][0], y0)
+    assert _refs(NetUtils.get_multisource(y0)) == [(0, ("a", ))]
+    NetUtils.connect(m.ports["b"][1], y0)
+    assert _refs(NetUtils.get_multisource(y0)) == [(0, ("a", )), (1, ("b", ))]
+    NetUtils._add_edges(m, [((2, ("b", )), (0, ("y", )))])
+    assert _refs(NetUtils.get_multisource(y0)) == [(0, ("a", )), (1, ("b", )), (2, ("b", ))]
+
+# ----------------------------------------------------------------------------
+# -- Connect -----------------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.fixture
+def sub():
+    m = _create_module("sub")
+    ModuleUtils.create_port(m, "clk", 1, PortDirection.input_, is_clock = True)
+    return m
+
+def _create_parent(sub, **kwargs):
+    m = _create_module("m", **kwargs)
+    ModuleUtils.create_port(m, "clk", 1, PortDirection.input_, is_clock = True)
+    ModuleUtils.create_port(m, "oclk", 1, PortDirection.output, is_clock = True)
+    ModuleUtils.instantiate(m, sub, "u0")
+    ModuleUtils.instantiate(m, sub, "u1")
+    return m
+
+def _edges(m):
+    return sorted(m._conn_graph.edges, key = repr)
+
+def _const(value):
+    return 0, Const(value, 1).node
+
+@pytest.mark.parametrize("connect, edges", [
+    # bus to bus
+    (lambda m: NetUtils.connect(m.ports["a"], m.ports["x"]),
+        [((i, ("a", )), (i, ("x", ))) for i in range(8)]),
+    # pin to pin
+    (lambda m: NetUtils.connect(m.instances["u0"].pins["x"][2:5], m.instances["u1"].pins["b"][1:4]),
+        [((2 + i, ("x", "u0")), (1 + i, ("b", "u1"))) for i in range(3)]),
+    # constants: unconnected bits are skipped
+    (lambda m: NetUtils.connect(Const(6, 3), m.ports["y"]),
+        [(_const(0), (0, ("y", ))), (_const(1), (1, ("y", ))), (_const(1), (2, ("y", )))]),
+    (lambda m: NetUtils.connect(Const(width = 3), m.ports["y"]), []),
+    # mixed concatenations with items of different widths on both sides
+    (lambda m: NetUtils.connect([m.ports["b"][1:3], Const(width = 2), Const(5, 3), m.ports["a"][0]],
+        [m.ports["y"], m.instances["u1"].pins["a"][0:5]]),
+        [((1, ("b", )), (0, ("y", ))), ((2, ("b", )), (1, ("y", ))),
+            (_const(1), (1, ("a", "u1"))), (_const(0), (2, ("a", "u1"))), (_const(1), (3, ("a", "u1"))),
+            ((0, ("a", )), (4, ("a", "u1")))]),
+    # connecting the same source again is allowed
+    (lambda m: (NetUtils.connect(m.ports["a"][0:3], m.ports["y"]),
+        NetUtils.connect(m.ports["a"][1], m.ports["y"][1])),
+        [((i, ("a", )), (i, ("y", ))) for i in range(3)]),
+    (lambda m: NetUtils.connect([m.ports["a"][0], m.ports["a"][0]], [m.ports["y"][0], m.ports["y"][0]]),
+        [((0, ("a", )), (0, ("y", )))]),
+    (lambda m: NetUtils.connect(m.ports["clk"], m.ports["oclk"]),
+        [((0, ("clk", )), (0, ("oclk", )))]),
+    ])
+def test_connect(sub, connect, edges):
+    m = _create_parent(sub)
+    connect(m)
+    assert _edges(m) == sorted(edges, key = repr)
+
+def test_connect_width_mismatch(sub, caplog):
+    m = _create_parent(sub)
+    NetUtils.connect(m.ports["b"], m.ports["x"])
+    assert "Width mismatch" in caplog.text
+    assert _edges(m) == [((i, ("b", )), (i, ("x", ))) for i in range(4)]
+
+def test_connect_fully(sub):
+    m = _create_parent(sub, allow_multisource = True)
+    NetUtils.connect([m.ports["a"][0:2], Const(width = 1)], [m.ports["y"][1:3], m.instances["u1"].pins["b"][0]],
+            fully = True)
+    assert _edges(m) == sorted((((i, ("a", )), sink) for i in range(2)
+        for sink in ((1, ("y", )), (2, ("y", )), (0, ("b", "u1")))), key = repr)
+
+@pytest.mark.parametrize("connect, message", [
+    # multi-source connections
+    (lambda m: NetUtils.connect(m.ports["a"][0:2], m.ports["y"], fully = True), "multi-source"),
+    (lambda m: NetUtils.connect([m.ports["a"][0], m.ports["a"][1]], [m.ports["y"][2], m.ports["y"][2]]),
+        "multi-source"),
+    (lambda m: NetUtils.connect(m.ports["a"][0:3], m.ports["y"]), "multi-source"),
+    # invalid sources and sinks in any item
+    (lambda m: NetUtils.connect([m.ports["a"][0:2], m.ports["x"][0]], m.ports["y"]), "not a valid source"),
+    (lambda m: NetUtils.connect(m.ports["a"][0:3], [m.ports["x"][0], m.ports["b"][0:2]]), "not a valid sink"),
+    (lambda m: NetUtils.connect(m.ports["a"][0:4], [m.ports["x"][0:2], m.instances["u0"].pins["x"][0:2]]),
+        "not a valid sink"),
+    (lambda m: NetUtils.connect([m.ports["a"][0:2], m.instances["u0"].pins["a"][0]], m.ports["x"][0:3]),
+        "not a valid source"),
+    # clocks and parents
+    (lambda m: NetUtils.connect([m.ports["clk"], m.ports["a"][0]], [m.ports["x"][0], m.ports["oclk"]]),
+        "is a clock"),
+    (lambda m: NetUtils.connect(m.ports["a"][0:3],
+        [m.ports["x"][0], m.ports["x"][1], m.instances["u0"].model.ports["x"][0]]),
+        "different parent"),
+    ])
+def test_connect_error(sub, connect, message):
+    m = _create_parent(sub)
+    NetUtils.connect(m.ports["b"][0:3], m.ports["y"])
+    edges = _edges(m)
+    with pytest.raises(PRGAInternalError) as e:
+        connect(m)
+    assert message in str(e.value)
+    # all connections are validated before any of them is made
+    assert _edges(m) == edges
+
+def test_connect_coalesced(sub):
+    m = _create_parent(sub, coalesce_connections = True)
+    NetUtils.connect([m.ports["a"], m.instances["u0"].pins["x"]], [m.ports["x"], m.instances["u1"].pins["a"]])
+    assert _edges(m) == [(("a", ), ("x", )), (("x", "u0"), ("a", "u1"))]
+    with pytest.raises(PRGAInternalError):
+        NetUtils.connect(m.ports["b"][0:2], m.ports["y"][0:2])
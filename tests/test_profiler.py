@@ -0,0 +1,61 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.core.context import Context
+from prga.passes.flow import Flow
+from prga.passes.profiler import FlowProfiler
+from prga.renderer.renderer import FileRenderer
+
+import io
+import tracemalloc
+
+def _profile_once():
+    profiler = FlowProfiler(tracemalloc = True, count_netlist = False)
+    try:
+        profiler.begin("test")
+        l = [object() for _ in range(1000)]
+        return profiler.end()
+    finally:
+        profiler.close()
+
+def test_tracemalloc():
+    record = _profile_once()
+    assert record["name"] == "test"
+    assert record["wall"] >= 0
+    assert "alloc" in record
+    if hasattr(tracemalloc, "reset_peak"):
+        assert record["alloc_peak"] >= record["alloc"]
+    assert not tracemalloc.is_tracing()
+
+def test_tracemalloc_without_reset_peak(monkeypatch):
+    # Python 3.8 does not have ``tracemalloc.reset_peak``
+    monkeypatch.delattr(tracemalloc, "reset_peak", raising = False)
+    record = _profile_once()
+    assert "alloc" in record
+    assert "alloc_peak" not in record
+
+def test_count_netlist_lazy(scanchain_context):
+    f = io.BytesIO()
+    scanchain_context.pickle(f, chunked = True)
+    f.seek(0)
+    context = Context.unpickle(f)
+    loaded = sum(1 for _ in context._database.loaded_values())
+    assert loaded < len(context._database)
+    # only the loaded modules are counted, and counting does not load the others
+    assert FlowProfiler._count_netlist(context)["modules"] == loaded
+    assert sum(1 for _ in context._database.loaded_values()) == loaded
+
+def test_render_bytes_written(tmpdir):
+    tmpdir.join("line.tmpl").write("{{ value }}\n\n")
+    manifest = str(tmpdir.join("manifest.json"))
+    def render(values):
+        profiler, renderer = FlowProfiler(count_netlist = False), FileRenderer(str(tmpdir), manifest = manifest)
+        for name, value in iteritems(values):
+            renderer.add_generic(str(tmpdir.join(name)), "line.tmpl", value = value)
+        Flow(profiler = profiler).run(Context("test"), renderer)
+        return profiler.records[-1]["bytes_written"]
+    assert render({"a": 1, "b": 22}) == 5
+    # files skipped because they are unchanged are not counted
+    assert render({"a": 1, "b": 333}) == 4
@@ -0,0 +1,48 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.passes.test import _Reachability
+
+import random
+import networkx as nx
+import pytest
+
+def _random_graph(seed, num_nodes = 60, num_edges = 90):
+    rng = random.Random(seed)
+    g = nx.DiGraph()
+    g.add_nodes_from(range(num_nodes))
+    g.add_edges_from((rng.randrange(num_nodes), rng.randrange(num_nodes)) for _ in range(num_edges))
+    return g, rng
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_searches", [1, 4, 1024])
+def test_has_path(seed, max_searches):
+    g, rng = _random_graph(seed)
+    reach = _Reachability(g, max_searches)
+    # random order so searches are resumed, restarted and evicted
+    pairs = [(u, v) for u in g for v in g]
+    rng.shuffle(pairs)
+    for u, v in pairs:
+        assert reach.has_path(u, v) == nx.has_path(g, u, v), (u, v)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reachable(seed):
+    g, rng = _random_graph(seed)
+    reach = _Reachability(g, 4)
+    for _ in range(200):
+        source = rng.randrange(len(g))
+        targets = rng.sample(range(len(g)), 8)
+        expected = [t for t in targets if nx.has_path(g, source, t)]
+        assert reach.reachable(source, targets) == expected
+        assert reach.first_reachable(source, targets) == (targets.index(expected[0]) if expected else None)
+
+def test_unknown_nodes():
+    g = nx.DiGraph([(0, 1), (1, 2)])
+    reach = _Reachability(g)
+    assert reach.has_path("x", "x")
+    assert not reach.has_path("x", 2)
+    assert not reach.has_path(0, "x")
+    assert reach.reachable(0, ["x", 2, 0]) == [2, 0]
+    assert reach.first_reachable(2, ["x", 0, 1]) is None
@@ -0,0 +1,106 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.renderer.renderer import FileRenderer
+
+import os
+import io
+import json
+import pytest
+
+@pytest.fixture
+def templates(tmpdir):
+    d = tmpdir.mkdir("templates")
+    d.join("line.tmpl").write("{{ name }} = {{ value }}\n\n")
+    return str(d)
+
+def _render(templates, outdir, values, jobs = None, manifest = None):
+    r = FileRenderer(templates, manifest = manifest)
+    for name, value in iteritems(values):
+        r.add_generic(str(outdir.join("{}.txt".format(name))), "line.tmpl", name = name, value = value)
+    return r.render(jobs)
+
+def _read(outdir):
+    return {f.basename: f.read() for f in outdir.listdir()}
+
+_values = {"f{}".format(i): i for i in range(20)}
+
+@pytest.mark.parametrize("jobs", [None, 3])
+def test_render(templates, tmpdir, jobs):
+    out = tmpdir.mkdir("out")
+    changed = _render(templates, out, _values, jobs)
+    assert changed == sorted(str(out.join("{}.txt".format(k))) for k in _values)
+    assert _read(out) == {"{}.txt".format(k): "{} = {}\n".format(k, v) for k, v in iteritems(_values)}
+
+def test_render_parallel(templates, tmpdir):
+    serial, parallel = tmpdir.mkdir("serial"), tmpdir.mkdir("parallel")
+    _render(templates, serial, _values)
+    _render(templates, parallel, _values, jobs = 4)
+    assert _read(serial) == _read(parallel)
+
+def test_render_stream(templates):
+    f = io.BytesIO()
+    r = FileRenderer(templates)
+    r.add_generic(f, "line.tmpl", name = "a", value = 1)
+    r.add_generic(f, "line.tmpl", name = "b", value = 2)
+    assert r.render(jobs = 2) == []
+    assert f.getvalue() == b"a = 1\nb = 2\n"
+
+@pytest.mark.parametrize("manifest", [False, True])
+def test_render_unchanged(templates, tmpdir, manifest):
+    out = tmpdir.mkdir("out")
+    manifest = str(tmpdir.join("manifest.json")) if manifest else None
+    _render(templates, out, _values, manifest = manifest)
+    mtimes = {f.basename: f.mtime() for f in out.listdir()}
+    # unchanged files are not written
+    values = dict(_values, f3 = "x", f7 = 7)
+    assert _render(templates, out, values, manifest = manifest) == [str(out.join("f3.txt"))]
+    assert out.join("f3.txt").read() == "f3 = x\n"
+    assert all(f.mtime() == mtimes[f.basename] for f in out.listdir() if f.basename != "f3.txt")
+    # files modified after rendering are rendered again
+    out.join("f5.txt").write("f5 = 6\n")
+    assert _render(templates, out, values, manifest = manifest) == [str(out.join("f5.txt"))]
+    assert out.join("f5.txt").read() == "f5 = 5\n"
+    if manifest:
+        with open(manifest) as f:
+            assert sorted(json.load(f)["files"]) == sorted(str(f) for f in out.listdir())
+
+def test_render_invalid_manifest(templates, tmpdir, caplog):
+    out = tmpdir.mkdir("out")
+    manifest = tmpdir.join("manifest.json")
+    manifest.write("{")
+    assert len(_render(templates, out, _values, manifest = str(manifest))) == len(_values)
+    assert "Ignoring invalid render manifest" in caplog.text
+    assert json.loads(manifest.read())["version"] == 1
+
+def test_render_stream_not_logged(templates, caplog):
+    # tools write streams to stdout, where prga also logs
+    r = FileRenderer(templates)
+    r.add_generic(io.BytesIO(), "line.tmpl", name = "a", value = 1)
+    r.render()
+    assert "rendered files changed" not in caplog.text
+
+def test_bytecode_cache(templates, tmpdir, monkeypatch):
+    cache = tmpdir.join("cache")
+    monkeypatch.setenv("PRGA_TEMPLATE_CACHE", str(cache))
+    monkeypatch.setattr("prga.renderer.renderer._bytecode_cache", None)
+    _render(templates, tmpdir.mkdir("out0"), {"a": 1})
+    entries = cache.listdir()
+    assert len(entries) == 1
+    # compiled templates are loaded from the cache, and invalidated when the template is changed
+    _render(templates, tmpdir.mkdir("out1"), {"a": 1})
+    assert cache.listdir() == entries
+    with open(os.path.join(templates, "line.tmpl"), "w") as f:
+        f.write("{{ name }}: {{ value }}\n\n")
+    out = tmpdir.mkdir("out2")
+    _render(templates, out, {"a": 1})
+    assert out.join("a.txt").read() == "a: 1\n"
+
+def test_bytecode_cache_disabled(templates, tmpdir, monkeypatch):
+    monkeypatch.setenv("PRGA_TEMPLATE_CACHE", "")
+    monkeypatch.setattr("prga.renderer.renderer._bytecode_cache", None)
+    r = FileRenderer(templates)
+    assert r._new_environment().bytecode_cache is None
+    assert r._new_environment() is r._new_environment()
@@ -0,0 +1,152 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.passes.flow import Flow
+from prga.passes.vpr import VPRArchGeneration, VPR_RRG_Generation
+from prga.tools.analysis.rrg.util import read_vpr_rrg, read_vpr_rrg_compact
+from prga.xml import XMLGenerator
+
+from array import array
+import os
+import io
+import pickle
+import pytest
+
+@pytest.fixture(scope = "module")
+def rrg_file(scanchain_context, tmpdir_factory):
+    d = tmpdir_factory.mktemp("rrg")
+    VPRArchGeneration(str(d.join("arch.xml"))).run(scanchain_context)
+    VPR_RRG_Generation(str(d.join("rrg.xml"))).run(scanchain_context)
+    return str(d.join("rrg.xml"))
+
+def _assert_same_graph(g, expected):
+    assert dict(g.nodes(data = True)) == dict(expected.nodes(data = True))
+    assert sorted(g.edges(data = True)) == sorted(expected.edges(data = True))
+
+@pytest.mark.parametrize("ignore_iopin, keep_srcsink", [(False, False), (False, True), (True, True)])
+@pytest.mark.parametrize("info_level", [0, 1])
+def test_compact_rrg(rrg_file, ignore_iopin, keep_srcsink, info_level):
+    kwargs = dict(ignore_iopin = ignore_iopin, keep_srcsink = keep_srcsink, info_level = info_level)
+    _assert_same_graph(read_vpr_rrg_compact(rrg_file).to_networkx(**kwargs), read_vpr_rrg(rrg_file, **kwargs))
+
+def test_compact_rrg_queries(rrg_file):
+    rrg = read_vpr_rrg_compact(rrg_file)
+    g = read_vpr_rrg(rrg_file, keep_srcsink = True, info_level = 1)
+    assert len(rrg) == len(g)
+    assert rrg.num_edges == g.number_of_edges()
+    for node, data in g.nodes(data = True):
+        assert rrg.node_type(node) == data["type"]
+        assert sorted(rrg.successors(node)) == sorted(g.successors(node))
+        assert sorted(rrg.predecessors(node)) == sorted(g.predecessors(node))
+        assert sorted(rrg.out_edges(node)) == sorted((v, int(d["switch_id"])) for _, v, d in g.out_edges(node, True))
+        timing = data["timing"]
+        assert rrg.node_timing(node) == (float(timing["R"]), float(timing["C"]))
+        assert rrg.segment_id[node] == int(data.get("segment", {}).get("segment_id", -1))
+    assert rrg.nodes_by_type("CHANX", "CHANY") == sorted(node for node, type_ in g.nodes(data = "type")
+            if type_ in ("CHANX", "CHANY"))
+    assert any(rrg.segment_id[node] > 0 for node in rrg.nodes_by_type("CHANX"))
+
+_unordered = b"""<rr_graph>
+    <rr_nodes>
+        <node id="2" type="CHANX" direction="INC_DIR" capacity="1">
+            <loc xlow="1" ylow="0" xhigh="2" yhigh="0" ptc="0"/>
+            <timing R="101" C="6e-14"/>
+            <segment segment_id="1"/>
+        </node>
+        <node id="0" type="OPIN" capacity="1">
+            <loc xlow="1" ylow="1" xhigh="1" yhigh="1" ptc="3" side="BOTTOM"/>
+            <timing R="0" C="0"/>
+        </node>
+        <node id="1" type="IPIN" capacity="1">
+            <loc xlow="2" ylow="1" xhigh="2" yhigh="1" ptc="1" side="BOTTOM"/>
+        </node>
+    </rr_nodes>
+    <rr_edges>
+        <edge src_node="2" sink_node="1" switch_id="2"/>
+        <edge src_node="0" sink_node="2" switch_id="1"/>
+    </rr_edges>
+</rr_graph>"""
+
+def test_compact_rrg_unordered():
+    rrg = read_vpr_rrg_compact(io.BytesIO(_unordered))
+    _assert_same_graph(rrg.to_networkx(info_level = 1), read_vpr_rrg(io.BytesIO(_unordered), info_level = 1))
+    assert [rrg.node_type(i) for i in range(3)] == ["OPIN", "IPIN", "CHANX"]
+    assert list(rrg.segment_id) == [-1, -1, 1]
+    assert [rrg.node_timing(i) for i in range(3)] == [(0., 0.), None, (101., 6e-14)]
+
+def _generate(context, tmpdir, name, **kwargs):
+    path = str(tmpdir.join(name))
+    VPR_RRG_Generation(path, **kwargs).run(context)
+    with open(path, "rb") as f:
+        return f.read()
+
+@pytest.fixture(scope = "module")
+def rrg_data(rrg_file):
+    with open(rrg_file, "rb") as f:
+        return f.read()
+
+class _ElementRRG(VPR_RRG_Generation):
+    """Writes nodes and edges with `XMLGenerator.element` and `XMLGenerator.element_leaf` instead of the raw
+    templates."""
+
+    __slots__ = []
+
+    def _prepare_raw_output(self):
+        self.rawfmt, self.chunk, self.edges = None, [], (array('i'), array('i'), array('i'), {})
+
+@pytest.mark.parametrize("pretty", [True, False])
+def test_rrg_raw_output(scanchain_context, tmpdir, monkeypatch, pretty):
+    monkeypatch.setattr(XMLGenerator, "reserve", lambda self, tag, count: None, raising = False)
+    element = str(tmpdir.join("element.xml"))
+    _ElementRRG(element, pretty = pretty).run(scanchain_context)
+    with open(element, "rb") as f:
+        assert _generate(scanchain_context, tmpdir, "raw.xml", pretty = pretty) == f.read()
+
+@pytest.mark.parametrize("chunk_size", [1, 7])
+def test_rrg_chunked(scanchain_context, tmpdir, rrg_data, monkeypatch, chunk_size):
+    monkeypatch.setattr(VPR_RRG_Generation, "_chunk_size", chunk_size)
+    assert _generate(scanchain_context, tmpdir, "rrg.xml") == rrg_data
+
+def test_rrg_file_object(scanchain_context, tmpdir, rrg_data):
+    with open(str(tmpdir.join("rrg.xml")), "wb") as f:
+        VPR_RRG_Generation(f).run(scanchain_context)
+    assert tmpdir.join("rrg.xml").read_binary() == rrg_data
+
+def test_rrg_compact_format(scanchain_context, tmpdir, rrg_file):
+    _generate(scanchain_context, tmpdir, "rrg.xml", pretty = False)
+    _assert_same_graph(read_vpr_rrg(str(tmpdir.join("rrg.xml")), keep_srcsink = True, info_level = 1),
+            read_vpr_rrg(rrg_file, keep_srcsink = True, info_level = 1))
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_rrg_parallel(scanchain_context, tmpdir, rrg_data, jobs):
+    assert _generate(scanchain_context, tmpdir, "rrg.xml", jobs = jobs) == rrg_data
+
+@pytest.mark.parametrize("jobs", [None, 2])
+def test_rrg_failure(scanchain_context, tmpdir, monkeypatch, jobs):
+    def fail(self, top, sink_node):
+        raise RuntimeError("edge generation failed")
+    monkeypatch.setattr(VPR_RRG_Generation, "_sink_edges", fail)
+    path = str(tmpdir.join("rrg.xml"))
+    pass_ = VPR_RRG_Generation(path, jobs = jobs)
+    with pytest.raises(RuntimeError, match = "edge generation failed"):
+        pass_.run(scanchain_context)
+    # the truncated output is removed, and the pass can be run again
+    assert not os.path.exists(path)
+    assert pass_.output_file == path
+
+def test_rrg_fingerprint(scanchain_context, tmpdir):
+    context = scanchain_context
+    path = str(tmpdir.join("rrg.xml"))
+    pass_ = VPR_RRG_Generation(path)
+    fingerprint = Flow()._fingerprint(context, pass_)
+    assert fingerprint is not None
+    # the number of jobs and the data kept by the pass after it is run do not affect the fingerprint
+    assert Flow()._fingerprint(context, VPR_RRG_Generation(path, jobs = 2)) == fingerprint
+    summary = pickle.dumps(context.summary)
+    pass_.run(context)
+    assert pass_.fasm is None and pass_.timing is None
+    context.summary = pickle.loads(summary)
+    assert Flow()._fingerprint(context, pass_) == fingerprint
+    assert Flow()._fingerprint(context, VPR_RRG_Generation(path, pretty = False)) != fingerprint
@@ -0,0 +1,67 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.core.common import ModuleView
+from prga.cfg.scanchain.lib import Scanchain
+
+from conftest import build_scanchain_context
+
+def _modules(module, visited = None):
+    visited = set() if visited is None else visited
+    if module.key not in visited:
+        visited.add(module.key)
+        yield module
+        for instance in itervalues(module.instances):
+            for m in _modules(instance.model, visited):
+                yield m
+
+def test_scanchain_offsets(scanchain_context):
+    context = scanchain_context
+    cfg_width = context.summary.scanchain["cfg_width"]
+    top = context.database[ModuleView.logical, context.top.key]
+    assert context.summary.scanchain["bitstream_size"] == top.cfg_bitcount
+    checked = 0
+    for module in _modules(top):
+        if not module.module_class.is_block and not module.module_class.is_array and not module.module_class.is_tile:
+            continue
+        # instances in the chain are placed back to back, in instance order
+        offset = 0
+        for instance in itervalues(module.instances):
+            if (cfg_bitoffset := getattr(instance, "cfg_bitoffset", None)) is not None:
+                assert cfg_bitoffset == offset, instance
+                offset += instance.model.cfg_bitcount
+        assert module.cfg_bitcount - offset < cfg_width, module
+        checked += 1
+    assert checked > 3
+
+def test_scanchain_user_view(scanchain_context):
+    context = scanchain_context
+    for module in _modules(context.database[ModuleView.logical, context.top.key]):
+        if (user := context.database.get( (ModuleView.user, module.key) )) is None:
+            continue
+        for key, instance in iteritems(user.instances):
+            if (cfg_bitoffset := getattr(module.instances.get(key), "cfg_bitoffset", None)) is not None:
+                assert instance.cfg_bitoffset == cfg_bitoffset
+
+def test_inject_config_circuitry():
+    context = build_scanchain_context(variants = 2, height = 3, inject = False)
+    enclosed = []
+    def timing_enclosure(module):
+        enclosed.append(module.key)
+        return module.module_class.is_block or module.module_class.is_routing_box
+    pass_ = Scanchain.InjectConfigCircuitry(timing_enclosure = timing_enclosure)
+    pass_.run(context)
+    # each module is processed once, after all its sub-modules
+    keys = list(pass_.chain_lengths)
+    assert len(set(keys)) == len(keys)
+    assert keys[-1] == context.top.key
+    for k, key in enumerate(keys):
+        module = context.database[ModuleView.logical, key]
+        assert pass_.chain_lengths[key] == module.cfg_bitcount
+        for instance in itervalues(module.instances):
+            assert instance.model.key not in keys[k:]
+    assert set(enclosed) <= set(keys)
+    assert pass_.profile_counters == {"scanchain_modules": len(keys),
+            "scanchain_max_length": context.summary.scanchain["bitstream_size"]}
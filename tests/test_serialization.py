@@ -0,0 +1,84 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.core.common import ModuleView
+from prga.core.context import Context
+from prga.core.serialization import LazyModuleDatabase, is_chunked_context
+from prga.passes.vpr import VPRArchGeneration
+from prga.exception import PRGAAPIError
+
+import io
+import pytest
+
+class _Pipe(io.RawIOBase):
+    """Non-seekable input stream."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+def _dump(context, **kwargs):
+    f = io.BytesIO()
+    context.pickle(f, **kwargs)
+    return f.getvalue()
+
+def _arch(context, path):
+    VPRArchGeneration(str(path)).run(context)
+    with open(str(path)) as f:
+        return f.read()
+
+def _summarize(context):
+    # some keys contain modules, which are compared by identity
+    return sorted(map(repr, context._database)), context.summary.scanchain["bitstream_size"]
+
+def test_pickle_default(scanchain_context):
+    data = _dump(scanchain_context)
+    assert not is_chunked_context(io.BytesIO(data))
+    assert data == _dump(scanchain_context, chunked = False)
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_pickle_roundtrip(scanchain_context, tmpdir, chunked):
+    context = scanchain_context
+    data = _dump(context, chunked = chunked)
+    assert is_chunked_context(io.BytesIO(data)) == chunked
+    unpickled = Context.unpickle(io.BytesIO(data))
+    assert isinstance(unpickled._database, LazyModuleDatabase) == chunked
+    assert _summarize(unpickled) == _summarize(context)
+    # modules are shared across the database and the hierarchy
+    for instance in itervalues(unpickled.top.instances):
+        assert instance.model is unpickled.database[ModuleView.user, instance.model.key]
+    assert _arch(unpickled, tmpdir.join("unpickled.xml")) == _arch(context, tmpdir.join("original.xml"))
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_unpickle_non_seekable(scanchain_context, chunked):
+    data = _dump(scanchain_context, chunked = chunked)
+    assert _summarize(Context.unpickle(io.BufferedReader(_Pipe(data)))) == _summarize(scanchain_context)
+    summary = Context.unpickle_summary(io.BufferedReader(_Pipe(data)))
+    assert summary.scanchain["bitstream_size"] == scanchain_context.summary.scanchain["bitstream_size"]
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_unpickle_summary(scanchain_context, tmpdir, chunked):
+    path = str(tmpdir.join("ctx.pkl"))
+    scanchain_context.pickle(path, chunked = chunked)
+    summary = Context.unpickle_summary(path)
+    assert sorted(vars(summary)) == sorted(vars(scanchain_context.summary))
+    assert summary.scanchain["bitstream_size"] == scanchain_context.summary.scanchain["bitstream_size"]
+    # pickled summaries are loaded as is
+    scanchain_context.pickle_summary(path)
+    assert sorted(vars(Context.unpickle_summary(path))) == sorted(vars(scanchain_context.summary))
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_unpickle_version_mismatch(scanchain_context, monkeypatch, chunked):
+    data = _dump(scanchain_context, chunked = chunked)
+    monkeypatch.setattr("prga.core.context._VERSION", "0.0.0")
+    with pytest.raises(PRGAAPIError, match = "not supported"):
+        Context.unpickle(io.BytesIO(data))
+    with pytest.raises(PRGAAPIError, match = "not supported"):
+        Context.unpickle_summary(io.BytesIO(data))
@@ -0,0 +1,68 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.netlist.module.module import Module
+from prga.netlist.module.util import ModuleUtils
+from prga.netlist.module.common import NodeIDTable
+from prga.netlist.net.common import PortDirection
+from prga.netlist.net.util import NetUtils
+from prga.exception import PRGAInternalError
+
+import pytest
+
+def _create_module(name):
+    m = Module(name)
+    ModuleUtils.create_port(m, "a", 2, PortDirection.input_)
+    ModuleUtils.create_port(m, "x", 2, PortDirection.output)
+    return m
+
+@pytest.fixture
+def top():
+    sub = _create_module("sub")
+    NetUtils.connect(sub.ports["a"], sub.ports["x"])
+    top = _create_module("top")
+    u0 = ModuleUtils.instantiate(top, sub, "u0")
+    u1 = ModuleUtils.instantiate(top, sub, "u1")
+    NetUtils.connect(top.ports["a"], u0.pins["a"])
+    NetUtils.connect(u0.pins["x"], u1.pins["a"])
+    NetUtils.connect(u1.pins["x"], top.ports["x"])
+    return top
+
+def _keep_ports(m, node):
+    # keep the ports of the top-level module only
+    return {} if len(node[1]) == 1 else None
+
+def test_reduce_timing_graph(top):
+    graph = ModuleUtils.reduce_timing_graph(top, create_node = _keep_ports)
+    assert sorted(graph.nodes) == [(i, (key, )) for i in range(2) for key in ("a", "x")]
+    assert sorted(graph.edges) == [((i, ("a", )), (i, ("x", ))) for i in range(2)]
+    assert graph.edges[(0, ("a", )), (0, ("x", ))]["path"] == (
+            (0, ("a", "u0")), (0, ("x", "u0")), (0, ("a", "u1")), (0, ("x", "u1")))
+
+def test_reduce_timing_graph_blackbox(top):
+    graph = ModuleUtils.reduce_timing_graph(top,
+            blackbox_instance = lambda i: i.name == "u1",
+            create_node = lambda m, node: {})
+    assert (0, ("a", "u1")) in graph
+    assert not graph.has_edge((0, ("a", "u1")), (0, ("x", "u1")))
+    assert graph.has_edge((0, ("a", "u0")), (0, ("x", "u0")))
+
+def test_reduce_timing_graph_is_stateless(top):
+    y = ModuleUtils.create_port(top, "y", 1, PortDirection.output)
+    first = ModuleUtils.reduce_timing_graph(top, create_node = _keep_ports)
+    NetUtils.connect(top.ports["a"][1], y)
+    second = ModuleUtils.reduce_timing_graph(top, create_node = _keep_ports)
+    assert not first.has_edge((1, ("a", )), (0, ("y", )))
+    assert second.has_edge((1, ("a", )), (0, ("y", )))
+    assert set(second.edges) == set(first.edges) | {((1, ("a", )), (0, ("y", )))}
+    assert not hasattr(top, "_node_id_table")
+
+def test_dereference_id(top):
+    node_ids = NodeIDTable()
+    id_ = node_ids.id_of( (1, ("x", "u0")) )
+    bit = NetUtils._dereference(top, id_, node_ids = node_ids)
+    assert NetUtils._reference(bit) == (1, ("x", "u0"))
+    with pytest.raises(PRGAInternalError):
+        NetUtils._dereference(top, id_)
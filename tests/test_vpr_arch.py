@@ -0,0 +1,142 @@
+# -*- encoding: ascii -*-
+# Python 2 and 3 compatible
+from __future__ import division, absolute_import, print_function
+from prga.compatible import *
+
+from prga.passes.base import AbstractPass
+from prga.passes.vpr import VPRArchGeneration, VPRScalableArchGeneration, VPRScalableDelegate, TimingDelegate
+from prga.passes.flow import Flow
+from prga.core.common import ModuleView
+from prga.netlist.module.module import Module
+from prga.cfg.scanchain.lib import ScanchainFASMDelegate
+
+import multiprocessing as mp
+import os
+import pickle
+import pytest
+
+class _NoReuseFASMDelegate(ScanchainFASMDelegate):
+    """Same FASM metadata, but ``<pb_type>`` subtrees are never reused."""
+
+    def fasm_memo_key_for_intrablock_module(self, instance):
+        return None
+
+class _NamedLUTFASMDelegate(ScanchainFASMDelegate):
+    """FASM metadata depending on the names in the hierarchy of the instance, not only its cfg bit offset."""
+
+    def fasm_lut(self, instance):
+        return "{}.{}".format(instance.hierarchy[-1].parent.name,
+                super(_NamedLUTFASMDelegate, self).fasm_lut(instance))
+
+class _NoReuseNamedLUTFASMDelegate(_NamedLUTFASMDelegate):
+    def fasm_memo_key_for_intrablock_module(self, instance):
+        return None
+
+class _BlockTimingDelegate(TimingDelegate):
+    """Intrablock delays depending on the logic block."""
+
+    def vpr_delay_of_intrablock_switch(self, source, sink, instance = None):
+        name = (instance.hierarchy[-1].parent if instance else source.parent).name
+        return 1e-12 * (2 + int(name[3:]) if name.startswith("clb") else 1), None
+
+def _generate(context, path, **kwargs):
+    pass_ = VPRArchGeneration(str(path), **kwargs)
+    pass_.run(context)
+    with open(str(path)) as f:
+        return f.read(), len(pass_.pb_type_fragments)
+
+def test_pb_type_reuse(scanchain_context, tmpdir):
+    context = scanchain_context
+    reused, fragments = _generate(context, tmpdir.join("reused.xml"))
+    assert fragments > 0
+    generated, fragments = _generate(context, tmpdir.join("generated.xml"), fasm = _NoReuseFASMDelegate(context))
+    assert fragments == 0
+    assert reused == generated
+
+def test_pb_type_reuse_overridden_fasm(scanchain_context, tmpdir):
+    context = scanchain_context
+    # sub-classes overriding how intrablock metadata is generated do not inherit the memo key
+    assert _NamedLUTFASMDelegate(context)._overrides_intrablock_methods(ScanchainFASMDelegate)
+    reused, fragments = _generate(context, tmpdir.join("reused.xml"), fasm = _NamedLUTFASMDelegate(context))
+    assert fragments == 0
+    generated, _ = _generate(context, tmpdir.join("generated.xml"), fasm = _NoReuseNamedLUTFASMDelegate(context))
+    assert reused == generated
+    for v in range(3):
+        assert "clb{}.b".format(v) in reused
+
+def test_pb_type_reuse_overridden_timing(scanchain_context, tmpdir):
+    context = scanchain_context
+    reused, fragments = _generate(context, tmpdir.join("reused.xml"), timing = _BlockTimingDelegate())
+    assert fragments == 0
+    for v in range(3):
+        assert 'max="{}e-12"'.format(2 + v) in reused
+
+def test_arch_cache(scanchain_context, tmpdir, caplog):
+    context, path, cache = scanchain_context, str(tmpdir.join("arch.xml")), str(tmpdir.join("cache"))
+    summary = pickle.dumps(context.summary)
+    # the dependences of the pass are not in the flow, so it is run directly
+    Flow(cache_dir = cache)._run_pass(context, None, VPRArchGeneration(path))
+    with open(path) as f:
+        generated = f.read()
+    updated, context.summary = pickle.dumps(context.summary), pickle.loads(summary)
+    caplog.clear()
+    Flow(cache_dir = cache)._run_pass(context, None, VPRArchGeneration(path))
+    assert "restored from cache" in caplog.text
+    with open(path) as f:
+        assert f.read() == generated
+    assert vars(context.summary) == vars(pickle.loads(updated))
+
+def test_arch_fingerprint(scanchain_context):
+    context = scanchain_context
+    pass_ = VPRArchGeneration("arch.xml")
+    fingerprint = Flow()._fingerprint(context, pass_)
+    assert fingerprint is not None
+    # modules the pass does not read do not affect the fingerprint
+    key = ModuleView.logical, "test_unused"
+    context._database[key] = Module("test_unused", view = ModuleView.logical, key = "test_unused")
+    try:
+        assert Flow()._fingerprint(context, pass_) == fingerprint
+    finally:
+        del context._database[key]
+    assert Flow()._fingerprint(context,
+            VPRArchGeneration("arch.xml", fasm = _NamedLUTFASMDelegate(context))) != fingerprint
+    assert Flow()._fingerprint(context, VPRArchGeneration("other.xml")) != fingerprint
+
+def test_arch_cache_reused_pass(scanchain_context, tmpdir, caplog):
+    context, path, cache = scanchain_context, str(tmpdir.join("arch.xml")), str(tmpdir.join("cache"))
+    summary = pickle.dumps(context.summary)
+    pass_ = VPRArchGeneration(path)
+    fingerprint = Flow()._fingerprint(context, pass_)
+    Flow(cache_dir = cache)._run_pass(context, None, pass_)
+    # data kept by the pass after it is run does not change the fingerprint
+    assert pass_.fasm is None and pass_.timing is None
+    context.summary = pickle.loads(summary)
+    assert Flow()._fingerprint(context, pass_) == fingerprint
+    caplog.clear()
+    Flow(cache_dir = cache)._run_pass(context, None, pass_)
+    assert "restored from cache" in caplog.text
+
+class _InjectionDone(AbstractPass):
+    """Stands in for the configuration circuitry injection already run on the context."""
+
+    @property
+    def key(self):
+        return "config.injection"
+
+    def run(self, context, renderer = None):
+        pass
+
+@pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason = "requires 'fork'")
+def test_arch_parallel_summary(scanchain_context, tmpdir):
+    context = scanchain_context
+    summary = pickle.dumps(context.summary)
+    try:
+        # neither forked pass finds the VPR summary, so each creates its own
+        if hasattr(context.summary, "vpr"):
+            del context.summary.vpr
+        arch, scalable = str(tmpdir.join("arch.xml")), str(tmpdir.join("scalable.xml"))
+        Flow(_InjectionDone(), VPRArchGeneration(arch), VPRScalableArchGeneration(scalable, VPRScalableDelegate(1.)),
+                jobs = 3).run(context)
+        assert context.summary.vpr == {"arch": os.path.abspath(arch), "scalable_arch": os.path.abspath(scalable)}
+    finally:
+        context.summary = pickle.loads(summary)